@@ -0,0 +1,169 @@
+import collections
+import hashlib
+import os
+import threading
+
+import diskcache
+import patchcache
+import romimage
+
+#
+# This file holds the pre-patched base ROM cache.
+#
+# The static patches applied at the start of seed generation only depend
+# on the input ROM and on a handful of flags, not on the seed.  The result
+# of applying them is cached so that rerolls and batch runs with the same
+# flags start from a finished base image instead of patching again.
+#
+# Base images are cached in two places:
+#   - In memory, for the most recently used images of this process
+#   - On disk in the __basecache__ directory, shared between runs
+# Both caches are LRU and bounded in size.  The disk cache uses the file
+# modification time to track use (see diskcache).
+#
+# The cache key is built from the SHA-256 of the (headerless) input ROM,
+# the static flag string, and the path, size and mtime of every patch
+# file, so editing a patch invalidates the base images built from it and
+# seeds from different data directories do not share them.
+#
+
+CACHE_DIRECTORY = "__basecache__"
+CACHE_EXTENSION = ".bin"
+MAX_MEMORY_ENTRIES = 4
+MAX_DISK_BYTES = 256 * 1024 * 1024
+
+PATCH_FILES = ["patch.ips"]
+PATCH_DIRECTORY = "patches"
+
+# In-process cache of base images, least recently used first
+memoryCache = collections.OrderedDict()
+
+# Cache statistics for this process
+cacheStats = {"memoryHits": 0, "diskHits": 0, "misses": 0}
+
+# Seeds can be generated on several threads, see seedapi
+cacheLock = threading.Lock()
+
+#
+# Build a fingerprint of the patch files that can be applied to a base image.
+#
+# return: Hex digest identifying the current patch files
+#
+def get_patch_fingerprint():
+  patchFiles = list(PATCH_FILES)
+  patchDirectory = patchcache.get_patch_path(PATCH_DIRECTORY)
+  if os.path.isdir(patchDirectory):
+    for name in sorted(os.listdir(patchDirectory)):
+      if name.endswith(".ips") or name.endswith(".txt"):
+        patchFiles.append(os.path.join(PATCH_DIRECTORY, name))
+  fingerprint = hashlib.sha256()
+  for patchFile in patchFiles:
+    patchPath = patchcache.get_patch_path(patchFile)
+    if os.path.exists(patchPath):
+      info = os.stat(patchPath)
+      fingerprint.update(("%s:%d:%d;" % (patchPath, info.st_size, info.st_mtime_ns)).encode())
+  return fingerprint.hexdigest()
+# end get_patch_fingerprint
+
+#
+# Build the cache key for an input ROM and static flag set.
+#
+# param: romData - The headerless input ROM data
+# param: staticFlags - String identifying the static flag subset
+# return: Hex string cache key
+#
+def get_cache_key(romData, staticFlags):
+  key = hashlib.sha256()
+  key.update(hashlib.sha256(romData).digest())
+  key.update(staticFlags.encode())
+  key.update(get_patch_fingerprint().encode())
+  return key.hexdigest()
+# end get_cache_key
+
+#
+# Get the path of the disk cache file for a key.
+#
+# param: key - Cache key
+# return: Path of the cached base image
+#
+def get_cache_path(key):
+  return os.path.join(CACHE_DIRECTORY, key + CACHE_EXTENSION)
+# end get_cache_path
+
+#
+# Add a base image to the in-memory cache, evicting the least recently
+# used image if the cache is full.
+#
+# param: key - Cache key
+# param: data - bytes object holding the base image
+#
+def remember(key, data):
+  with cacheLock:
+    memoryCache[key] = data
+    memoryCache.move_to_end(key)
+    while len(memoryCache) > MAX_MEMORY_ENTRIES:
+      memoryCache.popitem(last=False)
+# end remember
+
+#
+# Read a base image from the disk cache.
+#
+# param: key - Cache key
+# return: bytes object holding the base image, or None on a miss
+#
+def read_disk(key):
+  data = diskcache.read_file(get_cache_path(key))
+  if data is None or len(data) == 0:
+    return None
+  return data
+# end read_disk
+
+#
+# Write a base image to the disk cache and evict the least recently used
+# images until the cache fits in MAX_DISK_BYTES.  Failing to write the
+# cache is not an error.
+#
+# param: key - Cache key
+# param: data - bytes object holding the base image
+#
+def write_disk(key, data):
+  if diskcache.write_file(get_cache_path(key), data):
+    diskcache.evict(CACHE_DIRECTORY, CACHE_EXTENSION, MAX_DISK_BYTES)
+# end write_disk
+
+#
+# Get a pre-patched base image for an input ROM and static flag set.
+#
+# param: sourceRom - RomImage holding the unpatched input ROM
+# param: staticFlags - String identifying the static flag subset
+# param: applyPatches - Function taking a RomImage and applying the static
+#                       patches to it.  Only called on a cache miss.
+# param: useDisk - False to only use the in-memory cache, e.g. for
+#                  callers that must not write to the current directory
+# return: A new RomImage holding the patched base image
+#
+def get_base_rom(sourceRom, staticFlags, applyPatches, useDisk=True):
+  key = get_cache_key(sourceRom.data, staticFlags)
+  with cacheLock:
+    data = memoryCache.get(key)
+    if data is not None:
+      cacheStats["memoryHits"] += 1
+      memoryCache.move_to_end(key)
+  if data is not None:
+    return romimage.RomImage(data)
+  if useDisk:
+    data = read_disk(key)
+  if data is not None:
+    with cacheLock:
+      cacheStats["diskHits"] += 1
+    remember(key, data)
+    return romimage.RomImage(data)
+  with cacheLock:
+    cacheStats["misses"] += 1
+  applyPatches(sourceRom)
+  data = sourceRom.toBytes()
+  remember(key, data)
+  if useDisk:
+    write_disk(key, data)
+  return sourceRom
+# end get_base_rom
@@ -0,0 +1,271 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import bossrando as boss_shuffler
+import characterwriter as char_slots
+import enemywriter as enemystuff
+import goldencorpus
+import ipswriter
+import logicfactory
+import logicwriter_chronosanity as chronosanity_logic
+import patcher
+import randomizer
+import romimage
+import shopwriter as shops
+import tabchange as tabwriter
+import techwriter as tech_order
+import treasurewriter as treasures
+from generationcontext import Settings, presetFlags
+
+#
+# This file holds the benchmark harness.
+#
+# Every benchmark runs against a synthetic 4 MB ROM (zero filled or
+# pseudo random), so no copy of the game is needed.  The writers only
+# care about offsets, not about what the ROM holds, so timings on the
+# synthetic ROM are representative.
+#
+# Benchmarks cover the public entry points of the randomizer: the patch
+# writers, every stage writer, key item placement for every logicfactory
+# game configuration, and a full generate_rom for every GUI preset.
+# Each benchmark is run a number of times on a fresh copy of the ROM;
+# the copy and any setup are not timed.  Random numbers are seeded by
+# the iteration, so every run of the harness does the same work.
+#
+# Results can be saved as a JSON baseline and later runs compared against
+# it.  A benchmark whose median time grows by more than the threshold is
+# a regression, and the harness exits with status 1.  Baselines are only
+# comparable on the same machine.
+#
+#   python benchmark.py --save baseline.json
+#   python benchmark.py --compare baseline.json --threshold 0.15
+#
+
+BASELINE_VERSION = 1
+
+#
+# The Benchmark class describes one benchmark.
+#
+#   name    - Name of the benchmark
+#   run     - Function taking (rom, rand, state) that does the timed work
+#   prepare - Optional function taking (rom, rand, iteration) that does
+#             untimed setup and returns the state passed to run
+#
+class Benchmark:
+  def __init__(self, name, run, prepare=None):
+    self.name = name
+    self.run = run
+    self.prepare = prepare
+# end Benchmark class
+
+#
+# Prepare key item placement: place the characters and build the game
+# configuration, which placement changes as it runs.
+#
+def prepareKeyItems(chronosanity, lostWorlds, earlyPendant, lockedChars):
+  def prepare(rom, rand, iteration):
+    charLocations = char_slots.randomize_char_positions(
+        rom, rand, "Y" if lockedChars else "N", "Y" if lostWorlds else "N")
+    return logicfactory.getGameConfig(chronosanity, lostWorlds, earlyPendant, lockedChars,
+                                      charLocations)
+  return prepare
+# end prepareKeyItems
+
+#
+# Place the key items for a prepared game configuration.
+#
+# raise: RuntimeError if placement fails
+#
+def placeKeyItems(rom, rand, gameConfig):
+  success, chosenLocations = chronosanity_logic.determineKeyItemPlacement(gameConfig, rand)
+  if not success:
+    raise RuntimeError("Key item placement failed")
+
+#
+# Get the benchmark for a full seed with one of the GUI presets.
+#
+# param: preset - Name of the preset in generationcontext.presetFlags
+# param: sourcefile - Path of the synthetic ROM on disk
+# param: outputfolder - Folder to write the seeds to
+# return: A Benchmark
+#
+def getPresetBenchmark(preset, sourcefile, outputfolder):
+  settings = Settings.fromFlagString(presetFlags[preset])
+  def prepare(rom, rand, iteration):
+    return "bench%d" % iteration
+  def run(rom, rand, seed):
+    randomizer.generate_rom(settings, seed, sourcefile, outputfolder,
+                            os.path.join(outputfolder, "spoiler_log.txt"))
+  return Benchmark("generate_rom[%s]" % preset, run, prepare)
+# end getPresetBenchmark
+
+#
+# Get every benchmark.
+#
+# param: sourcefile - Path of the synthetic ROM on disk
+# param: outputfolder - Folder to write the seeds to
+# return: List of Benchmark objects
+#
+def getBenchmarks(sourcefile, outputfolder):
+  benchmarks = [
+    Benchmark("ipswriter.write_patch[patch.ips]",
+              lambda rom, rand, state: ipswriter.write_patch("patch.ips", rom)),
+    Benchmark("patcher.patch_file[magus_a.txt]",
+              lambda rom, rand, state: patcher.patch_file("patches/magus_a.txt", rom)),
+    Benchmark("randomize_treasures",
+              lambda rom, rand, state: treasures.randomize_treasures(rom, rand, "normal", "N")),
+    Benchmark("randomize_shops",
+              lambda rom, rand, state: shops.randomize_shops(rom, rand)),
+    Benchmark("modify_shop_prices",
+              lambda rom, rand, state: shops.modify_shop_prices(rom, rand, "Fully Random")),
+    Benchmark("randomize_enemy_stuff",
+              lambda rom, rand, state: enemystuff.randomize_enemy_stuff(rom, rand, "normal")),
+    Benchmark("randomize_bosses",
+              lambda rom, rand, state: boss_shuffler.randomize_bosses(rom, rand, "normal")),
+    Benchmark("take_pointer_balanced",
+              lambda rom, rand, state: tech_order.take_pointer_balanced(rom, rand)),
+    Benchmark("rewrite_tabs",
+              lambda rom, rand, state: tabwriter.rewrite_tabs(rom, rand))]
+
+  # Key item placement for every game configuration logicfactory builds
+  keyItemConfigs = [
+    ("normal", False, False, False, False),
+    ("normal+pendant+locked", False, False, True, True),
+    ("lost_worlds", False, True, False, False),
+    ("chronosanity", True, False, False, False),
+    ("chronosanity+pendant+locked", True, False, True, True),
+    ("chronosanity+lost_worlds", True, True, False, False)]
+  for name, chronosanity, lostWorlds, earlyPendant, lockedChars in keyItemConfigs:
+    benchmarks.append(Benchmark("determineKeyItemPlacement[%s]" % name, placeKeyItems,
+                                prepareKeyItems(chronosanity, lostWorlds, earlyPendant, lockedChars)))
+
+  for preset in presetFlags:
+    benchmarks.append(getPresetBenchmark(preset, sourcefile, outputfolder))
+  return benchmarks
+# end getBenchmarks
+
+#
+# Run one benchmark.
+#
+# param: benchmark - The Benchmark to run
+# param: romData - Data of the synthetic ROM
+# param: repeat - Number of timed runs
+# param: warmup - Number of untimed runs before the timed ones, to fill
+#                 the patch and base ROM caches
+# return: Dictionary of the results in milliseconds
+#
+def runBenchmark(benchmark, romData, repeat, warmup):
+  times = []
+  for iteration in range(warmup + repeat):
+    rom = romimage.RomImage(romData)
+    rand = random.Random(iteration)
+    state = None
+    if benchmark.prepare is not None:
+      state = benchmark.prepare(rom, rand, iteration)
+    start = time.perf_counter()
+    benchmark.run(rom, rand, state)
+    elapsed = time.perf_counter() - start
+    if iteration >= warmup:
+      times.append(elapsed * 1000)
+  return {"median": statistics.median(times), "min": min(times),
+          "mean": statistics.mean(times), "runs": len(times)}
+# end runBenchmark
+
+#
+# Compare results against a baseline.
+#
+# param: results - Dictionary of benchmark name to results
+# param: baseline - Baseline dictionary as written by --save
+# param: threshold - Allowed relative growth of the median, e.g. 0.1 for 10%
+# return: Tuple of (report lines, list of names of regressed benchmarks)
+#
+def compareResults(results, baseline, threshold):
+  lines = ["%-54s %10s %10s %8s" % ("benchmark", "base ms", "now ms", "change")]
+  regressions = []
+  for name, result in results.items():
+    base = baseline["results"].get(name)
+    if base is None:
+      lines.append("%-54s %10s %10.3f %8s" % (name, "-", result["median"], "new"))
+      continue
+    change = (result["median"] - base["median"]) / base["median"] if base["median"] > 0 else 0.0
+    status = ""
+    if change > threshold:
+      status = "  REGRESSION"
+      regressions.append(name)
+    lines.append("%-54s %10.3f %10.3f %+7.1f%%%s" %
+                 (name, base["median"], result["median"], change * 100, status))
+  return lines, regressions
+# end compareResults
+
+#
+# Run the benchmarks from the command line.
+#
+# param: argv - Command line arguments, not including the program name
+# return: Exit status
+#
+def main(argv):
+  parser = argparse.ArgumentParser(description="Benchmark the randomizer on a synthetic ROM.")
+  parser.add_argument("--rom", choices=["zero", "random"], default="random",
+                      help="Contents of the synthetic 4 MB ROM")
+  parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs per benchmark")
+  parser.add_argument("--warmup", type=int, default=2, help="Number of untimed runs per benchmark")
+  parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this text")
+  parser.add_argument("--save", metavar="FILE", help="Save the results as a baseline")
+  parser.add_argument("--compare", metavar="FILE", help="Compare the results against a baseline")
+  parser.add_argument("--threshold", type=float, default=0.25,
+                      help="Allowed growth of the median time before a benchmark counts as a "
+                           "regression (default 0.25 = 25%%)")
+  args = parser.parse_args(argv)
+
+  # The writers load their patches relative to the source folder
+  os.chdir(os.path.dirname(os.path.abspath(__file__)))
+  romData = goldencorpus.makeRomData(args.rom)
+  workFolder = tempfile.mkdtemp(prefix="jotbench")
+  try:
+    sourcefile = os.path.join(workFolder, "bench.sfc")
+    with open(sourcefile, "wb") as romFile:
+      romFile.write(romData)
+    results = {}
+    for benchmark in getBenchmarks(sourcefile, workFolder):
+      if args.filter is not None and args.filter not in benchmark.name:
+        continue
+      # Silence the progress messages of the writers
+      with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = runBenchmark(benchmark, romData, args.repeat, args.warmup)
+      results[benchmark.name] = result
+      print("%-54s %10.3f ms (min %.3f, %d runs)" %
+            (benchmark.name, result["median"], result["min"], result["runs"]))
+  finally:
+    shutil.rmtree(workFolder, ignore_errors=True)
+
+  if args.save:
+    baseline = {"version": BASELINE_VERSION, "python": platform.python_version(),
+                "machine": platform.node(), "rom": args.rom, "results": results}
+    with open(args.save, "w") as baselineFile:
+      json.dump(baseline, baselineFile, indent=2)
+    print("Saved baseline to %s" % args.save)
+
+  if args.compare:
+    with open(args.compare) as baselineFile:
+      baseline = json.load(baselineFile)
+    if baseline.get("rom") != args.rom:
+      print("Warning: baseline was taken with the %s ROM" % baseline.get("rom"))
+    lines, regressions = compareResults(results, baseline, args.threshold)
+    print("\n".join(lines))
+    if len(regressions) > 0:
+      print("%d benchmarks regressed by more than %.0f%%" % (len(regressions), args.threshold * 100))
+      return 1
+  return 0
+# end main
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
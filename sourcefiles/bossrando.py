@@ -1,5 +1,3 @@
-import random as rand
-import struct as st
 import patcher as patch
 
 # Start marker:  0xC4700
@@ -55,11 +53,10 @@ hard_hp =    [920,3600,2100,5000,4200,7000,8000,6000,6000,5200,5800]
 eligible_bosses = [0x90, 0x95, 0x4F, 0x99, 0x9B, 0x9C, 0x9E, 0x9F, 0xA2, 0xA9, 0xBA, 0xBB, 0xBD, 0xC0, 0xC7, 0xF3]
 boss_tiers =      [   0,    3,    4,    1,    2,    2,    2,    2,    3,    1,    2,    2,    2,    1,    2,    0]
 
-def randomize_bosses(outfile,difficulty):
+def randomize_bosses(rom,rand,difficulty):
     # Reset array to initial position.  Program will crash if you don't do that because we remove elements from the array as bosses are selected.
     eligible_bosses = [0x90, 0x95, 0x4F, 0x99, 0x9B, 0x9C, 0x9E, 0x9F, 0xA2, 0xA9, 0xBA, 0xBB, 0xBD, 0xC0, 0xC7, 0xF3]
     boss_tiers =      [   0,    3,    4,    1,    2,    2,    2,    2,    3,    1,    2,    2,    2,    1,    2,    0]
-    f = open(outfile,"r+b")
     lnI = 0
     for spot in spots:
         if spot == 0x24EC52: #Hack to get around sprite overload in Heckran's spot
@@ -86,23 +83,17 @@ def randomize_bosses(outfile,difficulty):
         
         #f.seek(0xC4700 + boss * 23 + 0);
         #hp = int.from_bytes(f.read(2), byteorder='little', signed=False);
-        f.seek(0xC4700 + boss * 23 + 2);
-        level = int.from_bytes(f.read(1), byteorder='little', signed=False);
-        f.seek(0xC4700 + boss * 23 + 10);
-        magic = int.from_bytes(f.read(1), byteorder='little', signed=False);
+        level = rom.readU8(0xC4700 + boss * 23 + 2)
+        magic = rom.readU8(0xC4700 + boss * 23 + 10)
         #f.seek(0xC4700 + (eligible_bosses[boss] * 23) + 13);
         #magic_defense = int.from_bytes(f.read(1), byteorder='little', signed=False);
-        f.seek(0xC4700 + boss * 23 + 14);
-        offense = int.from_bytes(f.read(1), byteorder='little', signed=False);
+        offense = rom.readU8(0xC4700 + boss * 23 + 14)
         #f.seek(0xC4700 + (eligible_bosses[boss] * 23) + 15);
         #defense = int.from_bytes(f.read(1), byteorder='little', signed=False);
 
-        f.seek(0xC5E00 + boss * 7 + 0);
-        xp = int.from_bytes(f.read(2), byteorder='little', signed=False);
-        f.seek(0xC5E00 + boss * 7 + 2);
-        gp = int.from_bytes(f.read(2), byteorder='little', signed=False);
-        f.seek(0xC5E00 + boss * 7 + 6);
-        tp = int.from_bytes(f.read(1), byteorder='little', signed=False);
+        xp = rom.readU16(0xC5E00 + boss * 7 + 0)
+        gp = rom.readU16(0xC5E00 + boss * 7 + 2)
+        tp = rom.readU8(0xC5E00 + boss * 7 + 6)
 
         boss_power = 1
         if (spot_tier - boss_tier <= -3):
@@ -134,32 +125,23 @@ def randomize_bosses(outfile,difficulty):
         gp = min(int(pow(gp, boss_power)), 6000)
         tp = min(int(pow(tp, boss_power)), 250)
 
-        f.seek(spot)
-        f.write(st.pack("B",boss))
+        rom.writeU8(spot,boss)
         # To avoid graphical glitches at the Masa & Mune spot
         if lnI == 1:
-            f.seek(spot + 1)
-            f.write(st.pack("B", 0x03))
+            rom.writeU8(spot + 1,0x03)
 
-        f.seek(0xC4700 + boss * 23 + 0);
-        f.write(st.pack("<H",hp))
-        f.seek(0xC4700 + boss * 23 + 2);
-        f.write(st.pack("B",level))
-        f.seek(0xC4700 + boss * 23 + 10);
-        f.write(st.pack("B",magic))
+        rom.writeU16(0xC4700 + boss * 23 + 0,hp)
+        rom.writeU8(0xC4700 + boss * 23 + 2,level)
+        rom.writeU8(0xC4700 + boss * 23 + 10,magic)
         #f.seek(0xC4700 + (eligible_bosses[boss] * 23) + 13);
         #magic_defense = int.from_bytes(reader.read(1), byteorder='little', signed=False);
-        f.seek(0xC4700 + boss * 23 + 14);
-        f.write(st.pack("B",offense))
+        rom.writeU8(0xC4700 + boss * 23 + 14,offense)
         #f.seek(0xC4700 + (eligible_bosses[boss] * 23) + 15);
         #defense = int.from_bytes(reader.read(1), byteorder='little', signed=False);
 
-        f.seek(0xC5E00 + boss * 7 + 0);
-        f.write(st.pack("<H",xp))
-        f.seek(0xC5E00 + boss * 7 + 2);
-        f.write(st.pack("<H",gp))
-        f.seek(0xC5E00 + boss * 7 + 6);
-        f.write(st.pack("B",tp))
+        rom.writeU16(0xC5E00 + boss * 7 + 0,xp)
+        rom.writeU16(0xC5E00 + boss * 7 + 2,gp)
+        rom.writeU8(0xC5E00 + boss * 7 + 6,tp)
 
         boss_tiers.pop(eligible_bosses.index(boss))
         eligible_bosses.remove(boss)
@@ -1,105 +1,56 @@
-import struct as st
-
-def scale_bosses(characters,key_locations,locked_characters,outfile):
-  #Order of stats: HP, Level, Magic, Magic Defense, Offense, Defense, Experience, Gold, xTech Points
-  global retinite_core
-  retinite_core = [0xC4C36,0xC4C38,0xC4C40,0xC4C43,0xC4C44,0xC4C45,0xC5F96,0xC5F98,0xC5F9C]
-  global retinite_legs
-  retinite_legs = [0xC5743,0xC5745,0xC574D,0xC5750,0xC5751,0xC5752,0xC62F3,"",0xC62F9]
-  global retinite_head
-  retinite_head = [0xC575A,0xC575C,0xC5764,0xC5767,0xC5768,0xC5769,0xC62FA,"",0xC6300]
-  global display
-  display = ["",0xC5773,0xC577B,0xC577E,0xC577F,0xC5780]
-  global motherbrain
-  motherbrain = [0xC5812,0xC5814,0xC581C,0xC581F,0xC5820,0xC5821,0xC6332,0xC6334,0xC6338]
-  global yakraxiii
-  yakraxiii = [0xC58E1,0xC58E3,0xC58EB,0xC58EE,0xC58EF,0xC58F0,0xC6371,0xC6373,0xC6377]
-  global dragon_tank
-  dragon_tank = [0xC5435,0xC5437,0xC543F,0xC5442,0xC5443,0xC5444,0xC6205,0xC6207,0xC620B]
-  global dragon_wheel
-  dragon_wheel = [0xC544C,0xC544E,0xC5456,0xC5459,0xC545A,0xC545B]
-  global dragon_head
-  dragon_head = [0xC568B,0xC568D,0xC5695,0xC5698,0xC5699,0xC569A]
-  global giga_gaia
-  giga_gaia = [0xC59C7,0xC59C9,0xC59D1,0xC59D4,0xC59D5,0xC59D6,0xC63B7,0xC63B9,0xC63BD]
-  global rusttyrano 
-  rusttyrano = [0xC57FB,0xC57FD,0xC5805,0xC5808,0xC5809,0xC580A,0xC632B,0xC632D,0xC6331]
-  global nizbel
-  nizbel = [0xC54ED,0xC54EF,0xC54F7,0xC54FA,0xC54FB,0xC54FC,0xC623D,0xC623F,0xC6243]
-  global gaia_right
-  gaia_right = [0xC59DE,0xC59E0,0xC59E8,0xC59EB,0xC59EC,0xC59ED]
-  global gaia_left
-  gaia_left = [0xC59F5,0xC59F7,0xC59FF,0xC5A02,0xC5A03,0xC5A04]
-  global bit
-  bit = [0xC5999,0xC599B,0xC59A3,0xC59A6,0xC59A7,0xC59A8]
-  global guardian
-  guardian = [0xC5A0C,0xC5A0E,0xC5A16,0xC5A19,0xC5A1A,0xC5A1B,0xC63CC,0xC63CE,0xC63D2]
-  global sonofsun
-  sonofsun = ["",0xC5D1C,0xC5D24,"","","",0xC64BA,0xC64BC,0xC64C0]
-  global sos_flame
-  sos_flame = ["",0xC5D33,0xC5D3B,"","",""]
-  global rseries
-  rseries = [0xC5D48,0xC5D4A,0xC5D52,0xC5D55,0xC5D56,0xC5D57,0xC64C8,0xC64CA,0xC64CE]
-  global dtankpower
-  dtankpower = 0
-  global nizbelpower
-  nizbelpower = 0
-  global desertpower
-  desertpower = 0
-  global rustpower  
-  rustpower = 0
-  global guardianpower
-  guardianpower = 0
-  global sunpower
-  sunpower = 0 
-  global motherpower
-  motherpower = 0
-  global gigapower
-  gigapower = 0
-  global yakraxiiipower
-  yakraxiiipower = 0
-  global rseriespower
-  rseriespower = 0
+#Order of stats: HP, Level, Magic, Magic Defense, Offense, Defense, Experience, Gold, xTech Points
+retinite_core = [0xC4C36,0xC4C38,0xC4C40,0xC4C43,0xC4C44,0xC4C45,0xC5F96,0xC5F98,0xC5F9C]
+retinite_legs = [0xC5743,0xC5745,0xC574D,0xC5750,0xC5751,0xC5752,0xC62F3,"",0xC62F9]
+retinite_head = [0xC575A,0xC575C,0xC5764,0xC5767,0xC5768,0xC5769,0xC62FA,"",0xC6300]
+display = ["",0xC5773,0xC577B,0xC577E,0xC577F,0xC5780]
+motherbrain = [0xC5812,0xC5814,0xC581C,0xC581F,0xC5820,0xC5821,0xC6332,0xC6334,0xC6338]
+yakraxiii = [0xC58E1,0xC58E3,0xC58EB,0xC58EE,0xC58EF,0xC58F0,0xC6371,0xC6373,0xC6377]
+dragon_tank = [0xC5435,0xC5437,0xC543F,0xC5442,0xC5443,0xC5444,0xC6205,0xC6207,0xC620B]
+dragon_wheel = [0xC544C,0xC544E,0xC5456,0xC5459,0xC545A,0xC545B]
+dragon_head = [0xC568B,0xC568D,0xC5695,0xC5698,0xC5699,0xC569A]
+giga_gaia = [0xC59C7,0xC59C9,0xC59D1,0xC59D4,0xC59D5,0xC59D6,0xC63B7,0xC63B9,0xC63BD]
+rusttyrano = [0xC57FB,0xC57FD,0xC5805,0xC5808,0xC5809,0xC580A,0xC632B,0xC632D,0xC6331]
+nizbel = [0xC54ED,0xC54EF,0xC54F7,0xC54FA,0xC54FB,0xC54FC,0xC623D,0xC623F,0xC6243]
+gaia_right = [0xC59DE,0xC59E0,0xC59E8,0xC59EB,0xC59EC,0xC59ED]
+gaia_left = [0xC59F5,0xC59F7,0xC59FF,0xC5A02,0xC5A03,0xC5A04]
+bit = [0xC5999,0xC599B,0xC59A3,0xC59A6,0xC59A7,0xC59A8]
+guardian = [0xC5A0C,0xC5A0E,0xC5A16,0xC5A19,0xC5A1A,0xC5A1B,0xC63CC,0xC63CE,0xC63D2]
+sonofsun = ["",0xC5D1C,0xC5D24,"","","",0xC64BA,0xC64BC,0xC64C0]
+sos_flame = ["",0xC5D33,0xC5D3B,"","",""]
+rseries = [0xC5D48,0xC5D4A,0xC5D52,0xC5D55,0xC5D56,0xC5D57,0xC64C8,0xC64CA,0xC64CE]
+def scale_bosses(characters,key_locations,locked_characters,rom):
+  #Boss power levels, raised by set_power based on where the important key items are
+  power = {"dtank": 0, "nizbel": 0, "desert": 0, "rust": 0, "guardian": 0, "sun": 0,
+  "mother": 0, "giga": 0, "yakraxiii": 0, "rseries": 0}
   important_keys = ["knife","clone","trigger"]
-  set_power(key_locations,important_keys)
+  set_power(key_locations,important_keys,power)
   if locked_characters == "Y":
      if (characters ["proto"] == "Robo" or characters ["proto"] == "Ayla"):
-        rseriespower = 1
+        power["rseries"] = 1
      if (characters ["proto"] == "Chrono" or characters ["proto"] == "Magus"):
-        rseriespower = 2
-  f = open(outfile,"r+b")
-  scale_stats(rustpower,rusttyrano,f)
-  scale_stats(dtankpower,dragon_tank,f)
-  scale_stats(dtankpower,dragon_wheel,f)
-  scale_stats(dtankpower,dragon_head,f)
-  scale_stats(sunpower,sonofsun,f)
-  scale_stats(sunpower,sos_flame,f)
-  scale_stats(nizbelpower,nizbel,f)
-  scale_stats(desertpower,retinite_core,f)
-  scale_stats(desertpower,retinite_head,f)
-  scale_stats(desertpower,retinite_legs,f)
-  scale_stats(yakraxiiipower,yakraxiii,f)
-  scale_stats(guardianpower,guardian,f)
-  scale_stats(guardianpower,bit,f)
-  scale_stats(motherpower,motherbrain,f)
-  scale_stats(motherpower,display,f)
-  scale_stats(rseriespower,rseries,f)
-  scale_stats(gigapower,giga_gaia,f)
-  scale_stats(gigapower,gaia_left,f)
-  scale_stats(gigapower,gaia_right,f)
-  f.close()
-def set_power(locations,important_keys,rank = 3):
+        power["rseries"] = 2
+  scale_stats(power["rust"],rusttyrano,rom)
+  scale_stats(power["dtank"],dragon_tank,rom)
+  scale_stats(power["dtank"],dragon_wheel,rom)
+  scale_stats(power["dtank"],dragon_head,rom)
+  scale_stats(power["sun"],sonofsun,rom)
+  scale_stats(power["sun"],sos_flame,rom)
+  scale_stats(power["nizbel"],nizbel,rom)
+  scale_stats(power["desert"],retinite_core,rom)
+  scale_stats(power["desert"],retinite_head,rom)
+  scale_stats(power["desert"],retinite_legs,rom)
+  scale_stats(power["yakraxiii"],yakraxiii,rom)
+  scale_stats(power["guardian"],guardian,rom)
+  scale_stats(power["guardian"],bit,rom)
+  scale_stats(power["mother"],motherbrain,rom)
+  scale_stats(power["mother"],display,rom)
+  scale_stats(power["rseries"],rseries,rom)
+  scale_stats(power["giga"],giga_gaia,rom)
+  scale_stats(power["giga"],gaia_left,rom)
+  scale_stats(power["giga"],gaia_right,rom)
+def set_power(locations,important_keys,power,rank = 3):
     futurelocs = ["arris","geno","sun"]
     importantlocs = []
-    global dtankpower
-    global guardianpower
-    global motherpower
-    global sunpower
-    global nizbelpower
-    global yakraxiiipower
-    global rustpower
-    global gigapower
-    global desertpower
     for locs in locations:
         if locations [locs] in important_keys:
            importantlocs.append(locs)
@@ -107,32 +58,32 @@ def set_power(locations,important_keys,rank = 3):
     for locs in importantlocs:
         if locs == "reptite":
            important_keys.append("gate")
-           nizbelpower = rank
+           power["nizbel"] = rank
         if locs in futurelocs:
            important_keys.append("pendant")
-           if dtankpower < rank:
-              dtankpower = rank - 1
-              guardianpower = dtankpower + 1
-              sunpower = dtankpower + 1
-              motherpower = dtankpower + 1
+           if power["dtank"] < rank:
+              power["dtank"] = rank - 1
+              power["guardian"] = power["dtank"] + 1
+              power["sun"] = power["dtank"] + 1
+              power["mother"] = power["dtank"] + 1
         if locs == "melchior":
-           yakraxiiipower = rank
+           power["yakraxiii"] = rank
            important_keys.append("moon")
            if "gate" not in important_keys:
               important_keys.append("gate")
            if "pendant" not in important_keys:
               important_keys.append("pendant")
-           dtankpower = yakraxiiipower - 1
+           power["dtank"] = power["yakraxiii"] - 1
         if locs == "trial":
              important_keys.append("prism")
-             yakraxiiipower = rank
+             power["yakraxiii"] = rank
         if locs == "claw":
            important_keys.append("pop")
-           rustpower = rank
+           power["rust"] = rank
         if locs == "desert":
-           desertpower = rank
+           power["desert"] = rank
         if locs == "woe":
-           gigapower = rank
+           power["giga"] = rank
         if locs == "burrow":
            important_keys.append("medal")
     if rank > 2:
@@ -141,8 +92,8 @@ def set_power(locations,important_keys,rank = 3):
        important_keys.append("stone")
     rank = rank - 1
     if rank > 0:
-        set_power(locations,important_keys,rank)
-def scale_stats(bosspower,boss,pointer):
+        set_power(locations,important_keys,power,rank)
+def scale_stats(bosspower,boss,rom):
     if bosspower == 0: return
     boss_stats = []
     i = 0
@@ -251,9 +202,8 @@ def scale_stats(bosspower,boss,pointer):
           if boss [i] == "":
              i += 1
              continue
-          pointer.seek(boss [i])
           if i in halfword_stats:
-             pointer.write(st.pack("H",boss_stats[i]))
+             rom.writeU16(boss [i],boss_stats[i])
           else: 
-             pointer.write(st.pack("B",boss_stats[i]))
+             rom.writeU8(boss [i],boss_stats[i])
           i += 1
\ No newline at end of file
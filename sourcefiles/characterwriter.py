@@ -1,5 +1,3 @@
-import random as rand
-import struct as st
 import ipswriter as patch
 """stats pattern:id(not used for stat setups),hp,mp,power,stamina,magic,hit,evade,magic defense,level,
 current XP first byte,current XP last byte,XP to next level,tech points to next tech,number of techs,
@@ -12,11 +10,10 @@ frog = [4,80,9,4,8,6,8,8,15,1,0,0,20,5,0,0]
 ayla = [5,80,4,10,9,3,10,12,10,1,0,0,20,5,0,0]
 magus = [6,110,14,8,7,20,12,10,30,1,0,0,20,50,0,0]
 
-def set_stats(file_pointer,character,location,lost_worlds):
-    global chrono, marle, lucca, robo, frog, ayla, magus, char_array
+def set_stats(rom,character,location,lost_worlds):
     if (location == "start" or location == "start2" or location == "cathedral") and lost_worlds != "Y":
         char_array = character[1:]
-        write_stats(file_pointer,character,char_array)
+        write_stats(rom,character,char_array)
     elif location == "castle":
         if character == chrono:
            char_array = [122,16,10,14,6,9,9,16,5,0xF0,0,0xA0,50,2,0xC0]
@@ -47,48 +44,31 @@ def set_stats(file_pointer,character,location,lost_worlds):
            char_array = [290,32,31,33,7,20,23,16,15,0xBE,0x19,1450,200,3,0xE0]
         elif character == magus:
            char_array = [250,42,26,21,34,22,19,38,15,0xBE,0x19,1450,100,3,0xE0]
-    write_stats(file_pointer,character,char_array)
+    write_stats(rom,character,char_array)
 
-def write_stats(file_pointer,character,stats):
+def write_stats(rom,character,stats):
         start_pointer = 0xC0000 + character[0] * 0x50
         techlist_pointer = 0xC0237 + character[0]
         technumber_pointer = 0xC0230 + character[0]
-        file_pointer.seek(start_pointer + 0x3)
-        file_pointer.write(st.pack("H",stats[0]))
-        file_pointer.seek(start_pointer + 0x5)
-        file_pointer.write(st.pack("H",stats[0]))
-        file_pointer.seek(start_pointer + 0x7)
-        file_pointer.write(st.pack("H",stats[1]))
-        file_pointer.seek(start_pointer + 0x9)
-        file_pointer.write(st.pack("H",stats[1]))
-        file_pointer.seek(start_pointer + 0xB)
-        file_pointer.write(st.pack("B",stats[2]))
-        file_pointer.seek(start_pointer + 0xC)
-        file_pointer.write(st.pack("B",stats[3]))
-        file_pointer.seek(start_pointer + 0xE)
-        file_pointer.write(st.pack("B",stats[4]))
-        file_pointer.seek(start_pointer + 0xF)
-        file_pointer.write(st.pack("B",stats[5]))
-        file_pointer.seek(start_pointer + 0x10)
-        file_pointer.write(st.pack("B",stats[6]))
-        file_pointer.seek(start_pointer + 0x11)
-        file_pointer.write(st.pack("B",stats[7]))
-        file_pointer.seek(start_pointer + 0x12)
-        file_pointer.write(st.pack("B",stats[8]))
-        file_pointer.seek(start_pointer + 0x13)
-        file_pointer.write(st.pack("B",stats[9]))
-        file_pointer.seek(start_pointer + 0x14)
-        file_pointer.write(st.pack("H",stats[10]))
-        file_pointer.seek(start_pointer + 0x2B)
-        file_pointer.write(st.pack("H",stats[11]))
-        file_pointer.seek(start_pointer + 0x2D)
-        file_pointer.write(st.pack("H",stats[12]))
-        file_pointer.seek(technumber_pointer)
-        file_pointer.write(st.pack("B",stats[13]))
-        file_pointer.seek(techlist_pointer)
-        file_pointer.write(st.pack("B",stats[14]))
+        rom.writeU16(start_pointer + 0x3,stats[0])
+        rom.writeU16(start_pointer + 0x5,stats[0])
+        rom.writeU16(start_pointer + 0x7,stats[1])
+        rom.writeU16(start_pointer + 0x9,stats[1])
+        rom.writeU8(start_pointer + 0xB,stats[2])
+        rom.writeU8(start_pointer + 0xC,stats[3])
+        rom.writeU8(start_pointer + 0xE,stats[4])
+        rom.writeU8(start_pointer + 0xF,stats[5])
+        rom.writeU8(start_pointer + 0x10,stats[6])
+        rom.writeU8(start_pointer + 0x11,stats[7])
+        rom.writeU8(start_pointer + 0x12,stats[8])
+        rom.writeU8(start_pointer + 0x13,stats[9])
+        rom.writeU16(start_pointer + 0x14,stats[10])
+        rom.writeU16(start_pointer + 0x2B,stats[11])
+        rom.writeU16(start_pointer + 0x2D,stats[12])
+        rom.writeU8(technumber_pointer,stats[13])
+        rom.writeU8(techlist_pointer,stats[14])
 
-def write_chars(file_pointer,char_dict,locked_chars,lost_worlds,outfile):
+def write_chars(rom,char_dict,locked_chars,lost_worlds):
       char_keys = ["start","start2","cathedral","castle","proto","burrow","dactyl"]
       loadchars = [0x57,0x5C,0x62,0x6A,0x68,0x6C,0x6D]
       charnames = [0x39D7E,0x39D80,0x377090,0x5F6E5,0x372AB7,0x38932D,0x3BB90E]
@@ -108,39 +88,31 @@ def write_chars(file_pointer,char_dict,locked_chars,lost_worlds,outfile):
           chars3[4] = 0x372AC3
           chars4[4] = 0x372ADD
           charloads[4] = 0x372ADE
-          patch.write_patch("patches/locked_chars.ips",outfile)		  
+          patch.write_patch("patches/locked_chars.ips",rom)		  
       i = 0
       while i < 7:
             char = char_dict[char_keys[i]][0]
-            file_pointer.seek(charnames[i])
-            file_pointer.write(st.pack("B",char | 0xC0))
-            file_pointer.seek(chars[i])
-            file_pointer.write(st.pack("B",char))
+            rom.writeU8(charnames[i],char | 0xC0)
+            rom.writeU8(chars[i],char)
             if i < 2:
                 i += 1
                 continue
-            file_pointer.seek(chars2[i])
-            file_pointer.write(st.pack("B",char))
-            file_pointer.seek(chars3[i])
-            file_pointer.write(st.pack("B",char))
-            file_pointer.seek(chars4[i])
-            file_pointer.write(st.pack("B",char))
+            rom.writeU8(chars2[i],char)
+            rom.writeU8(chars3[i],char)
+            rom.writeU8(chars4[i],char)
             if chars4[i] != charloads[i]:
-                file_pointer.seek(charloads[i])
-                file_pointer.write(st.pack("B",loadchars[char]))
+                rom.writeU8(charloads[i],loadchars[char])
             i += 1
 
-def randomize_char_positions(outfile,locked_chars,lost_worlds):
-    f = open(outfile,"r+b")
+def randomize_char_positions(rom,rand,locked_chars,lost_worlds):
     character_locations = {"start": "", "start2": "", "cathedral": "", "castle": "", "proto": "", "burrow": "", "dactyl": ""}
     characters = [chrono, marle, lucca, robo, frog, ayla, magus]
     for location in character_locations:
         character_locations[location] = rand.choice(characters)
         chosen_char = character_locations[location]
-        set_stats(f,chosen_char,location,lost_worlds)
+        set_stats(rom,chosen_char,location,lost_worlds)
         characters.remove(chosen_char)
-    write_chars(f,character_locations,locked_chars,lost_worlds,outfile)
-    f.close()
+    write_chars(rom,character_locations,locked_chars,lost_worlds)
     return character_locations
 
 if __name__ == "__main__":
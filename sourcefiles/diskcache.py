@@ -0,0 +1,93 @@
+import os
+import threading
+
+#
+# This file holds the file handling shared by the disk caches.
+#
+# The base ROM cache, the seed cache and the compiled patch cache keep
+# one file per entry.  Files are written under a temporary name and
+# moved into place, so other threads and processes never see a partial
+# file and several processes can share a cache directory.
+#
+# The base ROM and seed caches are LRU and bounded in size.  The file
+# modification time tracks use: reading an entry touches its file, and
+# eviction removes the oldest files first until the cache fits.
+#
+
+#
+# Write a cache file.  Failing to write the file is not an error.
+#
+# param: path - Path of the cache file
+# param: chunks - bytes-like objects written to the file one after another
+# return: True if the file was written
+#
+def write_file(path, *chunks):
+  tempPath = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+  try:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(tempPath, "wb") as cacheFile:
+      for chunk in chunks:
+        cacheFile.write(chunk)
+    os.replace(tempPath, path)
+  except OSError:
+    if os.path.exists(tempPath):
+      os.remove(tempPath)
+    return False
+  return True
+# end write_file
+
+#
+# Read a cache file and mark it as recently used.
+#
+# param: path - Path of the cache file
+# return: bytes object holding the file, or None if it can not be read
+#
+def read_file(path):
+  try:
+    with open(path, "rb") as cacheFile:
+      data = cacheFile.read()
+    os.utime(path)
+  except OSError:
+    return None
+  return data
+# end read_file
+
+#
+# Remove the least recently used files of a cache directory until the
+# cache fits in its size limit.
+#
+# param: directory - Cache directory
+# param: extension - Extension of the cache files, other files are kept
+# param: maxBytes - Size limit of the cache in bytes
+# return: Number of files removed
+#
+def evict(directory, extension, maxBytes):
+  try:
+    names = os.listdir(directory)
+  except OSError:
+    return 0
+  entries = []
+  totalSize = 0
+  for name in names:
+    if not name.endswith(extension):
+      continue
+    path = os.path.join(directory, name)
+    try:
+      info = os.stat(path)
+    except OSError:
+      continue
+    entries.append((info.st_mtime_ns, info.st_size, path))
+    totalSize += info.st_size
+  entries.sort()
+  removed = 0
+  for mtime, size, path in entries:
+    if totalSize <= maxBytes:
+      break
+    try:
+      os.remove(path)
+      totalSize -= size
+      removed += 1
+    except OSError:
+      pass
+  return removed
+# end evict
@@ -1,5 +1,3 @@
-import struct as st
-import random as rand
 import patcher as bossmutator
 llvlitems = [0x95,0x98,0x99,0x97,0x96,0xA4,0x02,0x03,0x12,0x13,0x20,0x21,0x2F,0x30,0x3C,0x7E,0x7F,0x80,0x5C,0x5D,0x5E,
 0x5F,0x60,0x61]
@@ -37,24 +35,22 @@ uncommon_enemy_ids = [0x01,0x03,0x04,0x05,0x16,0x17,0x1D,0x22,0x26,0x27,0x29,0x2
 rare_enemy_ids = [0x02,0x07,0x09,0x0E,0x1B,0x20,0x28,0x2B,0x2D,0x30,0x39,0x3A,0x3B,0x40,0x41,0x42,0x49,0x52,0x53,0x56,0x58,
 0x59,0x62,0x6A,0x6D,0x70,0x75,0x76,0x7A,0x81,0x84,0x85,0x8B,0x8E,0x96,0xA4,0xAA,0xAC,0xC1,0xC8,0xD5,0xD6,0xD9,0xE2,0xE3,0xE4,0xE5,0xF1]
 rarest_enemy_ids = [0,0x2C,0x43,0x5F,0x82]
-def randomize_enemy_stuff(f,difficulty):
-  outfile = f
-  f = open(f, "r+b")
-  randomize_boss_stuff(f,difficulty)
-  randomize_midbosses(outfile,f)
+def randomize_enemy_stuff(rom,rand,difficulty):
+  randomize_boss_stuff(rom,rand,difficulty)
+  randomize_midbosses(rom,rand)
   if difficulty == "hard":
       for enemy in common_enemy_ids:
           drop = 0
           charm = 0
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in uncommon_enemy_ids:
           drop = 0
           charm = rand.choice(mlvlconsumables + glvlconsumables)
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in rare_enemy_ids:
           drop = rand.choice(plvlconsumables+mlvlconsumables+glvlconsumables)
           charm = rand.choice(mlvlitems+glvlitems)
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in rarest_enemy_ids:
           rand_num = rand.randrange(0,10,1)
           if rand_num > 8:
@@ -64,7 +60,7 @@ def randomize_enemy_stuff(f,difficulty):
           charm = drop
           if rand_num < 7:
               drop = 0
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
   else:
       for enemy in common_enemy_ids:
           rand_num = rand.randrange(0,10,1)
@@ -75,7 +71,7 @@ def randomize_enemy_stuff(f,difficulty):
           charm = drop
           if rand_num < 5:
               drop = 0	 
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in uncommon_enemy_ids:
           rand_num = rand.randrange(0,10,1)
           if rand_num > 7:
@@ -85,7 +81,7 @@ def randomize_enemy_stuff(f,difficulty):
           charm = drop
           if rand_num < 6:
               drop = 0	 
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in rare_enemy_ids:
           rand_num = rand.randrange(0,10,1)
           if rand_num > 7:
@@ -95,7 +91,7 @@ def randomize_enemy_stuff(f,difficulty):
           charm = drop
           if rand_num < 6:
               drop = 0	 
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
       for enemy in rarest_enemy_ids:
           rand_num = rand.randrange(0,10,1)
           if rand_num > 8:
@@ -105,19 +101,17 @@ def randomize_enemy_stuff(f,difficulty):
           charm = drop
           if rand_num < 7:
               drop = 0	 
-          write_enemy_stuff(drop,charm,f,enemy)
+          write_enemy_stuff(drop,charm,rom,enemy)
   #Small block to randomize status inflicted by Obstacle/Chaotic Zone
   rand_num = rand.randrange(0,10,1)
-  f.seek(0xC7EEB)
 #  if rand_num < 2:
 #      status_effect = rand.choice(1,0x40) #Blind, Poison
   if rand_num < 8:
       status_effect = rand.choice([2,8,0x20]) #Sleep, Lock, Slow
   else:
       status_effect = rand.choice([4,0x80]) #Chaos, Stop
-  f.write(st.pack("B",status_effect))
-  f.close()
-def randomize_boss_stuff(f,difficulty):
+  rom.writeU8(0xC7EEB,status_effect)
+def randomize_boss_stuff(rom,rand,difficulty):
     for id in early_boss_ids:
         rand_num = rand.randrange(0,100,1)
         if rand_num > 94:
@@ -140,7 +134,7 @@ def randomize_boss_stuff(f,difficulty):
             rand_num = rand.randrange(0,100,1)
             if rand_num > 49:
                 drop = 0
-        write_enemy_stuff(drop,charm,f,id)
+        write_enemy_stuff(drop,charm,rom,id)
     for id in mid_boss_ids:
         rand_num = rand.randrange(0,100,1)
         if rand_num > 94:
@@ -159,7 +153,7 @@ def randomize_boss_stuff(f,difficulty):
         rand_num = rand.randrange(0,100,1)
         if rand_num > 74 or (difficulty == "hard" and rand_num > 49):
             drop = rand.choice(mlvlconsumables + glvlconsumables + hlvlconsumables + alvlconsumables)
-        write_enemy_stuff(drop,charm,f,id)
+        write_enemy_stuff(drop,charm,rom,id)
     for id in late_boss_ids:
         rand_num = rand.randrange(0,100,1)
         if rand_num > 94:
@@ -174,40 +168,36 @@ def randomize_boss_stuff(f,difficulty):
         rand_num = rand.randrange(0,100,1)
         if rand_num > 74 or (difficulty == "hard" and rand_num > 49):
             drop = rand.choice(mlvlconsumables + glvlconsumables + hlvlconsumables + alvlconsumables)
-        write_enemy_stuff(drop,charm,f,id)
-def randomize_midbosses(outfile,f):
+        write_enemy_stuff(drop,charm,rom,id)
+def randomize_midbosses(rom,rand):
     magus_hp = rand.randrange(10000,16000,1000)
     tyrano_hp = rand.randrange(8000,14000,1000)
     magus_select = rand.randrange(0,7)
     tyrano_element = rand.randrange(0,5)
-    f.seek(0xC57E4)
-    f.write(st.pack("H",tyrano_hp))
-    f.seek(0xC5D5F)
-    f.write(st.pack("H",magus_hp))
+    rom.writeU16(0xC57E4,tyrano_hp)
+    rom.writeU16(0xC5D5F,magus_hp)
     if magus_select == 0:
-       bossmutator.patch_file("patches/magus_c.txt",outfile)
+       bossmutator.patch_file("patches/magus_c.txt",rom)
     elif magus_select == 1:
-       bossmutator.patch_file("patches/magus_m.txt",outfile)
+       bossmutator.patch_file("patches/magus_m.txt",rom)
     elif magus_select == 2:
-       bossmutator.patch_file("patches/magus_l.txt",outfile)
+       bossmutator.patch_file("patches/magus_l.txt",rom)
     elif magus_select == 3:
-       bossmutator.patch_file("patches/magus_r.txt",outfile)
+       bossmutator.patch_file("patches/magus_r.txt",rom)
     elif magus_select == 4:
-       bossmutator.patch_file("patches/magus_f.txt",outfile)
+       bossmutator.patch_file("patches/magus_f.txt",rom)
     elif magus_select == 5:
-       bossmutator.patch_file("patches/magus_a.txt",outfile)
+       bossmutator.patch_file("patches/magus_a.txt",rom)
     if tyrano_element == 0:
-       bossmutator.patch_file("patches/tyrano_i.txt",outfile)
+       bossmutator.patch_file("patches/tyrano_i.txt",rom)
     elif tyrano_element == 1:
-       bossmutator.patch_file("patches/tyrano_l.txt",outfile)
+       bossmutator.patch_file("patches/tyrano_l.txt",rom)
     elif tyrano_element == 2:
-       bossmutator.patch_file("patches/tyrano_s.txt",outfile)
+       bossmutator.patch_file("patches/tyrano_s.txt",rom)
     elif tyrano_element == 3:
-       bossmutator.patch_file("patches/tyrano_n.txt",outfile)
-def write_enemy_stuff(drop,charm,f,enemy_id):
-  f.seek(enemy_drop_address + 7 * (enemy_id))
-  f.write(st.pack("B",drop))
-  f.seek(enemy_charm_address + 7 * (enemy_id))
-  f.write(st.pack("B", charm))
+       bossmutator.patch_file("patches/tyrano_n.txt",rom)
+def write_enemy_stuff(drop,charm,rom,enemy_id):
+  rom.writeU8(enemy_drop_address + 7 * (enemy_id),drop)
+  rom.writeU8(enemy_charm_address + 7 * (enemy_id),charm)
 if __name__ == "__main__":
    randomize_enemy_stuff("Project.sfc")
@@ -0,0 +1,279 @@
+import copy
+import hashlib
+import random
+
+#
+# This file holds the state for generating a single seed.
+#
+# Nothing about a seed in progress is stored in module variables.  The
+# settings, the random number generator, the ROM image and the spoiler log
+# are kept in a GenerationContext that is passed to every stage, so any
+# number of seeds can be generated in one process, one after another or
+# at the same time from different threads.
+#
+
+# Names of the stages that draw random numbers.  Each stage gets its own
+# random number stream derived from the seed and the stage name, so a
+# change in how many numbers one stage draws does not change the others.
+stageNames = ["tabs", "treasures", "hardcoded_items", "enemies", "shops",
+              "shop_prices", "characters", "key_items", "bosses", "techs"]
+
+# Flags that can be checked in the GUI, in the order they appear in the
+# flag string.
+flagOrder = ["g", "s", "d", "q", "l", "ro", "b", "z", "p", "c", "m", "tb", "cr"]
+
+# Names of the Settings attributes for each checkbox flag.
+flagSettings = {"g": "glitch_fixes", "s": "fast_move", "d": "sense_dpad",
+                "q": "quiet_mode", "l": "lost_worlds", "ro": "boss_rando",
+                "b": "boss_scaler", "z": "zeal_end", "p": "quick_pendant",
+                "c": "locked_chars", "m": "unlocked_magic", "cr": "chronosanity",
+                "tb": "tab_treasures"}
+
+# Flag string suffixes for the shop price settings.
+shopPriceFlags = {"Free": "spf", "Mostly Random": "spm", "Fully Random": "spr"}
+
+# Flag strings of the presets offered by the GUI (see randomizergui.py).
+presetFlags = {"Race": "ngsdzpte", "New Player": "egsdzpmte",
+               "Lost Worlds": "ngsdlzte", "Hard": "hgsdbctex"}
+
+# Tech and shop price flag suffixes.  A flag string ends with an optional
+# tech flag followed by an optional shop price flag.
+flagSuffixes = sorted({techFlag + shopFlag for techFlag in ["tex", "te", ""]
+                       for shopFlag in list(shopPriceFlags.values()) + [""]},
+                      key=len, reverse=True)
+
+# Optional separator between the checkbox flags and the suffix, see
+# Settings.getFlagString.
+SUFFIX_SEPARATOR = "-"
+
+#
+# Match the checkbox flags of a flag string.
+#
+# param: flagString - The checkbox part of a flag string
+# param: position - Position of the first checkbox flag
+# param: index - Index in flagOrder of the first flag that can match
+# return: List of the matched flags in flagOrder, or None if the string
+#         is not made of checkbox flags
+#
+def matchFlags(flagString, position, index):
+  if position == len(flagString):
+    return []
+  for flagIndex in range(index, len(flagOrder)):
+    flag = flagOrder[flagIndex]
+    if flagString.startswith(flag, position):
+      # Some flags start with another flag ("c" and "cr"), so a flag is
+      # only taken if the rest of the string can still be read after it.
+      rest = matchFlags(flagString, position + len(flag), flagIndex + 1)
+      if rest is not None:
+        return [flag] + rest
+  return None
+
+#
+# The Settings class holds the options chosen for a seed.
+# Checkbox flags are stored as "Y"/"N" the same way the writers expect them.
+#
+class Settings:
+  def __init__(self):
+    self.difficulty = "normal"
+    for name in flagSettings.values():
+      setattr(self, name, "N")
+    self.tech_list = "Normal"
+    self.shop_prices = "Normal"
+
+  #
+  # Create a Settings object from a flag string.
+  #
+  # The flag string is read in the format the GUI builds: an optional
+  # difficulty letter (e/n/h), the checked flags in flagOrder, te/tex for
+  # tech randomization and spf/spm/spr for shop prices.  The checked flags
+  # can be separated from the tech and shop price flags by a "-".
+  #
+  # Without the separator the format is ambiguous: "nspm" is either fast
+  # move, early pendant and unlocked magic, or Mostly Random shop prices.
+  # The longest tech and shop price suffix is taken, and getFlagString
+  # adds the separator when the other reading is meant.
+  #
+  # param: flagString - The flag string to parse
+  # return: A new Settings object
+  # raise: ValueError if the flag string can not be parsed
+  #
+  @staticmethod
+  def fromFlagString(flagString):
+    settings = Settings()
+    position = 0
+    for difficulty in ["easy", "normal", "hard"]:
+      if flagString.startswith(difficulty[0]):
+        settings.difficulty = difficulty
+        position = 1
+    rest = flagString[position:]
+
+    flags = None
+    if SUFFIX_SEPARATOR in rest:
+      checkboxFlags, suffix = rest.split(SUFFIX_SEPARATOR, 1)
+      if suffix in flagSuffixes:
+        flags = matchFlags(checkboxFlags, 0, 0)
+    else:
+      for suffix in flagSuffixes:
+        if rest.endswith(suffix):
+          flags = matchFlags(rest[:len(rest) - len(suffix)], 0, 0)
+          if flags is not None:
+            break
+    if flags is None:
+      raise ValueError("Invalid flag string: " + flagString)
+
+    for flag in flags:
+      setattr(settings, flagSettings[flag], "Y")
+    if suffix.startswith("tex"):
+      settings.tech_list = "Balanced Random"
+    elif suffix.startswith("te"):
+      settings.tech_list = "Fully Random"
+    for shopPrices, shopFlag in shopPriceFlags.items():
+      if suffix.endswith(shopFlag):
+        settings.shop_prices = shopPrices
+    return settings
+
+  #
+  # Get the flag string for these settings, as used in output file names.
+  #
+  # return: The flag string
+  #
+  def getFlagString(self):
+    flags = self.difficulty[0]
+    for flag in flagOrder:
+      if getattr(self, flagSettings[flag]) == "Y":
+        flags = flags + flag
+    suffix = ""
+    if self.tech_list == "Fully Random":
+      suffix = "te"
+    elif self.tech_list == "Balanced Random":
+      suffix = "tex"
+    suffix = suffix + shopPriceFlags.get(self.shop_prices, "")
+    # Only separate the suffix when the flag string would be read back
+    # differently without it, so other flag strings stay as they were.
+    if vars(Settings.fromFlagString(flags + suffix)) != vars(self):
+      return flags + SUFFIX_SEPARATOR + suffix
+    return flags + suffix
+# end Settings class
+
+#
+# The SpoilerLog class collects the spoiler log for a seed in memory.
+# It is only written to disk if the caller asks for it.
+#
+class SpoilerLog:
+  def __init__(self):
+    self.parts = []
+
+  #
+  # Add text to the spoiler log.
+  #
+  # param: text - The text to add
+  #
+  def write(self, text):
+    self.parts.append(text)
+
+  #
+  # Check whether anything was written to the spoiler log.
+  #
+  # return: True if the spoiler log is empty
+  #
+  def isEmpty(self):
+    return len(self.parts) == 0
+
+  #
+  # Get the contents of the spoiler log.
+  #
+  # return: The spoiler log text
+  #
+  def getText(self):
+    return "".join(self.parts)
+
+  #
+  # Write the spoiler log to a file.
+  #
+  # param: filename - Name of the file to write
+  #
+  def writeToFile(self, filename):
+    with open(filename, "w+") as spoilerFile:
+      spoilerFile.write(self.getText())
+# end SpoilerLog class
+
+#
+# Get the seed of a stage's random number stream.
+#
+# The stage seed is taken from a SHA-256 hash of the seed and the stage
+# name, so it is the same on every platform and Python version (unlike
+# hash(), which is salted per process).
+#
+# param: seed - The seed string
+# param: stageName - Name of the stage, one of stageNames
+# return: Integer seed for the stage's random.Random
+#
+def getStageSeed(seed, stageName):
+  digest = hashlib.sha256(("%s\0%s" % (seed, stageName)).encode("utf-8")).digest()
+  return int.from_bytes(digest[:8], "little")
+
+#
+# The GenerationContext class holds everything needed to generate one seed.
+#
+#   settings - The Settings for the seed
+#   seed     - The seed string
+#   rom      - The RomImage being randomized
+#   spoiler  - The SpoilerLog for the seed
+#   profiler - stageprofiler.Profiler measuring the seed, or None
+#   stats    - Dictionary of counters reported by the running stage
+#              (e.g. placement attempts), collected by the profiler
+#   quiet    - True to not print the progress messages of the stages
+#
+# Stages do not share a random number generator.  Each stage asks the
+# context for its own stream with getRandom, so stages can be run in any
+# order and still produce the same result.
+#
+class GenerationContext:
+  def __init__(self, settings, seed, rom, spoiler=None):
+    self.settings = settings
+    self.seed = seed
+    self.rom = rom
+    if spoiler is None:
+      spoiler = SpoilerLog()
+    self.spoiler = spoiler
+    self.profiler = None
+    self.stats = {}
+    self.quiet = False
+
+  #
+  # Print a progress message unless the context is quiet.
+  #
+  # param: message - The message to print
+  #
+  def progress(self, message):
+    if not self.quiet:
+      print(message)
+
+  #
+  # Get a new random number generator for a stage.
+  # Every call returns a generator at the start of the stage's stream.
+  #
+  # param: stageName - Name of the stage, one of stageNames
+  # return: A random.Random seeded for the stage
+  # raise: ValueError if the stage name is unknown
+  #
+  def getRandom(self, stageName):
+    if stageName not in stageNames:
+      raise ValueError("Unknown stage: " + stageName)
+    return random.Random(getStageSeed(self.seed, stageName))
+
+  #
+  # Get the context a single stage runs with.  It shares the settings and
+  # seed of this context, but has its own ROM view and spoiler log so the
+  # stage's output and counters can be collected separately.
+  #
+  # param: rom - The ROM image or view the stage works on
+  # return: A new GenerationContext for the stage
+  #
+  def forStage(self, rom):
+    stageContext = copy.copy(self)
+    stageContext.rom = rom
+    stageContext.spoiler = SpoilerLog()
+    stageContext.stats = {}
+    return stageContext
+# end GenerationContext class
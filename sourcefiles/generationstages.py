@@ -0,0 +1,283 @@
+import treasurewriter as treasures
+import specialwriter as hardcoded_items
+import shopwriter as shops
+import characterwriter as char_slots
+import ipswriter as bigpatches
+import enemywriter as enemystuff
+import tabchange as tabwriter
+import patchcomposer
+from stagegraph import Stage
+
+#
+# This file holds the stages of seed generation and the ROM regions
+# each of them reads and writes.  See stagegraph.py for how the stages
+# are scheduled.
+#
+# The regions are taken from the address tables of the writers.  Stages
+# whose regions depend on a patch (locked characters, quiet mode, the
+# Lost Worlds fixes) read them from the patch itself.
+#
+# The writers that only some flags use (key item logic, boss scaling,
+# boss randomization, tech order) are imported by the functions that
+# use them, so a seed only loads the writers its flags need.
+#
+
+# Tab rewrite routines and their descriptions
+TAB_REGIONS = [(0x02B2D0, 0x02B2D4), (0x02B2F8, 0x02B2FC), (0x375DC4, 0x375DDA),
+               (0x5F0000, 0x5F0200)]
+
+# Treasure chest contents
+TREASURE_REGIONS = [(0x35F404, 0x35F7E0)]
+
+# Sealed chests, trades, rocks and other hardcoded items
+HARDCODED_REGIONS = [
+  (0x392FD, 0x3931A), (0x393D0, 0x393DF), (0x393F8, 0x39400), (0xC3328, 0xC332D),
+  (0x19FE7C, 0x19FE84), (0x1B03A4, 0x1B03B2), (0x1B03CD, 0x1B03D1), (0x1B03EF, 0x1B0405),
+  (0x1B31C7, 0x1B31CB), (0x1B4CEC, 0x1B4CEF), (0x1B90EA, 0x1B90F3), (0x1B9123, 0x1B9127),
+  (0x1BA717, 0x1BA718), (0x1BA72B, 0x1BA72C), (0x1BAB33, 0x1BAB36), (0x1BAB62, 0x1BAB65),
+  (0x1BACD6, 0x1BACD9), (0x1BACF7, 0x1BACFA), (0x1BAEF4, 0x1BAEFA), (0x1BAF0A, 0x1BAF10),
+  (0x1BD9B3, 0x1BD9B6), (0x24EC29, 0x24EC3E), (0x30FBE9, 0x30FBED), (0x35F57C, 0x35F57D),
+  (0x35F73C, 0x35F73D), (0x35F89B, 0x35F89E), (0x35F8AE, 0x35F8B1), (0x38EB03, 0x38EB07),
+  (0x39024E, 0x39024F), (0x39026B, 0x3902BA), (0x3908B5, 0x3908B6), (0x3908C9, 0x3908CA),
+  (0x39633B, 0x39633E), (0x397916, 0x39791A), (0x3AED24, 0x3AED27), (0x3AEF65, 0x3AEF68)]
+
+# Enemy stats (23 bytes per enemy) and rewards (7 bytes per enemy)
+ENEMY_STAT_REGION = (0xC4700, 0xC5E00)
+ENEMY_REWARD_REGION = (0xC5E00, 0xC6500)
+
+# Enemy drops, charms and the few enemies that are changed directly
+ENEMY_REGIONS = [
+  (0xC57E4, 0xC57E6), (0xC5D5F, 0xC5D61), ENEMY_REWARD_REGION, (0xC6FB3, 0xC6FBE),
+  (0xC7EEB, 0xC7EEC), (0xCB4A6, 0xCB500), (0xCC9B8, 0xCC9B9), (0xCCBC9, 0xCDDBD),
+  (0x24FFBA, 0x24FFBE), (0x360A48, 0x360A49)]
+
+# Shop pointers, the warranty shop and the shop item lists
+SHOP_REGIONS = [(0xC2C6F, 0xC2C9D), (0x1AFC29, 0x1AFCEE)]
+
+# Item, accessory and consumable prices
+SHOP_PRICE_REGIONS = [(0xC06A5, 0xC0B5E)]
+
+# Character stats and the character recruitment events
+CHARACTER_REGIONS = [
+  (0x39CCF, 0x39CD6), (0x39D7E, 0x39D85), (0x5F5EE, 0x5F5EF), (0x5F6DD, 0x5F6E9),
+  (0xC0000, 0xC0240), (0x372A6F, 0x372A70), (0x372AAD, 0x372AC4), (0x372ADB, 0x372ADF),
+  (0x376FEB, 0x376FEC), (0x377088, 0x37709A), (0x3770D1, 0x3770D3), (0x389275, 0x389276),
+  (0x389323, 0x389337), (0x389352, 0x389354), (0x3BB8FA, 0x3BB917), (0x3BB927, 0x3BB929)]
+
+# Key item events
+KEY_ITEM_REGIONS = [
+  (0x3966B, 0x3966E), (0x6EF5E, 0x6EF62), (0x18FC04, 0x18FC08), (0x1B1844, 0x1B1847),
+  (0x1B8ABB, 0x1B8AC0), (0x1B8D95, 0x1B8D98), (0x35F888, 0x35F88B), (0x3773F1, 0x3773F4),
+  (0x38045D, 0x380460), (0x3805DE, 0x3805E1), (0x380C42, 0x380C43), (0x380C5B, 0x380C5C),
+  (0x381010, 0x381014), (0x3891DE, 0x3891E1), (0x392F4C, 0x392F4F), (0x393C83, 0x393C86)]
+
+# Tech data, menu and combo tech tables
+TECH_REGIONS = [
+  (0xC15CF, 0xC1837), (0xC1ACD, 0xC1B3D), (0xC1BF9, 0xC20EF), (0xC214B, 0xC23EB),
+  (0xC253C, 0xC2574), (0xC27FA, 0xC289F), (0xC2953, 0xC2962), (0xC3A0B, 0xC3A7B),
+  (0xD45AD, 0xD4735), (0x3FF831, 0x3FF84A)]
+
+# Tyrano Castle chest hack
+TYRANO_CHEST_REGION = (0x35F6D5, 0x35F6D6)
+
+LOCKED_CHARS_PATCH = "patches/locked_chars.ips"
+QUIET_MODE_PATCH = "patches/nomusic.ips"
+
+#
+# Get the regions written by a list of patches.
+#
+# param: patchList - List of patch file names
+# return: List of (start, end) tuples
+#
+def getPatchRegions(patchList):
+  runs, conflicts = patchcomposer.compose(patchList)
+  return [(offset, offset + len(payload)) for offset, payload in runs]
+
+#
+# Get the regions written by the boss scaler, from its boss stat tables.
+#
+# return: List of (start, end) tuples
+#
+def getBossScalingRegions():
+  import bossscaler as boss_scale
+  regions = []
+  halfwordStats = [0, 6, 7]
+  for boss in [boss_scale.retinite_core, boss_scale.retinite_legs, boss_scale.retinite_head,
+               boss_scale.display, boss_scale.motherbrain, boss_scale.yakraxiii,
+               boss_scale.dragon_tank, boss_scale.dragon_wheel, boss_scale.dragon_head,
+               boss_scale.giga_gaia, boss_scale.rusttyrano, boss_scale.nizbel,
+               boss_scale.gaia_right, boss_scale.gaia_left, boss_scale.bit,
+               boss_scale.guardian, boss_scale.sonofsun, boss_scale.sos_flame,
+               boss_scale.rseries]:
+    for index, address in enumerate(boss):
+      if address == "":
+        continue
+      size = 2 if index in halfwordStats else 1
+      regions.append((address, address + size))
+  return regions
+
+#
+# Get the regions written by the boss randomizer.
+#
+# return: List of (start, end) tuples
+#
+def getBossRandoRegions():
+  import bossrando as boss_shuffler
+  regions = [ENEMY_STAT_REGION, ENEMY_REWARD_REGION]
+  for spot in boss_shuffler.spots:
+    regions.append((spot, spot + 2))
+  return regions
+
+#
+# Stage functions.  Each one takes (ctx, rom, inputs) as described in
+# stagegraph.Stage and must only use the rom it is given.
+#
+
+def rewriteTabs(ctx, rom, inputs):
+  #Psuedoarc's code to rewrite Power and Magic tabs and make them more impactful
+  tabwriter.rewrite_tabs(rom, ctx.getRandom("tabs"))
+
+def randomizeTreasures(ctx, rom, inputs):
+  ctx.progress("Randomizing treasures...")
+  treasures.randomize_treasures(rom, ctx.getRandom("treasures"),
+                                ctx.settings.difficulty, ctx.settings.tab_treasures)
+
+def randomizeHardcodedItems(ctx, rom, inputs):
+  hardcoded_items.randomize_hardcoded_items(rom, ctx.getRandom("hardcoded_items"),
+                                            ctx.settings.tab_treasures)
+
+def randomizeEnemies(ctx, rom, inputs):
+  ctx.progress("Randomizing enemy loot...")
+  enemystuff.randomize_enemy_stuff(rom, ctx.getRandom("enemies"), ctx.settings.difficulty)
+
+def randomizeShops(ctx, rom, inputs):
+  ctx.progress("Randomizing shops...")
+  shops.randomize_shops(rom, ctx.getRandom("shops"))
+
+def modifyShopPrices(ctx, rom, inputs):
+  shops.modify_shop_prices(rom, ctx.getRandom("shop_prices"), ctx.settings.shop_prices)
+
+def randomizeCharacters(ctx, rom, inputs):
+  ctx.progress("Randomizing character locations...")
+  charLocations = char_slots.randomize_char_positions(
+      rom, ctx.getRandom("characters"), ctx.settings.locked_chars, ctx.settings.lost_worlds)
+  return {"char_locs": charLocations}
+
+def placeKeyItems(ctx, rom, inputs):
+  settings = ctx.settings
+  rand = ctx.getRandom("key_items")
+  ctx.progress("Now placing key items...")
+  # The logic writers rename the characters in the dictionary they are
+  # given, so they get a copy and the renamed copy is passed on.
+  charLocations = dict(inputs["char_locs"])
+  keyLocations = None
+  if settings.chronosanity == "Y":
+    import logicwriter_chronosanity as chronosanity_logic
+    keyLocations = chronosanity_logic.writeKeyItems(
+        rom, rand, charLocations, (settings.locked_chars == "Y"), (settings.quick_pendant == "Y"),
+        settings.lost_worlds == "Y", ctx.spoiler, ctx.stats)
+  elif settings.lost_worlds == "Y":
+    import logicwriter as keyitems
+    keyLocations = keyitems.randomize_lost_worlds_keys(charLocations, rom, rand, ctx.spoiler,
+                                                       ctx.stats)
+  else:
+    import logicwriter as keyitems
+    keyLocations = keyitems.randomize_keys(charLocations, rom, rand, settings.locked_chars,
+                                           ctx.spoiler, ctx.stats)
+  return {"key_locations": keyLocations, "char_names": charLocations}
+
+def scaleBosses(ctx, rom, inputs):
+  import bossscaler as boss_scale
+  ctx.progress("Rescaling bosses based on key items..")
+  boss_scale.scale_bosses(inputs["char_names"], inputs["key_locations"],
+                          ctx.settings.locked_chars, rom)
+
+def randomizeBosses(ctx, rom, inputs):
+  import bossrando as boss_shuffler
+  boss_shuffler.randomize_bosses(rom, ctx.getRandom("bosses"), ctx.settings.difficulty)
+
+def randomizeTechs(ctx, rom, inputs):
+  import techwriter as tech_order
+  if ctx.settings.tech_list == "Balanced Random":
+    tech_order.take_pointer_balanced(rom, ctx.getRandom("techs"))
+  else:
+    tech_order.take_pointer(rom, ctx.getRandom("techs"))
+
+def applyQuietMode(ctx, rom, inputs):
+  bigpatches.write_patch(QUIET_MODE_PATCH, rom)
+
+def applyFixes(ctx, rom, inputs):
+  # Tyrano Castle chest hack
+  rom.writeU8(TYRANO_CHEST_REGION[0], 1)
+  lostWorldsFixes = getLostWorldsFixes(ctx.settings)
+  if len(lostWorldsFixes) > 0:
+    patchcomposer.apply_patches(lostWorldsFixes, rom)
+
+#
+# Get the event fix patches needed for Lost Worlds.
+#
+# param: settings - Settings for the seed
+# return: List of patch file names, empty if Lost Worlds is off
+#
+def getLostWorldsFixes(settings):
+  if settings.lost_worlds != "Y":
+    return []
+  #Mystic Mtn event fix in Lost Worlds
+  fixes = ["patches/mysticmtnfix.ips", "patches/losteot.ips"]
+  #Bangor Dome event fix if character locks are on
+  if settings.locked_chars == "Y":
+    fixes.append("patches/bangorfix.ips")
+  return fixes
+
+#
+# Get the stages needed to generate a seed with the given settings.
+#
+# param: settings - Settings for the seed
+# return: List of Stage objects in sequential order
+#
+def getStages(settings):
+  stages = [
+    Stage("tabs", rewriteTabs, writes=TAB_REGIONS),
+    Stage("treasures", randomizeTreasures, writes=TREASURE_REGIONS,
+          settings=["difficulty", "tab_treasures"]),
+    Stage("hardcoded_items", randomizeHardcodedItems, writes=HARDCODED_REGIONS,
+          settings=["tab_treasures"]),
+    Stage("enemies", randomizeEnemies, writes=ENEMY_REGIONS, settings=["difficulty"]),
+    Stage("shops", randomizeShops, writes=SHOP_REGIONS),
+    Stage("shop_prices", modifyShopPrices, writes=SHOP_PRICE_REGIONS,
+          settings=["shop_prices"])]
+
+  characterRegions = list(CHARACTER_REGIONS)
+  if settings.locked_chars == "Y":
+    characterRegions += getPatchRegions([LOCKED_CHARS_PATCH])
+  stages.append(Stage("characters", randomizeCharacters, writes=characterRegions,
+                      provides=["char_locs"], settings=["locked_chars", "lost_worlds"]))
+
+  # Chronosanity can put key items in any chest
+  keyItemRegions = list(KEY_ITEM_REGIONS)
+  if settings.chronosanity == "Y":
+    keyItemRegions += TREASURE_REGIONS + HARDCODED_REGIONS
+  stages.append(Stage("key_items", placeKeyItems, writes=keyItemRegions,
+                      needs=["char_locs"], provides=["key_locations", "char_names"],
+                      settings=["chronosanity", "lost_worlds", "locked_chars", "quick_pendant"]))
+
+  if settings.boss_scaler == "Y" and settings.chronosanity != "Y":
+    stages.append(Stage("boss_scaling", scaleBosses, writes=getBossScalingRegions(),
+                        needs=["char_names", "key_locations"], settings=["locked_chars"]))
+  if settings.boss_rando == "Y":
+    bossRegions = getBossRandoRegions()
+    stages.append(Stage("bosses", randomizeBosses, reads=bossRegions, writes=bossRegions,
+                        settings=["difficulty"]))
+  if settings.tech_list in ["Fully Random", "Balanced Random"]:
+    stages.append(Stage("techs", randomizeTechs, writes=TECH_REGIONS, settings=["tech_list"]))
+  if settings.quiet_mode == "Y":
+    stages.append(Stage("quiet_mode", applyQuietMode,
+                        writes=getPatchRegions([QUIET_MODE_PATCH])))
+
+  fixRegions = [TYRANO_CHEST_REGION]
+  lostWorldsFixes = getLostWorldsFixes(settings)
+  if len(lostWorldsFixes) > 0:
+    fixRegions += getPatchRegions(lostWorldsFixes)
+  stages.append(Stage("fixes", applyFixes, writes=fixRegions,
+                      settings=["lost_worlds", "locked_chars"]))
+  return stages
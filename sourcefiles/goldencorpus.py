@@ -0,0 +1,341 @@
+import argparse
+import concurrent.futures
+import contextlib
+import hashlib
+import json
+import os
+import random
+import sys
+import tempfile
+
+import generationstages
+import patchcomposer
+import randomizer
+import stagegraph
+from generationcontext import GenerationContext, Settings, flagOrder, presetFlags, shopPriceFlags
+
+#
+# This file holds the golden output corpus runner.
+#
+# Performance work on the writers must not change the seeds they
+# generate.  The corpus is a list of (seed, flag string) pairs that
+# together cover every option the GUI offers: every checkbox flag on its
+# own, every difficulty, tech and shop price option, the GUI presets and
+# the combinations that change the logic (Lost Worlds, chronosanity,
+# locked characters, boss options).  Every entry is generated from a
+# synthetic ROM, so no copy of the game is needed.
+#
+# For every entry the corpus file stores the SHA-256 of the ROM and of
+# the spoiler log, and a hash of every 64 KiB block of the ROM.  Running
+# the corpus generates every entry again on a process pool and compares
+# the hashes.  On a mismatch it reports the first differing offset and
+# who wrote it, from the regions every stage actually wrote while
+# generating the entry.  A single byte is owned by the last stage that
+# wrote it; a block lists every stage that wrote into it and the static
+# patches if they touch it.  If the reference ROMs were kept when
+# recording (--reference), the exact offset is reported, otherwise the
+# first differing block.
+#
+#   python goldencorpus.py --record
+#   python goldencorpus.py
+#
+
+CORPUS_FILE = "goldencorpus.json"
+CORPUS_VERSION = 1
+ROM_SIZE = 0x400000
+BLOCK_SIZE = 0x10000
+SEEDS = ["golden", "corpus"]
+
+# Values of a result that are stored in the corpus file
+ENTRY_KEYS = ["seed", "flags", "rom_sha256", "spoiler_sha256", "blocks"]
+
+#
+# Get the flag strings of the corpus.
+#
+# return: List of flag strings
+#
+def getCorpusFlags():
+  flagStrings = ["e", "n", "h"]
+  for flag in flagOrder:
+    flagStrings.append("n" + flag)
+  flagStrings += ["nte", "ntex"]
+  for suffix in shopPriceFlags.values():
+    flagStrings.append("n" + suffix)
+  flagStrings += list(presetFlags.values())
+  flagStrings += [
+    "nlc",            # Lost Worlds with locked characters
+    "hlrobz",         # Lost Worlds with boss options
+    "nlcr",           # Lost Worlds chronosanity
+    "npccr",          # Chronosanity with early pendant and locked characters
+    "hrobcrtex",      # Chronosanity with boss options
+    "hrobtexspm",     # Boss options, balanced techs, mostly random prices
+    "nspm-",          # Fast move, early pendant and unlocked magic
+    "erobctbte",      # Boss options, locked characters, tab treasures
+    "hgsdqlrobzcmtbcrtexspr"]  # Everything
+  return flagStrings
+# end getCorpusFlags
+
+#
+# Build the synthetic ROM data used by the corpus, the benchmarks and
+# the seed server's --synthetic-rom.
+#
+# param: kind - "random" for pseudo random bytes from a fixed seed, as
+#               the corpus uses, or "zero" for a zero filled ROM
+# return: bytes object holding the ROM data
+#
+def makeRomData(kind="random"):
+  if kind == "zero":
+    return bytes(ROM_SIZE)
+  # Same bytes as Random.randbytes, which needs Python 3.9
+  return random.Random(0).getrandbits(8 * ROM_SIZE).to_bytes(ROM_SIZE, "little")
+# end makeRomData
+
+#
+# Get the hash of every block of a ROM.
+#
+# param: data - The ROM data
+# return: List of truncated hex digests, one per BLOCK_SIZE block
+#
+def getBlockHashes(data):
+  return [hashlib.sha256(data[start:start + BLOCK_SIZE]).hexdigest()[:16]
+          for start in range(0, len(data), BLOCK_SIZE)]
+# end getBlockHashes
+
+#
+# Get the name of the file a reference ROM is kept in.
+#
+# param: folder - Reference folder
+# param: seed - Seed of the entry
+# param: flags - Flag string of the entry
+# return: Path without extension
+#
+def getReferencePath(folder, seed, flags):
+  return os.path.join(folder, "%s.%s" % (flags, seed))
+# end getReferencePath
+
+#
+# Find the owners of a range of ROM offsets.
+#
+# The owner of a byte is the last step of generation that wrote it: a
+# stage, or the static patches if no stage wrote it.
+#
+# param: settings - Settings of the entry
+# param: stageWrites - List of (stage name, written regions) tuples in
+#                      stage order, from generateEntry
+# param: start - First offset of the range
+# param: end - End of the range, exclusive
+# return: String naming the owners of the range
+#
+def getOwners(settings, stageWrites, start, end):
+  owners = []
+  for name, regions in stageWrites:
+    if len(stagegraph.intersectRegions(regions, [(start, end)])) > 0:
+      owners.append("stage " + name)
+  if end - start == 1 and len(owners) > 0:
+    return owners[-1]
+  runs, conflicts = patchcomposer.compose(randomizer.get_static_patches(settings))
+  for offset, data in runs:
+    if offset < end and start < offset + len(data):
+      owners.append("static patches")
+      break
+  if len(owners) == 0:
+    return "input ROM"
+  return ", ".join(owners)
+# end getOwners
+
+#
+# Set up a corpus worker process.
+#
+def initWorker():
+  # Progress messages from the writers are not useful here.
+  sys.stdout = open(os.devnull, "w")
+# end initWorker
+
+#
+# Generate one corpus entry in a worker process.
+#
+# param: sourcefile - Path of the synthetic ROM
+# param: referenceFolder - Folder to keep or read the reference output in,
+#                          or None
+# param: record - True to write the reference output, False to compare
+#                 against it
+# param: entry - Tuple of (seed, flag string)
+# return: Dictionary holding the hashes of the entry and the regions
+#         every stage wrote.  When comparing against a kept reference,
+#         the first differing ROM offset and spoiler log line are
+#         included as "rom_offset"/"spoiler_line".
+#
+def generateEntry(sourcefile, referenceFolder, record, entry):
+  seed, flags = entry
+  settings = Settings.fromFlagString(flags)
+  ctx = GenerationContext(settings, seed, randomizer.get_base_rom(settings, sourcefile))
+  # Every writer has to run, so the stage cache is not used.
+  stages = generationstages.getStages(settings)
+  writtenRegions = {}
+  stagegraph.runStages(ctx, stages, writtenRegions=writtenRegions)
+  data = ctx.rom.toBytes()
+  spoiler = ctx.spoiler.getText().encode("utf-8")
+  result = {"seed": seed, "flags": flags,
+            "rom_sha256": hashlib.sha256(data).hexdigest(),
+            "spoiler_sha256": hashlib.sha256(spoiler).hexdigest(),
+            "blocks": getBlockHashes(data),
+            "stage_writes": [(stage.name, writtenRegions[stage.name]) for stage in stages]}
+  if referenceFolder is None:
+    return result
+
+  referencePath = getReferencePath(referenceFolder, seed, flags)
+  if record:
+    with open(referencePath + ".sfc", "wb") as romFile:
+      romFile.write(data)
+    with open(referencePath + ".spoiler.txt", "wb") as spoilerFile:
+      spoilerFile.write(spoiler)
+    return result
+  if os.path.exists(referencePath + ".sfc"):
+    with open(referencePath + ".sfc", "rb") as romFile:
+      reference = romFile.read()
+    result["rom_offset"] = findFirstDifference(reference, data)
+  if os.path.exists(referencePath + ".spoiler.txt"):
+    with open(referencePath + ".spoiler.txt", "rb") as spoilerFile:
+      referenceLines = spoilerFile.read().splitlines()
+    lines = spoiler.splitlines()
+    result["spoiler_line"] = findFirstDifference(referenceLines, lines)
+  return result
+# end generateEntry
+
+#
+# Find the first index where two sequences differ.
+#
+# param: first - Sequence (bytes or list)
+# param: second - Sequence of the same type
+# return: First differing index, or None if the sequences are equal
+#
+def findFirstDifference(first, second):
+  # Skip equal chunks quickly, then look for the byte in the first
+  # chunk that differs.
+  start = 0
+  length = min(len(first), len(second))
+  while start < length and first[start:start + BLOCK_SIZE] == second[start:start + BLOCK_SIZE]:
+    start += BLOCK_SIZE
+  for index in range(start, min(start + BLOCK_SIZE, length)):
+    if first[index] != second[index]:
+      return index
+  if len(first) != len(second):
+    return min(len(first), len(second))
+  return None
+# end findFirstDifference
+
+#
+# Describe the differences between a recorded entry and a new result.
+#
+# param: expected - Recorded entry from the corpus file
+# param: result - Result from generateEntry
+# return: List of description lines, empty if the entry matches
+#
+def describeMismatch(expected, result):
+  lines = []
+  settings = Settings.fromFlagString(result["flags"])
+  if expected["rom_sha256"] != result["rom_sha256"]:
+    offset = result.get("rom_offset")
+    if offset is not None:
+      lines.append("  ROM differs at 0x%06X (%s)" % (offset, getOwners(settings, result["stage_writes"], offset, offset + 1)))
+    else:
+      oldBlocks = expected["blocks"]
+      newBlocks = result["blocks"]
+      block = findFirstDifference(oldBlocks, newBlocks)
+      if block is None:
+        lines.append("  ROM differs (block hashes match)")
+      else:
+        start = block * BLOCK_SIZE
+        end = start + BLOCK_SIZE
+        lines.append("  ROM differs in 0x%06X-0x%06X (%s)" %
+                     (start, end - 1, getOwners(settings, result["stage_writes"], start, end)))
+      if len(oldBlocks) != len(newBlocks):
+        lines.append("  ROM size changed from %d to %d blocks" % (len(oldBlocks), len(newBlocks)))
+  if expected["spoiler_sha256"] != result["spoiler_sha256"]:
+    line = result.get("spoiler_line")
+    if line is not None:
+      lines.append("  Spoiler log differs at line %d" % (line + 1))
+    else:
+      lines.append("  Spoiler log differs")
+  return lines
+# end describeMismatch
+
+#
+# Run the corpus from the command line.
+#
+# param: argv - Command line arguments, not including the program name
+# return: Exit status
+#
+def main(argv):
+  parser = argparse.ArgumentParser(description="Check that generated seeds match the golden corpus.")
+  parser.add_argument("--record", action="store_true",
+                      help="Record the hashes of the current output as the corpus")
+  parser.add_argument("--corpus", default=CORPUS_FILE, help="Corpus file")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of worker processes")
+  parser.add_argument("--reference", metavar="FOLDER",
+                      help="Folder to keep the reference ROMs and spoiler logs in when recording, "
+                           "and to read them from when comparing, for exact offsets")
+  parser.add_argument("--filter", default=None, help="Only run entries whose flag string is this")
+  args = parser.parse_args(argv)
+  corpusPath = os.path.abspath(args.corpus)
+  referenceFolder = None
+  if args.reference is not None:
+    referenceFolder = os.path.abspath(args.reference)
+    os.makedirs(referenceFolder, exist_ok=True)
+
+  # The patches are loaded relative to the source folder
+  os.chdir(os.path.dirname(os.path.abspath(__file__)))
+  if args.record:
+    entries = [(seed, flags) for flags in getCorpusFlags() for seed in SEEDS]
+    expected = {}
+  else:
+    with open(corpusPath) as corpusFile:
+      corpus = json.load(corpusFile)
+    expected = {(entry["seed"], entry["flags"]): entry for entry in corpus["entries"]}
+    entries = list(expected)
+  if args.filter is not None:
+    entries = [entry for entry in entries if entry[1] == args.filter]
+
+  results = []
+  with tempfile.TemporaryDirectory(prefix="jotgolden") as workFolder:
+    sourcefile = os.path.join(workFolder, "golden.sfc")
+    with open(sourcefile, "wb") as romFile:
+      romFile.write(makeRomData())
+    # Build the base images once, so the workers share them through the
+    # base ROM disk cache.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+      for flags in sorted(set(flags for seed, flags in entries)):
+        randomizer.get_base_rom(Settings.fromFlagString(flags), sourcefile)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs,
+                                                initializer=initWorker) as executor:
+      futures = [executor.submit(generateEntry, sourcefile, referenceFolder, args.record, entry)
+                 for entry in entries]
+      for future in futures:
+        results.append(future.result())
+
+  if args.record:
+    # One entry per line keeps the file readable in diffs
+    header = json.dumps({"version": CORPUS_VERSION, "rom": "random", "block_size": BLOCK_SIZE})
+    with open(corpusPath, "w") as corpusFile:
+      corpusFile.write(header[:-1] + ', "entries": [\n')
+      corpusFile.write(",\n".join(json.dumps({key: result[key] for key in ENTRY_KEYS})
+                                   for result in results))
+      corpusFile.write("\n]}\n")
+    print("Recorded %d entries in %s" % (len(results), args.corpus))
+    return 0
+
+  failures = 0
+  for result in results:
+    lines = describeMismatch(expected[(result["seed"], result["flags"])], result)
+    if len(lines) > 0:
+      failures += 1
+      print("MISMATCH %s seed %s" % (result["flags"], result["seed"]))
+      print("\n".join(lines))
+  print("%d of %d entries match" % (len(results) - failures, len(results)))
+  if failures > 0:
+    return 1
+  return 0
+# end main
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,108 @@
+import argparse
+import os
+import subprocess
+import sys
+
+#
+# This file holds the start up time check.
+#
+# The command line and batch interfaces should start quickly, so
+# importing the randomizer must not load the GUI (tkinter), the writers
+# that only some flags use, or modules that only the batch interface and
+# the profiler need.  The check imports the randomizer in a fresh
+# interpreter with python -X importtime and fails if one of those
+# modules is loaded, or if the import takes longer than the budget.
+#
+# The import is run a number of times and the fastest run is checked,
+# since the first runs also pay for reading the files from disk.  The
+# budget is generous, so the check is about catching a heavy import
+# that sneaks back in, not about small differences between machines.
+#
+#   python importbudget.py
+#   python importbudget.py --budget 30 --verbose
+#
+
+# Budget for "import randomizer" in milliseconds
+DEFAULT_BUDGET = 40
+
+# Modules that must not be loaded by importing the randomizer
+FORBIDDEN_MODULES = [
+  # GUI
+  "tkinter", "randomizergui",
+  # Writers that are imported by the stages that use them
+  "techwriter", "bossrando", "bossscaler", "logicwriter", "logicwriter_chronosanity",
+  # Batch interface and profiler
+  "argparse", "concurrent.futures", "cProfile", "tracemalloc", "json"]
+
+#
+# Import a module in a fresh interpreter and read the import times.
+#
+# param: module - Name of the module to import
+# return: Dictionary of module name to cumulative import time in
+#         microseconds, for every module that was loaded
+#
+def getImportTimes(module):
+  # Let the interpreter write the bytecode caches, so the timed imports
+  # do not compile the sources every time.
+  env = dict(os.environ)
+  env.pop("PYTHONDONTWRITEBYTECODE", None)
+  result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                          stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, env=env,
+                          universal_newlines=True, check=True)
+  times = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith("import time:"):
+      continue
+    fields = line[len("import time:"):].split("|")
+    if len(fields) != 3 or not fields[0].strip().isdigit():
+      # Header line
+      continue
+    times[fields[2].strip()] = int(fields[1])
+  return times
+# end getImportTimes
+
+#
+# Run the check from the command line.
+#
+# param: argv - Command line arguments, not including the program name
+# return: Exit status
+#
+def main(argv):
+  parser = argparse.ArgumentParser(description="Check the start up time of the randomizer.")
+  parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET,
+                      help="Allowed time for importing the randomizer in milliseconds "
+                           "(default %d)" % DEFAULT_BUDGET)
+  parser.add_argument("--repeat", type=int, default=5, help="Number of timed imports")
+  parser.add_argument("--verbose", action="store_true",
+                      help="List the slowest modules of the fastest import")
+  args = parser.parse_args(argv)
+
+  # The randomizer is imported from the source folder
+  os.chdir(os.path.dirname(os.path.abspath(__file__)))
+  getImportTimes("randomizer")
+  best = None
+  for i in range(args.repeat):
+    times = getImportTimes("randomizer")
+    if best is None or times["randomizer"] < best["randomizer"]:
+      best = times
+
+  failed = False
+  total = best["randomizer"] / 1000.0
+  print("import randomizer: %.1f ms (budget %.1f ms)" % (total, args.budget))
+  if total > args.budget:
+    print("Start up is over budget")
+    failed = True
+  for module in FORBIDDEN_MODULES:
+    if module in best:
+      print("%s is loaded on start up (%.1f ms)" % (module, best[module] / 1000.0))
+      failed = True
+
+  if args.verbose:
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    for module, microseconds in slowest[:20]:
+      print("  %-32s %8.1f ms" % (module, microseconds / 1000.0))
+  return 1 if failed else 0
+# end main
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
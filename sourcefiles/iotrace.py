@@ -0,0 +1,214 @@
+import sys
+import threading
+
+import stagegraph
+
+#
+# This file holds the ROM I/O accounting wrapper.
+#
+# The writers used to patch the output file directly with a seek and a
+# small write for every value.  They now write to the in-memory RomImage,
+# but the access pattern is the same, and it is what decides how well a
+# stage can be moved to bulk writes.  A TracedRom passes every access
+# through to the RomImage and records, per module that made the write:
+#   - Seeks: writes that do not start where the module's previous write
+#     ended, i.e. the seeks a file based writer would need
+#   - Writes: number of write calls
+#   - Bytes: number of bytes written
+#   - Ranges: number of distinct address ranges written, after merging
+#     ranges that overlap or touch
+#
+# The module is found from the call stack, skipping the ROM wrappers
+# themselves, so writes made through a StageRom are counted for the
+# writer that made them (e.g. treasurewriter, or logictypes for
+# Location.writeKeyItem).  Writes the stage scheduler copies from the
+# stage cache are counted for stagegraph.
+#
+# Tracing is opt-in since looking at the call stack on every write is
+# slow.
+#
+
+# Modules holding ROM wrappers, and the names of their access methods.
+# Frames of these methods are skipped when looking for the writer.
+wrapperModules = {__name__, "stagegraph"}
+accessMethods = {"readU8", "readU16", "readBytes", "writeU8", "writeU16", "writeBytes"}
+
+#
+# The ModuleIo class holds the write counts of one module.
+#
+class ModuleIo:
+  def __init__(self):
+    self.seeks = 0
+    self.writes = 0
+    self.bytesWritten = 0
+    self.ranges = []
+    self.position = None
+
+  #
+  # Count a write.
+  #
+  # param: address - Offset of the first byte written
+  # param: length - Number of bytes written
+  #
+  def addWrite(self, address, length):
+    if address != self.position:
+      self.seeks += 1
+    self.position = address + length
+    self.writes += 1
+    self.bytesWritten += length
+    self.ranges.append((address, address + length))
+
+  #
+  # Get the counts as a dictionary.
+  #
+  # return: Dictionary of the counts
+  #
+  def toDict(self):
+    return {"seeks": self.seeks, "writes": self.writes, "bytes": self.bytesWritten,
+            "ranges": len(stagegraph.normalizeRegions(self.ranges))}
+# end ModuleIo class
+
+#
+# The IoTrace class collects the write counts of every module for one
+# seed.  Any number of TracedRoms can report to the same IoTrace.
+#
+class IoTrace:
+  def __init__(self):
+    self.modules = {}
+    self.lock = threading.Lock()
+
+  #
+  # Count a write for the module that called the ROM wrappers.
+  #
+  # param: address - Offset of the first byte written
+  # param: length - Number of bytes written
+  #
+  def addWrite(self, address, length):
+    frame = sys._getframe(1)
+    while frame is not None:
+      module = frame.f_globals.get("__name__")
+      if not (module in wrapperModules and frame.f_code.co_name in accessMethods):
+        break
+      frame = frame.f_back
+    if frame is None:
+      module = "unknown"
+    with self.lock:
+      moduleIo = self.modules.get(module)
+      if moduleIo is None:
+        moduleIo = ModuleIo()
+        self.modules[module] = moduleIo
+      moduleIo.addWrite(address, length)
+
+  #
+  # Get the report as a dictionary.
+  #
+  # param: info - Dictionary of extra information about the seed
+  # return: Dictionary holding the counts of every module
+  #
+  def getReport(self, info=None):
+    return {"info": dict(info or {}),
+            "modules": {name: moduleIo.toDict() for name, moduleIo in sorted(self.modules.items())}}
+
+  #
+  # Get the report as text.
+  #
+  # param: info - Dictionary of extra information about the seed
+  # return: String holding the report table
+  #
+  def formatReport(self, info=None):
+    return formatModules(self.getReport(info)["modules"], info)
+
+  #
+  # Write the report files.
+  #
+  # param: basename - Path of the report without extension.  The text
+  #                   report is written to basename.txt and the JSON
+  #                   report to basename.json.
+  # param: info - Dictionary of extra information about the seed
+  #
+  def writeReport(self, basename, info=None):
+    import json
+    with open(basename + ".txt", "w") as reportFile:
+      reportFile.write(self.formatReport(info))
+    with open(basename + ".json", "w") as reportFile:
+      json.dump(self.getReport(info), reportFile, indent=2)
+# end IoTrace class
+
+#
+# The TracedRom class wraps a RomImage and counts every write in an
+# IoTrace.  Reads are passed through without being counted.
+#
+class TracedRom:
+  def __init__(self, rom, trace):
+    self.rom = rom
+    self.trace = trace
+
+  def getSize(self):
+    return self.rom.getSize()
+
+  def ensureSize(self, size):
+    self.rom.ensureSize(size)
+
+  def readU8(self, address):
+    return self.rom.readU8(address)
+
+  def readU16(self, address):
+    return self.rom.readU16(address)
+
+  def readBytes(self, address, length):
+    return self.rom.readBytes(address, length)
+
+  def writeU8(self, address, value):
+    self.trace.addWrite(address, 1)
+    self.rom.writeU8(address, value)
+
+  def writeU16(self, address, value):
+    self.trace.addWrite(address, 2)
+    self.rom.writeU16(address, value)
+
+  def writeBytes(self, address, values):
+    self.trace.addWrite(address, len(values))
+    self.rom.writeBytes(address, values)
+# end TracedRom class
+
+#
+# Format a table of module counts.
+#
+# param: modules - Dictionary of module name to count dictionary
+# param: info - Dictionary of extra information to list above the table
+# return: String holding the table
+#
+def formatModules(modules, info=None):
+  lines = []
+  for key, value in sorted((info or {}).items()):
+    lines.append("%s: %s" % (key, value))
+  lines.append("%-28s %8s %8s %10s %8s" % ("module", "seeks", "writes", "bytes", "ranges"))
+  totals = {"seeks": 0, "writes": 0, "bytes": 0, "ranges": 0}
+  for name, counts in sorted(modules.items()):
+    lines.append("%-28s %8s %8s %10s %8s" % (name, counts["seeks"], counts["writes"],
+                                             counts["bytes"], counts["ranges"]))
+    for key in totals:
+      totals[key] += counts[key]
+  totals = {key: round(value, 1) for key, value in totals.items()}
+  lines.append("%-28s %8s %8s %10s %8s" % ("total", totals["seeks"], totals["writes"],
+                                           totals["bytes"], totals["ranges"]))
+  return "\n".join(lines) + "\n"
+# end formatModules
+
+#
+# Summarize the reports of several seeds, e.g. a batch.
+#
+# param: reports - List of report dictionaries from IoTrace.getReport
+# return: String holding the mean counts of every module per seed
+#
+def formatSummary(reports):
+  modules = {}
+  for report in reports:
+    for name, counts in report["modules"].items():
+      total = modules.setdefault(name, {"seeks": 0, "writes": 0, "bytes": 0, "ranges": 0})
+      for key in total:
+        total[key] += counts[key]
+  means = {name: {key: round(value / len(reports), 1) for key, value in counts.items()}
+           for name, counts in modules.items()}
+  return ("Mean ROM writes per seed over %d seeds:\n" % len(reports)) + formatModules(means)
+# end formatSummary
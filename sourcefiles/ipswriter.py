@@ -1,60 +1,128 @@
-import struct as st
-from os import stat
+import patchcache
 
-def tenthousands_digit(digit):
-    digit = st.unpack(">B",digit)
-    digit = int(digit[0]) * 0x10000
-    return digit       
-def make_number(digit,digit2):
-       digit2 = st.unpack(">H",digit2)
-       digit2 = int(digit2[0])
-       number = digit + digit2
-#      print "{:X}".format(number)
-       return number
-def get_length(length):
-       length = st.unpack(">H",length)
-       length = int(length[0])
-       return length
-def write_data(length,pointer,position):
-        bRepeatable = False
-        if length == 0:
-            length = p.read(2)
-            length = get_length(length)
-            data = get_data()            
-            position += 3
-            bRepeatable = True
-        while length > 0:
-          if not bRepeatable:
-            data = get_data()
-            position += 1
-          f.seek(pointer)
-          f.write(st.pack("B",data))
-          pointer += 1
-          length -= 1
-        return position
-def get_data():
-        data = p.read(1)
-        data = st.unpack("B",data)
-        data = int(data[0])
-        return data
-def write_patch(patch,outfile):
-     global p
-     global f
-     p = open(patch,"r+b")
-     patch_size = stat(patch).st_size
-     position = 5
-     f = open(outfile,'r+b')
-     while position < patch_size - 4:
-       p.seek(position)
-       pointer1 = p.read(1)
-       pointer1 = tenthousands_digit(pointer1)
-       position += 1
-       pointer2 = p.read(2)
-       pointer = make_number(pointer1,pointer2)
-       position += 2
-       length = p.read(2)
-       length = get_length(length)
-       position += 2
-       position = write_data(length,pointer,position)
-     p.close()
-     f.close()
+#
+# This file applies IPS patches to a RomImage.
+#
+# An IPS patch is the 5 byte header "PATCH" followed by a list of records
+# and the 3 byte footer "EOF".  Each record is:
+#   3 bytes - big endian offset into the ROM
+#   2 bytes - big endian payload size
+#   If the size is nonzero, the payload follows.
+#   If the size is zero, the record is RLE encoded:
+#     2 bytes - big endian run length
+#     1 byte  - value to repeat
+#
+# The patch is parsed once into a list of records (see patchcache.py for
+# how the parsed records are cached between runs) and every record is
+# applied with a single slice assignment instead of one write per byte.
+#
+
+IPS_HEADER = b"PATCH"
+IPS_FOOTER = b"EOF"
+
+#
+# Parse the records out of an IPS patch.
+#
+# Normal records are returned as memoryview slices of the patch data, so
+# no payload bytes are copied.  RLE records are expanded into a bytes object.
+#
+# param: patchData - bytes-like object holding the full IPS patch
+# return: List of (offset, payload) tuples in patch order
+#
+def read_records(patchData):
+  view = memoryview(patchData)
+  if bytes(view[0:5]) != IPS_HEADER:
+    raise ValueError("Not an IPS patch: missing PATCH header")
+  records = []
+  position = 5
+  patchSize = len(view)
+  while position + 3 <= patchSize:
+    if bytes(view[position:position + 3]) == IPS_FOOTER:
+      break
+    offset = int.from_bytes(view[position:position + 3], "big")
+    length = int.from_bytes(view[position + 3:position + 5], "big")
+    position += 5
+    if length == 0:
+      # RLE record: run length followed by a single value
+      length = int.from_bytes(view[position:position + 2], "big")
+      value = view[position + 2]
+      records.append((offset, bytes([value]) * length))
+      position += 3
+    else:
+      records.append((offset, view[position:position + length]))
+      position += length
+  return records
+# end read_records
+
+#
+# Apply a list of parsed IPS records to a ROM image.
+# The ROM grows if a record writes past the current end of the image.
+#
+# param: records - List of (offset, payload) tuples from read_records
+# param: rom - The RomImage to patch
+#
+def apply_records(records, rom):
+  for offset, payload in records:
+    rom.writeBytes(offset, payload)
+# end apply_records
+
+#
+# Apply an IPS patch file to a ROM image.
+#
+# param: patch - File name of the IPS patch
+# param: rom - The RomImage to patch
+#
+def write_patch(patch, rom):
+  apply_records(patchcache.load_records(patch, read_records), rom)
+# end write_patch
+
+#
+# Build an IPS patch that turns one ROM image into another.
+#
+# The images are compared in blocks, and only blocks that differ are
+# compared byte by byte.  Runs of changed bytes separated by fewer
+# unchanged bytes than a record header are merged into one record.
+# Records never start at the offset that reads as the "EOF" footer.
+#
+# param: source - bytes-like object holding the original ROM
+# param: target - bytes-like object holding the patched ROM.  It must be
+#                 at least as large as the source.
+# return: bytes object holding the IPS patch
+#
+def build_patch(source, target):
+  blockSize = 256
+  source = memoryview(source)
+  target = memoryview(target)
+  runs = []
+  start = None
+  end = None
+  for block in range(0, len(target), blockSize):
+    blockEnd = min(block + blockSize, len(target))
+    if source[block:blockEnd] == target[block:blockEnd]:
+      continue
+    for offset in range(block, blockEnd):
+      if offset < len(source) and source[offset] == target[offset]:
+        continue
+      if start is not None and offset - end < 5:
+        end = offset + 1
+        continue
+      if start is not None:
+        runs.append((start, end))
+      start = offset
+      end = offset + 1
+  if start is not None:
+    runs.append((start, end))
+
+  footer = int.from_bytes(IPS_FOOTER, "big")
+  patch = bytearray(IPS_HEADER)
+  for start, end in runs:
+    while start < end:
+      if start == footer:
+        start -= 1
+      length = min(end - start, 0xFFFF)
+      patch += start.to_bytes(3, "big") + length.to_bytes(2, "big")
+      patch += target[start:start + length]
+      start += length
+  patch += IPS_FOOTER
+  return bytes(patch)
+# end build_patch
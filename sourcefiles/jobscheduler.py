@@ -0,0 +1,302 @@
+import heapq
+import itertools
+import threading
+
+#
+# This file holds the seed generation job scheduler.
+#
+# The scheduler sits in front of seed generation and runs jobs on a
+# fixed number of worker threads:
+#   - Single flight: a job submitted with the same key as a job that is
+#     queued or running is not run again.  The caller gets the existing
+#     job and waits for its result with everyone else.
+#   - Priorities: interactive jobs (a user waiting for a seed) run before
+#     batch jobs.  A batch job that an interactive caller joins is
+#     promoted.  Jobs of the same priority run in submission order.
+#   - Backpressure: at most maxQueued jobs wait for a worker.  Submitting
+#     to a full queue raises SchedulerFull instead of queueing more work
+#     than the workers can catch up with.
+#   - Cancellation: a caller that no longer wants a queued job cancels
+#     it.  The job is dropped once every caller waiting for it cancelled.
+#     Running jobs are not interrupted.
+#
+# The workers are threads, so the job function should either release
+# the GIL (e.g. wait for a worker process, as the seed server does) or
+# the scheduler should have a single worker (as the GUI does).
+#
+
+INTERACTIVE = 0
+BATCH = 1
+
+priorityNames = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+#
+# The SchedulerFull class is raised when the queue has no room for a job.
+#
+class SchedulerFull(Exception):
+  pass
+# end SchedulerFull class
+
+#
+# The JobCancelled class is raised when waiting for a cancelled job.
+#
+class JobCancelled(Exception):
+  pass
+# end JobCancelled class
+
+#
+# The Job class holds one unit of work and its result.
+#
+#   key      - Key identifying identical jobs, or None if the job is
+#              never shared
+#   priority - INTERACTIVE or BATCH
+#   state    - "queued", "running", "done", "failed" or "cancelled"
+#   result   - Return value of the job function once done
+#   error    - Exception raised by the job function if it failed
+#   waiters  - Number of callers that submitted the job and did not
+#              cancel it
+#
+class Job:
+  def __init__(self, key, priority, function, args):
+    self.key = key
+    self.priority = priority
+    self.function = function
+    self.args = args
+    self.state = "queued"
+    self.result = None
+    self.error = None
+    self.waiters = 1
+    self.finished = threading.Event()
+    self.callbacks = []
+
+  #
+  # Check whether the job has finished, failed or was cancelled.
+  #
+  # return: True if the job will not change any more
+  #
+  def isDone(self):
+    return self.finished.is_set()
+
+  #
+  # Wait for the result of the job.
+  #
+  # param: timeout - Seconds to wait, or None to wait until the job is done
+  # return: Return value of the job function
+  # raise: TimeoutError if the job is not done in time, JobCancelled if
+  #        the job was cancelled, or the exception the job function raised
+  #
+  def wait(self, timeout=None):
+    if not self.finished.wait(timeout):
+      raise TimeoutError("The job did not finish in time")
+    if self.state == "cancelled":
+      raise JobCancelled("The job was cancelled")
+    if self.state == "failed":
+      raise self.error
+    return self.result
+# end Job class
+
+#
+# The JobScheduler class queues jobs and runs them on worker threads.
+#
+class JobScheduler:
+  #
+  # param: workers - Number of jobs run at the same time
+  # param: maxQueued - Number of jobs that can wait for a worker
+  #
+  def __init__(self, workers=1, maxQueued=16):
+    self.maxQueued = maxQueued
+    self.condition = threading.Condition()
+    # Heap of (priority, sequence, job).  Entries of jobs that were
+    # cancelled or promoted are left in the heap and skipped.
+    self.queue = []
+    self.sequence = itertools.count()
+    # Queued and running jobs with a key, by key
+    self.inFlight = {}
+    self.queued = {INTERACTIVE: 0, BATCH: 0}
+    self.running = 0
+    self.stopping = False
+    self.counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "cancelled": 0,
+                     "completed": 0, "failed": 0}
+    self.threads = []
+    for i in range(workers):
+      thread = threading.Thread(target=self.workerLoop, name="JobScheduler-%d" % i, daemon=True)
+      thread.start()
+      self.threads.append(thread)
+
+  #
+  # Submit a job.
+  #
+  # param: key - Key identifying identical jobs, e.g. the flags and seed,
+  #              or None to never share the job
+  # param: function - Function to run
+  # param: args - Tuple of arguments for the function
+  # param: priority - INTERACTIVE or BATCH
+  # param: callback - Optional function called with the job when it is
+  #                   done, failed or cancelled.  It is called on the
+  #                   worker thread, or on the cancelling thread.
+  # return: The Job, which is shared with other callers if an identical
+  #         job is already queued or running
+  # raise: SchedulerFull if the queue is full
+  #
+  def submit(self, key, function, args=(), priority=BATCH, callback=None):
+    with self.condition:
+      if self.stopping:
+        raise RuntimeError("The scheduler is shut down")
+      self.counters["submitted"] += 1
+      job = self.inFlight.get(key) if key is not None else None
+      if job is not None:
+        self.counters["deduplicated"] += 1
+        job.waiters += 1
+        if callback is not None:
+          job.callbacks.append(callback)
+        if priority < job.priority and job.state == "queued":
+          # Promote the job.  The old heap entry is skipped later.
+          self.queued[job.priority] -= 1
+          self.queued[priority] += 1
+          job.priority = priority
+          heapq.heappush(self.queue, (priority, next(self.sequence), job))
+          self.condition.notify()
+        return job
+      if self.queued[INTERACTIVE] + self.queued[BATCH] >= self.maxQueued:
+        self.counters["rejected"] += 1
+        raise SchedulerFull("The job queue is full")
+      job = Job(key, priority, function, args)
+      if callback is not None:
+        job.callbacks.append(callback)
+      if key is not None:
+        self.inFlight[key] = job
+      self.queued[priority] += 1
+      heapq.heappush(self.queue, (priority, next(self.sequence), job))
+      self.condition.notify()
+      return job
+
+  #
+  # Cancel a job for one caller.  The job is only dropped once every
+  # caller that submitted it has cancelled it, and only while it is
+  # still queued.
+  #
+  # param: job - Job returned by submit
+  # return: True if the job was dropped
+  #
+  def cancel(self, job):
+    with self.condition:
+      if job.state != "queued" or job.waiters == 0:
+        return False
+      job.waiters -= 1
+      if job.waiters > 0:
+        return False
+      job.state = "cancelled"
+      self.queued[job.priority] -= 1
+      self.counters["cancelled"] += 1
+      if job.key is not None and self.inFlight.get(job.key) is job:
+        del self.inFlight[job.key]
+    self.finishJob(job)
+    return True
+
+  #
+  # Get the state of the scheduler.
+  #
+  # return: Dictionary of the queue depths, running jobs and counters
+  #
+  def getStats(self):
+    with self.condition:
+      stats = {"queued_" + priorityNames[priority]: count
+               for priority, count in self.queued.items()}
+      stats["queued"] = self.queued[INTERACTIVE] + self.queued[BATCH]
+      stats["running"] = self.running
+      stats["max_queued"] = self.maxQueued
+      stats["workers"] = len(self.threads)
+      stats.update(self.counters)
+    return stats
+
+  #
+  # Check whether any job is queued or running.
+  #
+  # return: True if the scheduler has nothing to do
+  #
+  def isIdle(self):
+    with self.condition:
+      return self.running == 0 and self.queued[INTERACTIVE] + self.queued[BATCH] == 0
+
+  #
+  # Stop the workers.  Queued jobs are cancelled, running jobs finish.
+  #
+  # param: wait - True to wait for the running jobs
+  #
+  def shutdown(self, wait=True):
+    with self.condition:
+      self.stopping = True
+      dropped = []
+      for priority, sequence, job in self.queue:
+        if job.state == "queued":
+          job.state = "cancelled"
+          self.queued[job.priority] -= 1
+          self.counters["cancelled"] += 1
+          dropped.append(job)
+      self.queue = []
+      self.inFlight = {}
+      self.condition.notify_all()
+    for job in dropped:
+      self.finishJob(job)
+    if wait:
+      for thread in self.threads:
+        thread.join()
+
+  #
+  # Take the next job off the queue, waiting for one if needed.
+  #
+  # return: The Job to run, or None if the scheduler is shutting down
+  #
+  def takeJob(self):
+    with self.condition:
+      while True:
+        while len(self.queue) > 0:
+          priority, sequence, job = heapq.heappop(self.queue)
+          if job.state != "queued" or priority != job.priority:
+            continue
+          job.state = "running"
+          self.queued[priority] -= 1
+          self.running += 1
+          return job
+        if self.stopping:
+          return None
+        self.condition.wait()
+
+  #
+  # Run jobs until the scheduler is shut down.
+  #
+  def workerLoop(self):
+    while True:
+      job = self.takeJob()
+      if job is None:
+        return
+      try:
+        result = job.function(*job.args)
+        error = None
+      except Exception as exception:
+        result = None
+        error = exception
+      with self.condition:
+        self.running -= 1
+        if error is None:
+          job.state = "done"
+          job.result = result
+          self.counters["completed"] += 1
+        else:
+          job.state = "failed"
+          job.error = error
+          self.counters["failed"] += 1
+        if job.key is not None and self.inFlight.get(job.key) is job:
+          del self.inFlight[job.key]
+      self.finishJob(job)
+
+  #
+  # Wake the callers waiting for a job and run its callbacks.
+  #
+  # param: job - The finished, failed or cancelled Job
+  #
+  def finishJob(self, job):
+    job.finished.set()
+    for callback in job.callbacks:
+      callback(job)
+# end JobScheduler class
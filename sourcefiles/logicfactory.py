@@ -89,7 +89,7 @@ class ChronosanityGameConfig(GameConfig):
     # Mount Woe does not go away in the randomizer, so it
     # is being considered for key item drops.
     darkagesLocations = \
-      LocationGroup("Darkages", 30, lambda game:game.canAccessDarkAges())
+      LocationGroup("Darkages", 30, AccessRules.darkAges)
     (darkagesLocations
       .addLocation(Location("Mt Woe 1st Screen",0x35F770))
       .addLocation(Location("Mt Woe 2nd Screen 1",0x35F748))
@@ -109,14 +109,14 @@ class ChronosanityGameConfig(GameConfig):
 
     # Fiona Shrine (Key Item only)
     fionaShrineLocations = \
-      LocationGroup("Fionashrine", 2, lambda game:game.canAccessFionasShrine())
+      LocationGroup("Fionashrine", 2, AccessRules.fionasShrine)
     (fionaShrineLocations
       .addLocation(BaselineLocation("Fiona's Shrine", 0x6EF5E, 0x6EF61, LootTiers.MidHigh))
     )
 
     # Future
     futureOpenLocations = \
-      LocationGroup("FutureOpen", 20, lambda game:game.canAccessFuture())
+      LocationGroup("FutureOpen", 20, AccessRules.future)
     (futureOpenLocations
       # Chests
       .addLocation(Location("Arris Dome",0x35F5C8))
@@ -127,7 +127,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     futureSewersLocations = \
-      LocationGroup("FutureSewers", 9, lambda game:game.canAccessFuture())
+      LocationGroup("FutureSewers", 9, AccessRules.future)
     (futureSewersLocations
       .addLocation(Location("Sewers 1",0x35F614))     
       .addLocation(Location("Sewers 2",0x35F618))
@@ -135,7 +135,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     futureLabLocations = \
-      LocationGroup("FutureLabs", 15, lambda game:game.canAccessFuture())
+      LocationGroup("FutureLabs", 15, AccessRules.future)
     (futureLabLocations
       .addLocation(Location("Lab 16 1",0x35F5B8))
       .addLocation(Location("Lab 16 2",0x35F5BC))
@@ -149,7 +149,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     genoDomeLocations = \
-      LocationGroup("GenoDome", 33, lambda game:game.canAccessFuture())
+      LocationGroup("GenoDome", 33, AccessRules.future)
     (genoDomeLocations
       .addLocation(Location("Geno Dome 1st Floor 1",0x35F630))
       .addLocation(Location("Geno Dome 1st Floor 2",0x35F634))
@@ -167,7 +167,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     factoryLocations = \
-      LocationGroup("Factory", 30, lambda game:game.canAccessFuture())
+      LocationGroup("Factory", 30, AccessRules.future)
     (factoryLocations
       .addLocation(Location("Factory Ruins Left - Auxillary Console",0x35F5E8))
       .addLocation(Location("Factory Ruins Left - Security Center (Right)",0x35F5EC))
@@ -187,7 +187,7 @@ class ChronosanityGameConfig(GameConfig):
 
     # GiantsClawLocations
     giantsClawLocations = \
-      LocationGroup("Giantsclaw", 30, lambda game:game.canAccessGiantsClaw())
+      LocationGroup("Giantsclaw", 30, AccessRules.giantsClaw)
     (giantsClawLocations
       .addLocation(Location("Giant's Claw Kino's Cell",0x35F468))
       .addLocation(Location("Giant's Claw Traps",0x35F46C))
@@ -202,8 +202,7 @@ class ChronosanityGameConfig(GameConfig):
 
     # Northern Ruins
     northernRuinsLocations = \
-      LocationGroup("NorthernRuins", 8, \
-        lambda game:(game.canAccessRuins()))
+      LocationGroup("NorthernRuins", 8, AccessRules.ruins)
     (northernRuinsLocations
       # regular chests in the sealed ruins
       # Note: These aren't actually real chests, they are handled in event
@@ -224,14 +223,14 @@ class ChronosanityGameConfig(GameConfig):
     
     northernRuinsFrogLocked = \
       LocationGroup("NorthernRuinsFrogLocked", 1, \
-        lambda game:(game.canAccessRuins() and game.hasCharacter(Characters.Frog)))
+        AccessRules.ruins & AccessRule.character(Characters.Frog))
     (northernRuinsFrogLocked
       .addLocation(EventLocation("Northern Ruins Basement 1000AD",0x1BAEF4, 0x1BAEF9))
     )
 
     # Guardia Treasury
     guardiaTreasuryLocations = \
-      LocationGroup("GuardiaTreasury", 36, lambda game:game.canAccessKingsTrial())
+      LocationGroup("GuardiaTreasury", 36, AccessRules.kingsTrial)
     (guardiaTreasuryLocations
       .addLocation(Location("Guardia Basement 1", 0x35F41C))
       .addLocation(Location("Guardia Basement 2", 0x35F420))
@@ -249,7 +248,7 @@ class ChronosanityGameConfig(GameConfig):
     # the player has access to the Dark Ages.
     earlyOzziesFortLocations = \
       LocationGroup("Ozzie's Fort Front", 6, \
-        lambda game: (game.canAccessFuture() or game.canAccessPrehistory()))
+        AccessRules.future | AccessRules.prehistory)
     (earlyOzziesFortLocations
       .addLocation(Location("Ozzie's Fort Guillotines 1",0x35F554))
       .addLocation(Location("Ozzie's Fort Guillotines 2",0x35F558))
@@ -259,9 +258,7 @@ class ChronosanityGameConfig(GameConfig):
     
     lateOzziesFortLocations = \
       LocationGroup("Ozzie's Fort Back", 6, \
-      lambda game: \
-        (game.canAccessFuture() or game.canAccessPrehistory()) and \
-        game.canAccessDarkAges())
+        (AccessRules.future | AccessRules.prehistory) & AccessRules.darkAges)
     (lateOzziesFortLocations
       .addLocation(Location("Ozzie's Fort Final 1",0x35F564))
       .addLocation(Location("Ozzie's Fort Final 2",0x35F568))
@@ -271,7 +268,7 @@ class ChronosanityGameConfig(GameConfig):
     # Open locations are split into multiple groups so that weighting
     # can be applied separately to individual areas.
     openLocations = LocationGroup("Open", 10, \
-       lambda game: True, \
+       AccessRules.always, \
        lambda weight:int(weight * 0.2))
     (openLocations
       .addLocation(Location("Truce Mayor's House F1",0x35F40C))
@@ -287,7 +284,7 @@ class ChronosanityGameConfig(GameConfig):
       .addLocation(Location("Frog's Burrow Right Chest",0x35F4AC))
     )
     
-    openKeys = LocationGroup("OpenKeys", 5, lambda game: True)
+    openKeys = LocationGroup("OpenKeys", 5, AccessRules.always)
     (openKeys
       .addLocation(BaselineLocation("Zenan Bridge", 0x393C83, 0x393C85, LootTiers.Mid))
       .addLocation(BaselineLocation("Snail Stop", 0x380C42, 0x380C5B, LootTiers.Mid))
@@ -295,7 +292,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     heckranLocations = \
-      LocationGroup("Heckran", 4, lambda game: True)
+      LocationGroup("Heckran", 4, AccessRules.always)
     (heckranLocations
       .addLocation(Location("Heckran Cave Sidetrack",0x35F430))
       .addLocation(Location("Heckran Cave Entrance",0x35F434))
@@ -305,7 +302,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     guardiaCastleLocations = \
-      LocationGroup("GuardiaCastle", 3, lambda game: True)
+      LocationGroup("GuardiaCastle", 3, AccessRules.always)
     (guardiaCastleLocations
       .addLocation(Location("King's Room (Present)",0x35F414))
       .addLocation(Location("Queen's Room (Present)",0x35F418))
@@ -320,7 +317,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     cathedralLocations = \
-      LocationGroup("CathedralLocations", 6, lambda game: True)
+      LocationGroup("CathedralLocations", 6, AccessRules.always)
     (cathedralLocations
       .addLocation(Location("Manoria Cathedral 1",0x35F488))
       .addLocation(Location("Manoria Cathedral 2",0x35F48C))
@@ -340,7 +337,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     denadoroLocations = \
-      LocationGroup("DenadoroLocations", 6, lambda game:True)
+      LocationGroup("DenadoroLocations", 6, AccessRules.always)
     (denadoroLocations
       .addLocation(Location("Denadoro Mts Screen 2 1",0x35F4B0))
       .addLocation(Location("Denadoro Mts Screen 2 2",0x35F4B4))
@@ -367,7 +364,7 @@ class ChronosanityGameConfig(GameConfig):
     # Sealed locations
     sealedLocations = \
       LocationGroup("SealedLocations", 20, 
-        lambda game:game.canAccessSealedChests(),
+        AccessRules.sealedChests,
         lambda weight:int(weight * 0.3))
     (sealedLocations
       # Sealed Doors
@@ -404,14 +401,14 @@ class ChronosanityGameConfig(GameConfig):
     # Requires both powered up pendant and Magus' Castle access
     magicCaveLocations = \
       LocationGroup("Magic Cave", 4, \
-        lambda game: game.canAccessSealedChests() and game.canAccessMagusCastle())
+        AccessRules.sealedChests & AccessRules.magusCastle)
     (magicCaveLocations
       .addLocation(EventLocation("Magic Cave",0x1B31C7,0x1B31CA))
     )
     
     # Prehistory
     prehistoryForestMazeLocations = \
-      LocationGroup("PrehistoryForestMaze", 18, lambda game:game.canAccessPrehistory())
+      LocationGroup("PrehistoryForestMaze", 18, AccessRules.prehistory)
     (prehistoryForestMazeLocations
       .addLocation(Location("Mystic Mtn Stream",0x35F678))
       .addLocation(Location("Forest Maze 1",0x35F67C))
@@ -426,7 +423,7 @@ class ChronosanityGameConfig(GameConfig):
     )
     
     prehistoryReptiteLocations = \
-      LocationGroup("PrehistoryReptite", 27, lambda game:game.canAccessPrehistory())
+      LocationGroup("PrehistoryReptite", 27, AccessRules.prehistory)
     (prehistoryReptiteLocations
       .addLocation(Location("Reptite Lair Reptites 1",0x35F6B8))
       .addLocation(Location("Reptite Lair Reptites 2",0x35F6BC))
@@ -436,7 +433,7 @@ class ChronosanityGameConfig(GameConfig):
     # Dactyl Nest already has a character, so give it a relatively low weight compared
     # to the other prehistory locations.
     prehistoryDactylNest = \
-      LocationGroup("PrehistoryDactylNest", 6, lambda game:game.canAccessPrehistory())
+      LocationGroup("PrehistoryDactylNest", 6, AccessRules.prehistory)
     (prehistoryDactylNest
       .addLocation(Location("Dactyl Nest 1",0x35F6C0))
       .addLocation(Location("Dactyl Nest 2",0x35F6C4))
@@ -445,14 +442,14 @@ class ChronosanityGameConfig(GameConfig):
 
     # MelchiorRefinements
     melchiorsRefinementslocations = \
-      LocationGroup("MelchiorRefinements", 15, lambda game:game.canAccessMelchiorsRefinements())
+      LocationGroup("MelchiorRefinements", 15, AccessRules.melchiorsRefinements)
     (melchiorsRefinementslocations
       .addLocation(BaselineLocation("Melchior's Refinements", 0x3805DE, 0x3805E0, LootTiers.High))
     )
 
     # Frog's Burrow
     frogsBurrowLocation = \
-      LocationGroup("FrogsBurrowLocation", 9, lambda game:game.canAccessBurrowItem())
+      LocationGroup("FrogsBurrowLocation", 9, AccessRules.burrowItem)
     (frogsBurrowLocation
       .addLocation(BaselineLocation("Frog's Burrow Left Chest", 0x3891DE, 0x3891E0, LootTiers.MidHigh))
     )
@@ -566,7 +563,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
   
     # Prehistory
     prehistoryForestMazeLocations = \
-        LocationGroup("PrehistoryForestMaze", 10, lambda game:True)
+        LocationGroup("PrehistoryForestMaze", 10, AccessRules.always)
     (prehistoryForestMazeLocations
         .addLocation(Location("Mystic Mtn Stream",0x35F678))
         .addLocation(Location("Forest Maze 1",0x35F67C))
@@ -581,7 +578,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     )
     
     prehistoryReptiteLocations = \
-        LocationGroup("PrehistoryReptite", 10, lambda game:True)
+        LocationGroup("PrehistoryReptite", 10, AccessRules.always)
     (prehistoryReptiteLocations
         .addLocation(Location("Reptite Lair Reptites 1",0x35F6B8))
         .addLocation(Location("Reptite Lair Reptites 2",0x35F6BC))
@@ -591,7 +588,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     # Dactyl Nest already has a character, so give it a relatively low weight compared
     # to the other prehistory locations.
     prehistoryDactylNest = \
-        LocationGroup("PrehistoryDactylNest", 6, lambda game:True)
+        LocationGroup("PrehistoryDactylNest", 6, AccessRules.always)
     (prehistoryDactylNest
         .addLocation(Location("Dactyl Nest 1",0x35F6C0))
         .addLocation(Location("Dactyl Nest 2",0x35F6C4))
@@ -602,7 +599,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     # Mount Woe does not go away in the randomizer, so it
     # is being considered for key item drops.
     darkagesLocations = \
-        LocationGroup("Darkages", 10, lambda game:True)
+        LocationGroup("Darkages", 10, AccessRules.always)
     (darkagesLocations
         .addLocation(Location("Mt Woe 1st Screen",0x35F770))
         .addLocation(Location("Mt Woe 2nd Screen 1",0x35F748))
@@ -622,7 +619,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
 
     # Future
     futureOpenLocations = \
-        LocationGroup("FutureOpen", 10, lambda game:True)
+        LocationGroup("FutureOpen", 10, AccessRules.always)
     (futureOpenLocations
         # Chests
         .addLocation(Location("Arris Dome",0x35F5C8))
@@ -633,7 +630,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     )
     
     futureSewersLocations = \
-        LocationGroup("FutureSewers", 8, lambda game:True)
+        LocationGroup("FutureSewers", 8, AccessRules.always)
     (futureSewersLocations
         .addLocation(Location("Sewers 1",0x35F614))     
         .addLocation(Location("Sewers 2",0x35F618))
@@ -641,7 +638,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     )
     
     futureLabLocations = \
-        LocationGroup("FutureLabs", 10, lambda game:True)
+        LocationGroup("FutureLabs", 10, AccessRules.always)
     (futureLabLocations
         .addLocation(Location("Lab 16 1",0x35F5B8))
         .addLocation(Location("Lab 16 2",0x35F5BC))
@@ -653,7 +650,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     )
     
     genoDomeLocations = \
-        LocationGroup("GenoDome", 10, lambda game:True)
+        LocationGroup("GenoDome", 10, AccessRules.always)
     (genoDomeLocations
         .addLocation(Location("Geno Dome 1st Floor 1",0x35F630))
         .addLocation(Location("Geno Dome 1st Floor 2",0x35F634))
@@ -671,7 +668,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     )
     
     factoryLocations = \
-        LocationGroup("Factory", 10, lambda game:True)
+        LocationGroup("Factory", 10, AccessRules.always)
     (factoryLocations
         .addLocation(Location("Factory Ruins Left - Auxillary Console",0x35F5E8))
         .addLocation(Location("Factory Ruins Left - Security Center (Right)",0x35F5EC))
@@ -691,7 +688,7 @@ class ChronosanityLostWorldsGameConfig(GameConfig):
     # Sealed locations
     sealedLocations = \
         LocationGroup("SealedLocations", 10, 
-            lambda game:game.canAccessSealedChests())
+            AccessRules.sealedChests)
     (sealedLocations
         # Sealed Doors
         .addLocation(Location("Bangor Dome Seal 1", 0x35F5A4))
@@ -747,18 +744,18 @@ class NormalGameConfig(GameConfig):
                    
   def initLocations(self): 
     prehistoryLocations = \
-      LocationGroup("PrehistoryReptite", 1, lambda game:game.canAccessPrehistory())
+      LocationGroup("PrehistoryReptite", 1, AccessRules.prehistory)
     (prehistoryLocations
       .addLocation(BaselineLocation("Reptite Lair", 0x18FC04, 0x18FC07, LootTiers.MidHigh)) #Reptite Lair Key Item
     )
     
     darkagesLocations = \
-        LocationGroup("Darkages", 1, lambda game:game.canAccessDarkAges())
+        LocationGroup("Darkages", 1, AccessRules.darkAges)
     (darkagesLocations
         .addLocation(BaselineLocation("Mount Woe", 0x381010, 0x381013, LootTiers.High))
     )
   
-    openKeys = LocationGroup("OpenKeys", 5, lambda game: True, lambda weight: weight-1)
+    openKeys = LocationGroup("OpenKeys", 5, AccessRules.always, lambda weight: weight-1)
     (openKeys
       .addLocation(BaselineLocation("Zenan Bridge", 0x393C83, 0x393C85, LootTiers.Mid))
       .addLocation(BaselineLocation("Snail Stop", 0x380C42, 0x380C5B, LootTiers.Mid))
@@ -768,37 +765,37 @@ class NormalGameConfig(GameConfig):
     )
     
     melchiorsRefinementslocations = \
-      LocationGroup("MelchiorRefinements", 1, lambda game:game.canAccessMelchiorsRefinements())
+      LocationGroup("MelchiorRefinements", 1, AccessRules.melchiorsRefinements)
     (melchiorsRefinementslocations
       .addLocation(BaselineLocation("Melchior's Refinements", 0x3805DE, 0x3805E0, LootTiers.High))
     )
 
     frogsBurrowLocation = \
-      LocationGroup("FrogsBurrowLocation", 1, lambda game:game.canAccessBurrowItem())
+      LocationGroup("FrogsBurrowLocation", 1, AccessRules.burrowItem)
     (frogsBurrowLocation
       .addLocation(BaselineLocation("Frog's Burrow Left Chest", 0x3891DE, 0x3891E0, LootTiers.MidHigh))
     )
     
     guardiaTreasuryLocations = \
-      LocationGroup("GuardiaTreasury", 1, lambda game:game.canAccessKingsTrial())
+      LocationGroup("GuardiaTreasury", 1, AccessRules.kingsTrial)
     (guardiaTreasuryLocations
       .addLocation(BaselineLocation("King's Trial", 0x38045D, 0x38045F, LootTiers.High))
     )
     
     giantsClawLocations = \
-      LocationGroup("Giantsclaw", 1, lambda game:game.canAccessGiantsClaw())
+      LocationGroup("Giantsclaw", 1, AccessRules.giantsClaw)
     (giantsClawLocations
       .addLocation(BaselineLocation("Giant's Claw", 0x1B8ABB, 0x1B8ABF, LootTiers.Mid)) #key item
     )
     
     fionaShrineLocations = \
-      LocationGroup("Fionashrine", 1, lambda game:game.canAccessFionasShrine())
+      LocationGroup("Fionashrine", 1, AccessRules.fionasShrine)
     (fionaShrineLocations
       .addLocation(BaselineLocation("Fiona's Shrine", 0x6EF5E, 0x6EF61, LootTiers.MidHigh))
     )
     
     futureKeys = \
-        LocationGroup("FutureOpen", 3, lambda game:game.canAccessFuture(), lambda weight: weight-1)
+        LocationGroup("FutureOpen", 3, AccessRules.future, lambda weight: weight-1)
     (futureKeys   
         .addLocation(BaselineLocation("Arris Dome Doan", 0x392F4C, 0x392F4E, LootTiers.MidHigh))
         .addLocation(BaselineLocation("Sun Palace", 0x1B8D95, 0x1B8D97, LootTiers.MidHigh))
@@ -839,19 +836,19 @@ class LostWorldsGameConfig(GameConfig):
                    
   def initLocations(self): 
     prehistoryLocations = \
-      LocationGroup("PrehistoryReptite", 1, lambda game:True)
+      LocationGroup("PrehistoryReptite", 1, AccessRules.always)
     (prehistoryLocations
       .addLocation(BaselineLocation("Reptite Lair", 0x18FC04, 0x18FC07, LootTiers.MidHigh)) #Reptite Lair Key Item
     )
     
     darkagesLocations = \
-        LocationGroup("Darkages", 1, lambda game:True)
+        LocationGroup("Darkages", 1, AccessRules.always)
     (darkagesLocations
         .addLocation(BaselineLocation("Mount Woe", 0x381010, 0x381013, LootTiers.High))
     )
     
     futureKeys = \
-        LocationGroup("FutureOpen", 3, lambda game:True, lambda weight: weight-1)
+        LocationGroup("FutureOpen", 3, AccessRules.always, lambda weight: weight-1)
     (futureKeys   
         .addLocation(BaselineLocation("Arris Dome Doan", 0x392F4C, 0x392F4E, LootTiers.MidHigh))
         .addLocation(BaselineLocation("Sun Palace", 0x1B8D95, 0x1B8D97, LootTiers.MidHigh))
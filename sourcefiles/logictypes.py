@@ -1,5 +1,6 @@
+import collections
 import enum
-import struct as st
+import threading
 
 #
 # This file holds various classes/types used by the logic placement code.
@@ -50,6 +51,174 @@ class Characters(enum.Enum):
   Magus = 6
 # end Character enum class
 
+#
+# Enum type for the flags that change the placement logic.
+#
+class GameFlags(enum.Enum):
+  earlyPendant = 0
+  lockedChars = 1
+  lostWorlds = 2
+# end GameFlags enum class
+
+#
+# The PlacementError class is raised when the key items can not be
+# placed, e.g. because the placement search ran out of its node budget.
+# The seed must not be written out or cached.
+#
+class PlacementError(Exception):
+  pass
+# end PlacementError class
+
+#
+# Game state is kept as a single integer bitmask with one bit per key item,
+# character and flag.  The bit ranges do not overlap, so the key items,
+# characters and flags can be kept as separate masks and combined with an OR.
+#
+# Every flag has two bits, one that is set while the flag is on and one
+# that is set while it is off, so access rules can depend on a flag being
+# off without needing negation.
+#
+CHARACTER_SHIFT = 16
+FLAG_SHIFT = 24
+
+keyItemBits = {item: 1 << index for index, item in enumerate(KeyItems)}
+
+#
+# Get the state bit of a character.
+#
+# param: character - The character, from the Characters enum
+# return: The bit of the character
+#
+def getCharacterBit(character):
+  return 1 << (CHARACTER_SHIFT + character.value)
+# end getCharacterBit
+
+#
+# Get the state bit of a flag setting.
+#
+# param: flag - The flag, from the GameFlags enum
+# param: value - True for the bit set while the flag is on, False for the
+#                bit set while it is off
+# return: The bit of the flag setting
+#
+def getFlagBit(flag, value=True):
+  return 1 << (FLAG_SHIFT + 2 * flag.value + (0 if value else 1))
+# end getFlagBit
+
+#
+# The AccessRule class is an access rule compiled to disjunctive normal
+# form.  Every term is a mask of the bits that must all be set, and the
+# rule is met when any term is met.  Checking a rule against the game
+# state is then a few integer ANDs.
+#
+# Rules are built from the keyItem/character/flag rules and combined with
+# & and |.  Terms implied by another term are dropped as rules are built,
+# so the rules stay small.
+#
+class AccessRule:
+  #
+  # param: terms - Iterable of required bit masks
+  #
+  def __init__(self, terms):
+    terms = sorted(set(terms), key=lambda term: (bin(term).count("1"), term))
+    self.terms = []
+    for term in terms:
+      # A term requiring all the bits of a kept term adds nothing
+      if not any(term & kept == kept for kept in self.terms):
+        self.terms.append(term)
+    self.terms = tuple(self.terms)
+
+  #
+  # Get a rule that needs a key item.
+  #
+  # param: item - The key item, from the KeyItems enum
+  # return: An AccessRule
+  #
+  @classmethod
+  def keyItem(cls, item):
+    return cls((keyItemBits[item],))
+
+  #
+  # Get a rule that needs a character.
+  #
+  # param: character - The character, from the Characters enum
+  # return: An AccessRule
+  #
+  @classmethod
+  def character(cls, character):
+    return cls((getCharacterBit(character),))
+
+  #
+  # Get a rule that needs a flag to be on or off.
+  #
+  # param: flag - The flag, from the GameFlags enum
+  # param: value - True if the flag must be on, False if it must be off
+  # return: An AccessRule
+  #
+  @classmethod
+  def flag(cls, flag, value=True):
+    return cls((getFlagBit(flag, value),))
+
+  def __and__(self, other):
+    return AccessRule(term | otherTerm for term in self.terms for otherTerm in other.terms)
+
+  def __or__(self, other):
+    return AccessRule(self.terms + other.terms)
+
+  #
+  # Check the rule against a game state.
+  #
+  # param: state - Game state bitmask, see Game.getState
+  # return: True if the rule is met, false if not
+  #
+  def evaluate(self, state):
+    for term in self.terms:
+      if state & term == term:
+        return True
+    return False
+
+  #
+  # Check the rule against a Game, so a rule can be used where a
+  # function taking the game is expected.
+  #
+  # param: game - The game object with current game state
+  # return: True if the rule is met, false if not
+  #
+  def __call__(self, game):
+    return self.evaluate(game.getState())
+# end AccessRule class
+
+#
+# The AccessRules class holds the compiled access rules of the game's
+# eras and locations.  The Game convenience functions with the same
+# names check these rules.
+#
+class AccessRules:
+  always = AccessRule((0,))
+  future = AccessRule.keyItem(KeyItems.pendant) | AccessRule.flag(GameFlags.lostWorlds)
+  prehistory = AccessRule.keyItem(KeyItems.gatekey) | AccessRule.flag(GameFlags.lostWorlds)
+  # If character locking is on, dreamstone is required to get the
+  # Dactyl Nest character in addition to prehistory access.
+  dactylCharacter = prehistory & (AccessRule.flag(GameFlags.lockedChars, False) |
+                                  AccessRule.keyItem(KeyItems.dreamstone))
+  tyranoLair = prehistory & AccessRule.keyItem(KeyItems.dreamstone)
+  masamune = AccessRule.keyItem(KeyItems.hilt) & AccessRule.keyItem(KeyItems.blade)
+  magusCastle = masamune & AccessRule.character(Characters.Frog)
+  darkAges = tyranoLair | magusCastle | AccessRule.flag(GameFlags.lostWorlds)
+  oceanPalace = darkAges & AccessRule.keyItem(KeyItems.rubyknife)
+  blackOmen = (future & AccessRule.keyItem(KeyItems.clone) &
+               AccessRule.keyItem(KeyItems.ctrigger))
+  sunstone = future & prehistory & AccessRule.keyItem(KeyItems.moonstone)
+  kingsTrial = AccessRule.character(Characters.Marle) & AccessRule.keyItem(KeyItems.prismshard)
+  melchiorsRefinements = kingsTrial & sunstone
+  giantsClaw = AccessRule.keyItem(KeyItems.tomapop)
+  ruins = AccessRule.keyItem(KeyItems.grandleon)
+  sealedChests = AccessRule.keyItem(KeyItems.pendant) & \
+                 (AccessRule.flag(GameFlags.earlyPendant) | darkAges)
+  burrowItem = AccessRule.keyItem(KeyItems.heromedal)
+  fionasShrine = AccessRule.character(Characters.Robo)
+# end AccessRules class
+
 #
 # The Game class is used to keep track of game state
 # as the randomizer places key items.  It:
@@ -57,15 +226,29 @@ class Characters(enum.Enum):
 #   - Tracks characters obtained
 #   - Keeps track of user selected flags
 #   - Provides logic convenience functions
+#
+# Key items, characters and flags are kept as bitmasks, see getState.
 #  
 class Game:
   def __init__(self, charLocations):
-    self.characters = set()
-    self.keyItems = set()
+    self.keyItemMask = 0
+    self.characterMask = 0
+    self.flagMask = 0
     self.earlyPendant = False
     self.lockedChars = False
     self.lostWorlds = False
     self.charLocations = charLocations
+    self.initCharacterUnlocks()
+    self.updateFlagMask()
+  
+  #
+  # Get the game state as a bitmask of the key items, characters and
+  # flags, as used by AccessRule.
+  #
+  # return: Game state bitmask
+  #
+  def getState(self):
+    return self.keyItemMask | self.characterMask | self.flagMask
   
   #
   # Get the number of key items that have been acquired by the player.
@@ -73,7 +256,17 @@ class Game:
   # return: Number of obtained key items
   #
   def getKeyItemCount(self):
-    return len(self.keyItems)
+    return bin(self.keyItemMask).count("1")
+  
+  #
+  # Rebuild the flag bits of the game state after a flag changed.
+  # The flags can change which characters are available.
+  #
+  def updateFlagMask(self):
+    self.flagMask = (getFlagBit(GameFlags.earlyPendant, self.earlyPendant) |
+                     getFlagBit(GameFlags.lockedChars, self.lockedChars) |
+                     getFlagBit(GameFlags.lostWorlds, self.lostWorlds))
+    self.updateAvailableCharacters()
   
   #
   # Set whether or not this seed is using the early pendant flag.
@@ -83,6 +276,7 @@ class Game:
   #
   def setEarlyPendant(self, pflag):
     self.earlyPendant = pflag
+    self.updateFlagMask()
   
   #
   # Set whether or not this seed is using the Locked Characters flag.
@@ -92,6 +286,7 @@ class Game:
   #
   def setLockedCharacters(self, cflag):
     self.lockedChars = cflag
+    self.updateFlagMask()
   
   #
   # Set whether or not this seed is using the Lost Worlds flag.
@@ -101,6 +296,7 @@ class Game:
   #
   def setLostWorlds(self, lFlag):
     self.lostWorlds = lFlag
+    self.updateFlagMask()
   
   #
   # Check if the player has the specified character
@@ -109,7 +305,7 @@ class Game:
   # return: true if the character has been acquired, false if not
   #
   def hasCharacter(self, character):
-    return character in self.characters
+    return self.characterMask & getCharacterBit(character) != 0
     
   #
   # Add a character to the set of characters acquired
@@ -117,7 +313,7 @@ class Game:
   # param: character - The character to add
   #
   def addCharacter(self, character):
-    self.characters.add(character)
+    self.characterMask |= getCharacterBit(character)
     
   #
   # Remove a character from the set of characters acquired
@@ -125,7 +321,7 @@ class Game:
   # param: character: The character to remove
   #
   def removeCharacter(self, character):
-    self.characters.discard(character)
+    self.characterMask &= ~getCharacterBit(character)
     
   #
   # Check if the player has a given key item.
@@ -134,128 +330,380 @@ class Game:
   # returns: True if the player has the key item, false if not
   #
   def hasKeyItem(self, item):
-    return item in self.keyItems
+    return self.keyItemMask & keyItemBits[item] != 0
   #
-  # Add a key item to the set of key items acquired
+  # Add a key item to the set of key items acquired.
+  # Adding a key item can only unlock characters, so only the
+  # characters that are not available yet are checked.
   #
   # param: item - The Key Item to add
   #
   def addKeyItem(self, item):
-    self.keyItems.add(item)
+    self.keyItemMask |= keyItemBits[item]
+    state = self.keyItemMask | self.flagMask
+    for condition, characterBit in self.characterUnlocks:
+      if not self.characterMask & characterBit and state & condition == condition:
+        self.characterMask |= characterBit
     
   #
-  # Remove a key item from the set of key items acquired
+  # Remove a key item from the set of key items acquired.
+  # This undoes the character unlocks that depended on the key item.
   #
   # param: item: The Key Item to remove
   #
   def removeKeyItem(self, item):
-    self.keyItems.discard(item)
+    self.keyItemMask &= ~keyItemBits[item]
+    self.updateAvailableCharacters()
 
   #
-  # Determine which characters are available based on what key items/time periods
-  # are available to the player.
+  # Precompute the character unlocks for the character locations.  The
+  # first four characters are always available, the remaining three are
+  # progression gated.  Every gate is stored as (condition mask, character
+  # bit) pairs, one pair per term of the gate's access rule, so checking
+  # the gates does not build any Characters enums.
   #
   # The character locations are provided at object construction.  The dictionary
   # is provided as output from running the characterwriter.py script.
   #
-  def updateAvailableCharacters(self):
+  def initCharacterUnlocks(self):
     # charLocations is a dictionary that uses the location name as
     # a key and the character data structure as a value.
     #
     # NOTE: The first entry in the character data is the character ID.
     #       Use the ID to get the correct character from the enum.
-
-    # Empty the set just in case the placement algorithm had to 
-    # backtrack and a character is no longer available.
-    self.characters.clear()
-    
-    # The first four characters are always available.
-    self.addCharacter(Characters(self.charLocations['start'][0]))
-    self.addCharacter(Characters(self.charLocations['start2'][0]))
-    self.addCharacter(Characters(self.charLocations['cathedral'][0]))
-    self.addCharacter(Characters(self.charLocations['castle'][0]))
-    
-    # The remaining three characters are progression gated.
-    if self.canAccessFuture():
-      self.addCharacter(Characters(self.charLocations['proto'][0]))
-    if self.canAccessDactylCharacter():
-      self.addCharacter(Characters(self.charLocations['dactyl'][0]))
-    if self.hasMasamune():
-      self.addCharacter(Characters(self.charLocations['burrow'][0]))
+    self.startCharacterMask = 0
+    for location in ['start', 'start2', 'cathedral', 'castle']:
+      self.startCharacterMask |= getCharacterBit(Characters(self.charLocations[location][0]))
+    
+    self.characterUnlocks = []
+    for location, rule in [('proto', AccessRules.future),
+                           ('dactyl', AccessRules.dactylCharacter),
+                           ('burrow', AccessRules.masamune)]:
+      characterBit = getCharacterBit(Characters(self.charLocations[location][0]))
+      for condition in rule.terms:
+        self.characterUnlocks.append((condition, characterBit))
+  
+  #
+  # Determine which characters are available based on what key items/time periods
+  # are available to the player.
+  #
+  # The Game keeps the characters up to date as key items are added and
+  # removed, so this only needs to be called after changing characters
+  # by hand.
+  #
+  def updateAvailableCharacters(self):
+    # The unlock conditions only read key items and flags.  Start from the
+    # always available characters, so a character whose key item was
+    # removed while backtracking is no longer available.
+    state = self.keyItemMask | self.flagMask
+    characterMask = self.startCharacterMask
+    for condition, characterBit in self.characterUnlocks:
+      if state & condition == condition:
+        characterMask |= characterBit
+    self.characterMask = characterMask
   # end updateAvailableCharacters function
     
   #
   # Logic convenience functions.  These can be used to
   # quickly check if particular eras or locations are
-  # logically accessible.
+  # logically accessible.  The rules are defined in AccessRules.
   #
   def canAccessDactylCharacter(self):
-    # If character locking is on, dreamstone is required to get the
-    # Dactyl Nest character in addition to prehistory access.
-    return (self.canAccessPrehistory() and 
-           ((not self.lockedChars) or self.hasKeyItem(KeyItems.dreamstone)))
+    return AccessRules.dactylCharacter.evaluate(self.getState())
   
   def canAccessFuture(self):
-    return self.hasKeyItem(KeyItems.pendant) or self.lostWorlds
+    return AccessRules.future.evaluate(self.getState())
     
   def canAccessPrehistory(self):
-    return self.hasKeyItem(KeyItems.gatekey) or self.lostWorlds
+    return AccessRules.prehistory.evaluate(self.getState())
     
   def canAccessTyranoLair(self):
-    return self.canAccessPrehistory() and self.hasKeyItem(KeyItems.dreamstone)
+    return AccessRules.tyranoLair.evaluate(self.getState())
     
   def hasMasamune(self):
-    return (self.hasKeyItem(KeyItems.hilt) and 
-            self.hasKeyItem(KeyItems.blade))
+    return AccessRules.masamune.evaluate(self.getState())
             
   def canAccessMagusCastle(self):
-    return (self.hasMasamune() and 
-            self.hasCharacter(Characters.Frog))
+    return AccessRules.magusCastle.evaluate(self.getState())
     
   def canAccessDarkAges(self):
-    return ((self.canAccessTyranoLair()) or
-           (self.canAccessMagusCastle()) or
-           (self.lostWorlds))
+    return AccessRules.darkAges.evaluate(self.getState())
         
   def canAccessOceanPalace(self):
-    return (self.canAccessDarkAges() and 
-            self.hasKeyItem(KeyItems.rubyknife))
+    return AccessRules.oceanPalace.evaluate(self.getState())
     
   def canAccessBlackOmen(self):
-    return (self.canAccessFuture() and 
-            self.hasKeyItem(KeyItems.clone) and 
-            self.hasKeyItem(KeyItems.ctrigger))
+    return AccessRules.blackOmen.evaluate(self.getState())
   
   def canGetSunstone(self):
-    return (self.canAccessFuture() and
-            self.canAccessPrehistory() and
-            self.hasKeyItem(KeyItems.moonstone))
+    return AccessRules.sunstone.evaluate(self.getState())
   
   def canAccessKingsTrial(self):
-    return (self.hasCharacter(Characters.Marle) and
-            self.hasKeyItem(KeyItems.prismshard))
+    return AccessRules.kingsTrial.evaluate(self.getState())
   
   def canAccessMelchiorsRefinements(self):
-    return (self.canAccessKingsTrial() and
-            self.canGetSunstone())
+    return AccessRules.melchiorsRefinements.evaluate(self.getState())
   
   def canAccessGiantsClaw(self):
-    return self.hasKeyItem(KeyItems.tomapop)
+    return AccessRules.giantsClaw.evaluate(self.getState())
     
   def canAccessRuins(self):
-    return self.hasKeyItem(KeyItems.grandleon)
+    return AccessRules.ruins.evaluate(self.getState())
     
   def canAccessSealedChests(self):
-    return (self.hasKeyItem(KeyItems.pendant) and 
-           (self.earlyPendant or self.canAccessDarkAges()))
+    return AccessRules.sealedChests.evaluate(self.getState())
            
   def canAccessBurrowItem(self):
-    return self.hasKeyItem(KeyItems.heromedal)
+    return AccessRules.burrowItem.evaluate(self.getState())
     
   def canAccessFionasShrine(self):
-    return self.hasCharacter(Characters.Robo)
+    return AccessRules.fionasShrine.evaluate(self.getState())
 # End Game class
 
+#
+# The ReachabilityCache class remembers which LocationGroups are accessible
+# in a game state, so placement does not check every access rule again
+# when it reaches a state it has seen before: while backtracking, and in
+# every seed of a process, since the early game states are the same for
+# most seeds of a game mode.
+#
+# The key is the combined game state from Game.getState.  The key item,
+# character and flag masks use separate bit ranges, so the one integer
+# identifies all three.  Bits that no access rule reads (e.g. most of the
+# characters) are masked out first, so states that only differ in those
+# bits share an entry.  The cache holds a mask of group indices rather
+# than groups, so it can be shared by every GameConfig with the same access
+# rules (see getReachabilityCache).  The result only depends on the access rules, so
+# groups that have run out of locations are still part of it and must be
+# filtered by the caller.
+#
+# The cache is bounded and drops the least recently used state when full.
+#
+class ReachabilityCache:
+  #
+  # param: accessRules - List of the AccessRules of the LocationGroups
+  # param: maxEntries - Number of game states to remember
+  #
+  def __init__(self, accessRules, maxEntries=4096):
+    self.accessRules = accessRules
+    self.maxEntries = maxEntries
+    self.relevantMask = 0
+    for rule in accessRules:
+      for term in rule.terms:
+        self.relevantMask |= term
+    self.entries = collections.OrderedDict()
+    self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+    self.lock = threading.Lock()
+  
+  #
+  # Get the access rules that are met in a game state.
+  #
+  # param: state - Game state bitmask, see Game.getState
+  # return: Bitmask with bit i set if access rule i is met
+  #
+  def getAccessible(self, state):
+    state &= self.relevantMask
+    with self.lock:
+      accessible = self.entries.get(state)
+      if accessible is not None:
+        self.entries.move_to_end(state)
+        self.counters["hits"] += 1
+        return accessible
+      self.counters["misses"] += 1
+    
+    accessible = 0
+    for index, rule in enumerate(self.accessRules):
+      if rule.evaluate(state):
+        accessible |= 1 << index
+    with self.lock:
+      self.entries[state] = accessible
+      if len(self.entries) > self.maxEntries:
+        self.entries.popitem(last=False)
+        self.counters["evictions"] += 1
+    return accessible
+  
+  #
+  # Get the cache statistics.
+  #
+  # return: Dictionary of the counters, the number of states remembered
+  #         and the hit rate
+  #
+  def getStats(self):
+    with self.lock:
+      stats = dict(self.counters)
+      stats["entries"] = len(self.entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else 0.0
+    return stats
+# end ReachabilityCache class
+
+# Reachability caches of this process, by access rule terms
+reachabilityCaches = {}
+reachabilityCachesLock = threading.Lock()
+
+#
+# Get the reachability cache shared by all LocationGroup lists with the
+# same access rules, creating it on first use.
+#
+# param: locationGroups - List of all LocationGroups for the game
+# return: A ReachabilityCache for the groups
+#
+def getReachabilityCache(locationGroups):
+  accessRules = [group.accessRule for group in locationGroups]
+  key = tuple(rule.terms for rule in accessRules)
+  with reachabilityCachesLock:
+    cache = reachabilityCaches.get(key)
+    if cache is None:
+      cache = ReachabilityCache(accessRules)
+      reachabilityCaches[key] = cache
+  return cache
+# end getReachabilityCache
+
+
+#
+# The WeightedSampler class draws random indices with a probability
+# proportional to their weights, e.g. to choose a LocationGroup.
+#
+# The weights are kept in a binary indexed (Fenwick) tree, so drawing an
+# index, changing a weight and undoing a change take O(log n) time
+# instead of a pass over every weight.  Indices can be masked out, e.g.
+# groups that are not accessible; a masked index keeps its weight but is
+# never drawn.
+#
+# Weight changes are logged so the placement code can undo them in
+# reverse order when it backtracks.  Mask changes are not logged.
+#
+class WeightedSampler:
+  #
+  # param: weights - List of the positive integer weights of the indices
+  # param: enabledMask - Bitmask of the indices that can be drawn, or None
+  #                      for all of them
+  #
+  def __init__(self, weights, enabledMask=None):
+    self.size = len(weights)
+    self.weights = list(weights)
+    if enabledMask is None:
+      enabledMask = (1 << self.size) - 1
+    self.enabledMask = enabledMask
+    self.undoLog = []
+    self.topStep = 1 << (self.size.bit_length() - 1) if self.size > 0 else 0
+    
+    # Build the tree in O(n): every node passes its sum on to its parent
+    self.tree = [0] * (self.size + 1)
+    for index in range(self.size):
+      if enabledMask & (1 << index):
+        self.tree[index + 1] += self.weights[index]
+      parent = (index + 1) + ((index + 1) & -(index + 1))
+      if parent <= self.size:
+        self.tree[parent] += self.tree[index + 1]
+    self.total = sum(self.weights[index] for index in range(self.size)
+                     if enabledMask & (1 << index))
+  
+  #
+  # Add to the drawn weight of an index.
+  #
+  # param: index - The index
+  # param: delta - Amount to add
+  #
+  def addToTree(self, index, delta):
+    self.total += delta
+    node = index + 1
+    while node <= self.size:
+      self.tree[node] += delta
+      node += node & -node
+  
+  #
+  # Get the weight of an index, whether or not it is masked out.
+  #
+  # param: index - The index
+  # return: The weight of the index
+  #
+  def getWeight(self, index):
+    return self.weights[index]
+  
+  #
+  # Get the sum of the weights of the indices that can be drawn.
+  #
+  # return: The total weight
+  #
+  def getTotal(self):
+    return self.total
+  
+  #
+  # Change the weight of an index.  The change can be undone with undo.
+  #
+  # param: index - The index
+  # param: weight - The new positive integer weight
+  #
+  def setWeight(self, index, weight):
+    self.undoLog.append((index, self.weights[index]))
+    self.updateWeight(index, weight)
+  
+  #
+  # Undo the last weight change that was not undone yet.
+  #
+  def undo(self):
+    index, weight = self.undoLog.pop()
+    self.updateWeight(index, weight)
+  
+  #
+  # Change the weight of an index without logging it.
+  #
+  # param: index - The index
+  # param: weight - The new weight
+  #
+  def updateWeight(self, index, weight):
+    if self.enabledMask & (1 << index):
+      self.addToTree(index, weight - self.weights[index])
+    self.weights[index] = weight
+  
+  #
+  # Set which indices can be drawn.  Only the indices that change are
+  # updated.
+  #
+  # param: enabledMask - Bitmask of the indices that can be drawn
+  #
+  def setEnabledMask(self, enabledMask):
+    changed = self.enabledMask ^ enabledMask
+    self.enabledMask = enabledMask
+    while changed:
+      bit = changed & -changed
+      index = bit.bit_length() - 1
+      self.addToTree(index, self.weights[index] if enabledMask & bit else -self.weights[index])
+      changed ^= bit
+  
+  #
+  # Find the index a number falls on when the weights of the indices that
+  # can be drawn are laid end to end: the first index whose weight,
+  # added to the weights of the indices before it, is at least the number.
+  #
+  # param: value - Number from 1 to the total weight
+  # return: The index
+  #
+  def find(self, value):
+    node = 0
+    step = self.topStep
+    while step > 0:
+      nextNode = node + step
+      if nextNode <= self.size and self.tree[nextNode] < value:
+        node = nextNode
+        value -= self.tree[nextNode]
+      step >>= 1
+    return node
+  
+  #
+  # Draw a random index.  This makes the same random call as a linear
+  # scan over the weights would, so it picks the same index.
+  #
+  # param: rand - random.Random used for the draw
+  # return: The drawn index, or None if no index can be drawn
+  #
+  def sample(self, rand):
+    if self.total == 0:
+      return None
+    return self.find(rand.randint(1, self.total))
+# end WeightedSampler class
+
 #
 # This class represents a location within the game.
 # It is the parent class for the different location types
@@ -305,13 +753,12 @@ class Location:
     self.keyItem = None
   
   #
-  # Write the key item set to this location to a provided file handle.
+  # Write the key item set to this location to a provided ROM image.
   #
-  # param: fileHandle The file to write the key item to
+  # param: rom The RomImage to write the key item to
   #  
-  def writeKeyItem(self, fileHandle):
-    fileHandle.seek(self.getPointer())
-    fileHandle.write(st.pack("B", self.getKeyItem().value))
+  def writeKeyItem(self, rom):
+    rom.writeU8(self.getPointer(), self.getKeyItem().value)
   
 # End Location class
 
@@ -332,14 +779,13 @@ class EventLocation(Location):
     return self.pointer2
     
   #
-  # Write the key item set to this location to a provided file handle.
+  # Write the key item set to this location to a provided ROM image.
   #
-  # param: fileHandle The file to write the key item to
+  # param: rom The RomImage to write the key item to
   #  
-  def writeKeyItem(self, fileHandle):
-    super().writeKeyItem(fileHandle)
-    fileHandle.seek(self.getPointer2())
-    fileHandle.write(st.pack("B", self.getKeyItem().value))
+  def writeKeyItem(self, rom):
+    super().writeKeyItem(rom)
+    rom.writeU8(self.getPointer2(), self.getKeyItem().value)
     
 # End EventLocation class
 
@@ -365,16 +811,14 @@ class BaselineLocation(EventLocation):
     return self.lootTier
   
   #
-  # Write the given treasure to the provided ROM file.
+  # Write the given treasure to the provided ROM image.
   #
   # param: treasure - Hex code for a treasure
-  # param: fileHandle - The ROM file to write the treasure to
+  # param: rom - The RomImage to write the treasure to
   #  
-  def writeTreasure(self, treasure, fileHandle):
-    fileHandle.seek(self.getPointer())
-    fileHandle.write(st.pack("B", treasure))
-    fileHandle.seek(self.getPointer2())
-    fileHandle.write(st.pack("B", treasure))
+  def writeTreasure(self, treasure, rom):
+    rom.writeU8(self.getPointer(), treasure)
+    rom.writeU8(self.getPointer2(), treasure)
   
 # End BaselineLocation class
 
@@ -408,9 +852,9 @@ class LinkedLocation(Location):
   #
   # Write the key item to both of the linked locations
   #
-  def writeKeyItem(self, fileHandle):
-    self.location1.writeKeyItem(fileHandle)
-    self.location2.writeKeyItem(fileHandle)
+  def writeKeyItem(self, rom):
+    self.location1.writeKeyItem(rom)
+    self.location2.writeKeyItem(rom)
 # end LinkedLocation class
     
 #
@@ -423,7 +867,7 @@ class LocationGroup:
   #
   # param: name - The name of this LocationGroup
   # param: weight - The initial weighting factor of this LocationGroup
-  # param: accessRule - A function used to determine if this LocationGroup is accessible
+  # param: accessRule - AccessRule used to determine if this LocationGroup is accessible
   # param: weightDecay - Optional function to define weight decay of this LocationGroup
   #
   def __init__(self, name, weight, accessRule, weightDecay = None):
@@ -432,7 +876,6 @@ class LocationGroup:
     self.weight = weight
     self.accessRule = accessRule
     self.weightDecay = weightDecay
-    self.weightStack = []
     
     
   #
@@ -442,7 +885,17 @@ class LocationGroup:
   # return: True if this location is accessible, false if not
   #
   def canAccess(self, game):
-    return self.accessRule(game)
+    return self.accessRule.evaluate(game.getState())
+  
+  #
+  # Return whether or not this location group is accessible with the
+  # given game state.  Used when checking many groups against one state.
+  #
+  # param: state - Game state bitmask, see Game.getState
+  # return: True if this location is accessible, false if not
+  #
+  def isAccessible(self, state):
+    return self.accessRule.evaluate(state)
     
   #
   # Get the name of this location.
@@ -454,6 +907,8 @@ class LocationGroup:
     
   #
   # Get the weight value being used to select locations from this group.
+  # While key items are placed, the decayed weights are kept by the
+  # placement code's WeightedSampler.
   #
   # return: Weight value used by this location group
   #
@@ -474,23 +929,17 @@ class LocationGroup:
   #
   # This function is used to decay the weight value of this 
   # LocationGroup when a location is chosen from it.
+  # The weight cannot decay to less than 1.
   #
-  def decayWeight(self):
-    self.weightStack.append(self.weight)
+  # param: weight - Current weight of this group
+  # return: The weight after a location is chosen from this group
+  #
+  def getDecayedWeight(self, weight):
     if self.weightDecay == None:
       # If no weight decay function was given, reduce the weight of this
       # LocationGroup to 1 to make it unlikelyto get any other items.
-      self.setWeight(1)
-    else:
-      self.setWeight(self.weightDecay(self.weight))
-  
-  #
-  # Undo a previous weight decay of this LocationGroup.
-  # The previous weight values are stored in the weightStack.
-  #
-  def undoWeightDecay(self):
-    if len(self.weightStack) > 0:
-      self.setWeight(self.weightStack.pop())
+      return 1
+    return max(1, self.weightDecay(weight))
   
   #
   # Get the number of available locations in this group.
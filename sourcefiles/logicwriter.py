@@ -1,6 +1,5 @@
-import random as rand
-import struct as st
 import characterwriter as chars
+import logictypes
 def determine_char_locks(loclist,charlocs,charkey):
     char = charlocs [charkey] [0]
     if char == 3 and "desert" not in loclist:
@@ -62,7 +61,7 @@ def parse_keys(provided_key):
     if provided_key == "ribbon":
        provided_key = 0xB8
     return provided_key
-def randomize_keys(char_locs,outfile,locked_chars):
+def randomize_keys(char_locs,rom,rand,locked_chars,spoiler,stats=None):
     loclist = []
     complete_list = [2300,"sword1","sword2","sword3","dream","desert","giant","trial1","trial2","melchior",
     "burrow","ruins","endoftime","palace","omen1","omen2"]
@@ -143,8 +142,10 @@ def randomize_keys(char_locs,outfile,locked_chars):
                 lockeys.append("melchior")
           i += 1
        iterations += 1
+    if stats is not None:
+       stats["attempts"] = iterations
     if iterations == 3600:
-       print("Oops, ran out of attempts. Please try again!")
+       raise logictypes.PlacementError("Unable to place key items after %d attempts" % iterations)
     else:
        ordered_keys = ["zenan" ,"taban" ,"denadoro" ,"snail" ,"burrow" ,"carpenter" ,"trial" ,
        "melchior" ,"claw" ,"desert" ,"arris" ,"geno" ,"sun" ,"reptite" ,"woe"]
@@ -156,19 +157,13 @@ def randomize_keys(char_locs,outfile,locked_chars):
        while i < len(ordered_keys):
            written_key = locations[ordered_keys[i]]
            written_key = parse_keys(written_key)
-           f = open(outfile,"r+b")
-           f.seek(pointer1[i])
-           f.write(st.pack("B",written_key))
-           f.seek(pointer2[i])
-           f.write(st.pack("B",written_key))
+           rom.writeU8(pointer1[i],written_key)
+           rom.writeU8(pointer2[i],written_key)
            i += 1
-           f.close()
-    f = open("spoiler_log.txt","w+")
     rename_chars(char_locs)
-    f.write(f"{str(locations)}\n{str(char_locs)}")
-    f.close()
+    spoiler.write(f"{str(locations)}\n{str(char_locs)}")
     return locations
-def randomize_lost_worlds_keys(char_locs,outfile):
+def randomize_lost_worlds_keys(char_locs,rom,rand,spoiler,stats=None):
     loclist = []
     iterations = 0
     complete_list = ["dream","palace","omen1","omen2"]
@@ -197,8 +192,10 @@ def randomize_lost_worlds_keys(char_locs,outfile):
                 lockeys.append("melchior")
            i += 1
         iterations += 1
+    if stats is not None:
+       stats["attempts"] = iterations
     if iterations == 3600:
-       print("Oops, ran out of attempts. Please try again!")
+       raise logictypes.PlacementError("Unable to place key items after %d attempts" % iterations)
     else:
        ordered_keys = ["arris" ,"geno" ,"sun" ,"reptite" ,"woe"]
        pointer1 = [0x392F4C,0x1B1844,0x1B8D95,0x18FC04,0x381010]
@@ -207,17 +204,11 @@ def randomize_lost_worlds_keys(char_locs,outfile):
        while i < len(ordered_keys):
            written_key = locations[ordered_keys[i]]
            written_key = parse_keys(written_key)
-           f = open(outfile,"r+b")
-           f.seek(pointer1[i])
-           f.write(st.pack("B",written_key))
-           f.seek(pointer2[i])
-           f.write(st.pack("B",written_key))
+           rom.writeU8(pointer1[i],written_key)
+           rom.writeU8(pointer2[i],written_key)
            i += 1
-           f.close()
-    f = open("spoiler_log.txt","w+")
     rename_chars(char_locs)
-    f.write(f"{str(locations)}\n{str(char_locs)}")
-    f.close()
+    spoiler.write(f"{str(locations)}\n{str(char_locs)}")
     return locations
 if __name__ == "__main__":
     char_locations = chars.randomize_char_positions("Project.sfc","Y")
@@ -1,7 +1,6 @@
 # Python libraries
 import enum
-import random as rand
-import struct as st
+import time
 
 # jets of time libraries
 import characterwriter as chars
@@ -17,72 +16,125 @@ import treasurewriter as treasure
 # be assigned a random treasure.
 #
 
-# Script variables
-locationGroups = []
-
 #
 # Get a list of LocationGroups that are available for key item placement.
 #
 # param: game - Game object used to determine location access
+# param: locationGroups - List of all LocationGroups for the game
+# param: cache - Optional ReachabilityCache for locationGroups, see
+#                logictypes.getReachabilityCache
 #
 # return: List of all available LocationGroups
 #
-def getAvailableLocations(game):
-  # Have the game object update what characters are available based on the
-  # currently available items and time periods.
-  game.updateAvailableCharacters()
+def getAvailableLocations(game, locationGroups, cache=None):
+  # The game object keeps the available characters up to date as key items
+  # are added and removed, so the state already includes them.
+  #
+  # Get all accessible location groups.  The game state is read once and
+  # every group's compiled access rule is checked against it, or the
+  # result for this state is taken from the cache.
+  state = game.getState()
+  if cache is None:
+    accessibleGroups = [group for group in locationGroups if group.isAccessible(state)]
+  else:
+    accessible = cache.getAccessible(state)
+    accessibleGroups = [group for index, group in enumerate(locationGroups)
+                        if accessible & (1 << index)]
   
-  # Get a list of all accessible location groups
+  # Only keep the groups that still have locations left
   accessibleLocationGroups = []
-  for locationGroup in locationGroups:
-    if locationGroup.canAccess(game):
-      if locationGroup.getAvailableLocationCount() > 0:
-        accessibleLocationGroups.append(locationGroup)
+  for locationGroup in accessibleGroups:
+    if locationGroup.getAvailableLocationCount() > 0:
+      accessibleLocationGroups.append(locationGroup)
   
   return accessibleLocationGroups
   
 # end getAvailableLocations
 
 #
-# Given a list of LocationGroups, get a random location.
-#
-# param: groups - List of LocationGroups
-# 
-# return: The LocationGroup the Location was chosen from
-# return: A Location randomly chosen from the groups list
-#
-def getRandomLocation(groups):
-  # get the max rand value from the combined weightings of the location groups
-  # This will be used to help select a location group
-  weightTotal = 0
-  for group in groups:
-    weightTotal = weightTotal + group.getWeight()
+# The LocationSampler class chooses random locations for key items.
+#
+# A group is chosen with a probability proportional to its weight among
+# the groups that are accessible and have locations left, and then a
+# location is chosen from the group.  The group weights are kept in a
+# logictypes.WeightedSampler, so the choice does not need a pass over
+# every group.  The groups that can be chosen are updated from the
+# reachability cache as the game state changes, and the groups that ran
+# out of locations are masked out.
+#
+# Taking a location decays its group's weight; returning it (when the
+# placement backtracks) undoes the decay, so locations must be returned
+# in the reverse order they were taken.
+#
+class LocationSampler:
+  #
+  # param: locationGroups - List of all LocationGroups for the game
+  # param: cache - ReachabilityCache for locationGroups
+  #
+  def __init__(self, locationGroups, cache):
+    self.locationGroups = locationGroups
+    self.cache = cache
+    self.sampler = logictypes.WeightedSampler([group.getWeight() for group in locationGroups], 0)
+    self.nonEmptyMask = 0
+    for index, group in enumerate(locationGroups):
+      if group.getAvailableLocationCount() > 0:
+        self.nonEmptyMask |= 1 << index
   
-  # Select a location group
-  locationChoice = rand.randint(1, weightTotal)
-  counter = 0
-  chosenGroup = None
-  for group in groups:
-    counter = counter + group.getWeight()
-    if counter >= locationChoice:
-      chosenGroup = group
-      break
+  #
+  # Get a random location that is available with the current game state.
+  #
+  # param: game - Game object used to determine location access
+  # param: rand - random.Random used for the selection
+  #
+  # return: The index of the LocationGroup the Location was chosen from,
+  #         or None if no location is available
+  # return: A Location randomly chosen from the group
+  #
+  def chooseLocation(self, game, rand):
+    self.sampler.setEnabledMask(self.cache.getAccessible(game.getState()) & self.nonEmptyMask)
+    index = self.sampler.sample(rand)
+    if index is None:
+      return None, None
     
-  # Select a random location from the chosen location group.
-  location = rand.choice(chosenGroup.getLocations())
+    # Select a random location from the chosen location group.
+    location = rand.choice(self.locationGroups[index].getLocations())
+    return index, location
+  
+  #
+  # Take a location out of its group and decay the group's weight.
+  #
+  # param: index - Index of the LocationGroup the Location is part of
+  # param: location - The Location
+  #
+  def takeLocation(self, index, location):
+    group = self.locationGroups[index]
+    group.removeLocation(location)
+    if group.getAvailableLocationCount() == 0:
+      self.nonEmptyMask &= ~(1 << index)
+    self.sampler.setWeight(index, group.getDecayedWeight(self.sampler.getWeight(index)))
   
-  return chosenGroup, location
-# end getRandomLocation
+  #
+  # Put the location taken last back into its group and undo the decay.
+  #
+  # param: index - Index of the LocationGroup the Location was taken from
+  # param: location - The Location
+  #
+  def returnLocation(self, index, location):
+    self.locationGroups[index].addLocation(location)
+    self.nonEmptyMask |= 1 << index
+    self.sampler.undo()
+# end LocationSampler class
 
 #
 # Given a weighted list of key items, get a shuffled
 # version of the list with only a single copy of each item.
 #
 # param: weightedList - Weighted key item list
+# param: rand - random.Random used for the shuffle
 #
 # return: Shuffled list of key items with duplicates removed
 #
-def getShuffledKeyItemList(weightedList):
+def getShuffledKeyItemList(weightedList, rand):
   tempList = weightedList.copy()
   rand.shuffle(tempList)
   
@@ -94,72 +146,125 @@ def getShuffledKeyItemList(weightedList):
   return keyItemList
 # end getShuffledKeyItemList
 
-#
-# Randomly place key items.
-#
-# param: gameConfig A GameConfig object with the configuration information
-#                   necessary to place keys for the selected game type
-#
-# return: A tuple containing:
-#             A Boolean indicating whether or not key item placement was successful
-#             A list of locations with key items assigned
-#
-def determineKeyItemPlacement(gameConfig):
-  global locationGroups
-  locationGroups = gameConfig.getLocations()
-  game = gameConfig.getGame()
-  remainingKeyItems = gameConfig.getKeyItemList()
-  chosenLocations = []
-  return determineKeyItemPlacement_impl(chosenLocations, remainingKeyItems, game)
-# end place_key_items
+# Default search limits of determineKeyItemPlacement.  The node limit keeps
+# placement deterministic for a seed; the time limit is off by default so
+# a slow machine does not fail seeds that a fast one places.
+MAX_PLACEMENT_NODES = 100000
+MAX_PLACEMENT_SECONDS = None
+# Failed backtracks before the first restart, scaled by the Luby sequence
+RESTART_BACKTRACKS = 256
 
+#
+# Get a value of the Luby sequence (1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...).
+# Restarting after a number of failures that follows this sequence gives
+# both short and long searches a chance, whatever the seed needs.
+#
+# param: index - Index into the sequence, starting at 1
+# return: The value of the sequence
+#
+def getLubyValue(index):
+  while True:
+    size = 1
+    while size < index:
+      size = size * 2 + 1
+    # index is in a block of size 2^k - 1.  The last entry of the block
+    # is 2^(k-1), the others repeat the previous block.
+    if index == size:
+      return (size + 1) // 2
+    index -= size // 2
+# end getLubyValue
 
 #
-# NOTE: Do not call this function directly. This will be called 
-#       by determineKeyItemPlacement after setting up the parameters
-#       needed by this function.
+# The PlacementFrame class holds one step of the placement search: the
+# location chosen for a key item and the key items left to try there.
+#
+class PlacementFrame:
+  def __init__(self, groupIndex, location, remainingKeyItems, keyItemList):
+    self.groupIndex = groupIndex
+    self.location = location
+    self.remainingKeyItems = remainingKeyItems
+    self.keyItemList = keyItemList
+    self.nextKeyItem = 0
+    self.keyItem = None
+# end PlacementFrame class
+
 #
-# This function will recursively determine key item locations
-# such that a seed can be 100% completed.  This uses a weighted random
-# approach to placement and will only consider logically accessible locations.
+# Randomly place key items.
 #
-# The algorithm for determining locations - For each recursion:
-#   If there are no key items remaining, unwind the recursion, otherwise
+# This determines key item locations such that a seed can be 100% completed.
+# It uses a weighted random approach to placement and will only consider
+# logically accessible locations.  For each step:
+#   If there are no key items remaining, placement is done, otherwise
 #     Get a list of logically accessible locations
 #     Choose a location randomly (locations are weighted)
 #     Get a shuffled list of the remaining key items
-#     Loop through the key item list, trying each one in the chosen location
-#       Recurse and try the next location/key item
-#     
+#     Try each key item in the chosen location and go on to the next step
+#   If no key item works in the location, undo the step and try the next
+#   key item of the previous step.
+#
+# The steps are kept on a stack rather than the call stack, so the search
+# can be bounded:
+#   - After a number of failed backtracks that follows the Luby sequence,
+#     the search undoes every step and starts over with new random choices.
+#   - Once maxNodes locations were chosen, or maxSeconds have passed, the
+#     search undoes every step and gives up.
 #
-# param: chosenLocations - List of locations already chosen for key items
-# param: remainingKeyItems - List of key items remaining to be placed
-# param: game - Game object used to determine logic
+# param: gameConfig A GameConfig object with the configuration information
+#                   necessary to place keys for the selected game type
+# param: rand - random.Random used for placement decisions
+# param: stats - Optional dictionary the placement counters are written to:
+#                  placements - Key items tried in a location
+#                  backtracks - Locations undone because no key item worked
+#                  nodes      - Locations chosen
+#                  restarts   - Times the search started over
+#                  time       - Seconds spent placing
+#                and the reachability cache hits and misses of this placement
+# param: maxNodes - Number of locations to choose before giving up, or None
+# param: maxSeconds - Seconds to search before giving up, or None
+# param: restartBacktracks - Failed backtracks before the first restart, or
+#                            None to never restart
 #
 # return: A tuple containing:
 #             A Boolean indicating whether or not key item placement was successful
 #             A list of locations with key items assigned
 #
-def determineKeyItemPlacement_impl(chosenLocations, remainingKeyItems, game):
-  if len(remainingKeyItems) == 0:
-    # We've placed all key items.  This is our breakout condition
-    return True, chosenLocations
-  else:
-    # We still have key items to place.
-    availableLocations = getAvailableLocations(game)
-    if len(availableLocations) == 0:
-      # This item configuration is not completable. 
-      return False, chosenLocations
-    else:
-      # Continue placing key items.
-      keyItemConfirmed = False
-      returnedChosenLocations = None
-      
-      # Choose a random location
-      locationGroup, location = getRandomLocation(availableLocations)
-      locationGroup.removeLocation(location)
-      locationGroup.decayWeight()
+def determineKeyItemPlacement(gameConfig, rand, stats=None, maxNodes=MAX_PLACEMENT_NODES,
+                              maxSeconds=MAX_PLACEMENT_SECONDS,
+                              restartBacktracks=RESTART_BACKTRACKS):
+  locationGroups = gameConfig.getLocations()
+  game = gameConfig.getGame()
+  keyItemList = gameConfig.getKeyItemList()
+  if stats is None:
+    stats = {}
+  stats["placements"] = 0
+  stats["backtracks"] = 0
+  stats["nodes"] = 0
+  stats["restarts"] = 0
+  cache = logictypes.getReachabilityCache(locationGroups)
+  locationSampler = LocationSampler(locationGroups, cache)
+  startStats = cache.getStats()
+  startTime = time.perf_counter()
+  deadline = None if maxSeconds is None else startTime + maxSeconds
+  
+  chosenLocations = []
+  stack = []
+  remainingKeyItems = keyItemList
+  restartLimit = None if restartBacktracks is None else restartBacktracks * getLubyValue(1)
+  failedBacktracks = 0
+  success = False
+  while True:
+    if len(remainingKeyItems) == 0:
+      # We've placed all key items.
+      success = True
+      break
+    
+    # Choose a location for the next key item.  If no location is
+    # available, this item configuration is not completable.
+    groupIndex, location = locationSampler.chooseLocation(game, rand)
+    if groupIndex is not None:
+      locationSampler.takeLocation(groupIndex, location)
       chosenLocations.append(location)
+      stats["nodes"] += 1
       
       # If 2/3 of the key items have been placed
       # then remove the key item bias from the remaining list.
@@ -176,42 +281,99 @@ def determineKeyItemPlacement_impl(chosenLocations, remainingKeyItems, game):
       
       # Use the weighted key item list to get a list of key items
       # that we can loop through and attempt to place.
-      localKeyItemList = getShuffledKeyItemList(remainingKeyItems)
-      for keyItem in localKeyItemList:
-        # Try placing this key item and then recurse
-        location.setKeyItem(keyItem)
-        game.addKeyItem(keyItem)
-        
-        newKeyItemList = [x for x in remainingKeyItems if x != keyItem]
-        # recurse and try to place the next key item.
-        keyItemConfirmed, returnedChosenLocations = \
-            determineKeyItemPlacement_impl(chosenLocations, newKeyItemList, game)
-        
-        if keyItemConfirmed:
-          # We're unwinding the recursion here, all key items are placed.
-          return keyItemConfirmed, returnedChosenLocations
-        else:
-          game.removeKeyItem(keyItem)
-      # end keyItem loop
-      
-      # If we get here, we failed to place an item.  Undo location modifications
-      locationGroup.addLocation(location)
-      locationGroup.undoWeightDecay()
-      chosenLocations.remove(location)
-      location.unsetKeyItem()
-      
-      return False, chosenLocations
+      stack.append(PlacementFrame(groupIndex, location, remainingKeyItems,
+                                  getShuffledKeyItemList(remainingKeyItems, rand)))
+    
+    # Find the newest step with a key item left to try.  The key item
+    # placed by a step that failed is removed, and steps with no key
+    # items left to try are undone.
+    restart = False
+    while len(stack) > 0:
+      frame = stack[-1]
+      if frame.keyItem is not None:
+        game.removeKeyItem(frame.keyItem)
+        frame.keyItem = None
+      if frame.nextKeyItem < len(frame.keyItemList):
+        break
+      undoPlacementFrame(frame, chosenLocations, locationSampler)
+      stack.pop()
+      stats["backtracks"] += 1
+      failedBacktracks += 1
+      if restartLimit is not None and failedBacktracks >= restartLimit:
+        restart = True
+        break
+    
+    if restart:
+      # Start over with new random choices
+      undoPlacementFrames(stack, game, chosenLocations, locationSampler)
+      stats["restarts"] += 1
+      restartLimit = restartBacktracks * getLubyValue(stats["restarts"] + 1)
+      failedBacktracks = 0
+      remainingKeyItems = keyItemList
+      continue
+    if len(stack) == 0:
+      # Every key item was tried in every location.
+      break
+    if ((maxNodes is not None and stats["nodes"] >= maxNodes) or
+        (deadline is not None and time.perf_counter() >= deadline)):
+      undoPlacementFrames(stack, game, chosenLocations, locationSampler)
+      break
+    
+    # Try the next key item in the location and go on to the next step
+    frame = stack[-1]
+    keyItem = frame.keyItemList[frame.nextKeyItem]
+    frame.nextKeyItem += 1
+    frame.keyItem = keyItem
+    frame.location.setKeyItem(keyItem)
+    game.addKeyItem(keyItem)
+    stats["placements"] += 1
+    remainingKeyItems = [x for x in frame.remainingKeyItems if x != keyItem]
+  
+  stats["time"] = time.perf_counter() - startTime
+  endStats = cache.getStats()
+  stats["reachability_hits"] = endStats["hits"] - startStats["hits"]
+  stats["reachability_misses"] = endStats["misses"] - startStats["misses"]
+  return success, chosenLocations
+# end determineKeyItemPlacement
 
-# end determineKeyItemPlacement_impl recursive function
+#
+# Undo a placement step: put its location back into its group.
+#
+# param: frame - The PlacementFrame to undo, with no key item in game
+# param: chosenLocations - List of locations chosen for key items
+# param: locationSampler - LocationSampler the location was taken from
+#
+def undoPlacementFrame(frame, chosenLocations, locationSampler):
+  locationSampler.returnLocation(frame.groupIndex, frame.location)
+  chosenLocations.remove(frame.location)
+  frame.location.unsetKeyItem()
+# end undoPlacementFrame
+
+#
+# Undo every placement step, newest first, and empty the stack.
+#
+# param: stack - List of PlacementFrames
+# param: game - Game object the key items are removed from
+# param: chosenLocations - List of locations chosen for key items
+# param: locationSampler - LocationSampler the locations were taken from
+#
+def undoPlacementFrames(stack, game, chosenLocations, locationSampler):
+  while len(stack) > 0:
+    frame = stack.pop()
+    if frame.keyItem is not None:
+      game.removeKeyItem(frame.keyItem)
+      frame.keyItem = None
+    undoPlacementFrame(frame, chosenLocations, locationSampler)
+# end undoPlacementFrames
 
 #
 # Write out the spoiler log.
 #
 # param: chosenLocations - List of locations containing key items
 # param: charLocations - Dictionary of locations to characters
+# param: spoilerLog - SpoilerLog to write to
 #
-def writeSpoilerLog(chosenLocations, charLocations):
-  spoilerLog = open("spoiler_log.txt","w+")
+def writeSpoilerLog(chosenLocations, charLocations, spoilerLog):
   # Write the key item location to the spoiler log
   
   spoilerLog.write("Key ItemLocations:\n")
@@ -223,7 +385,6 @@ def writeSpoilerLog(chosenLocations, charLocations):
   for loc, char in charLocations.items():
     character = logictypes.Characters(char[0])
     spoilerLog.write("  " + loc + ": " + character.name + "\n")
-  spoilerLog.close()
 
 
 #
@@ -232,10 +393,11 @@ def writeSpoilerLog(chosenLocations, charLocations):
 # Loot tiers are set as part of the location construction.
 #
 # param: location - BaselineLocation that needs loot 
+# param: rand - random.Random used to pick the treasure
 #
 # return: The item code for a random treasure
 #
-def getRandomTreasure(location):
+def getRandomTreasure(location, rand):
   treasureCode = 0;
   
   lootTier = location.getLootTier()
@@ -290,45 +452,52 @@ def getRandomTreasure(location):
     
    
 #
-# Determine key item placements and write them to the provided ROM file.
+# Determine key item placements and write them to the provided ROM image.
 # Additionally, a spoiler log is written that lists where the key items and
 # characters were placed.
 #
-# param: outFile - File name of the output ROM
+# param: rom - RomImage of the output ROM
+# param: rand - random.Random used for placement decisions
 # param: charLocations - Dictionary of character locations from characterwriter.py
 # param: lockedChars - Whether or not the locked characters flag is selected
 # param: earlyPendant - Whether or not the early pendant charge flag is selected
 # param: lostWorlds - Whether or not the Lost Worlds flag is selected
+# param: spoilerLog - SpoilerLog the key item and character placements are written to
+# param: stats - Optional dictionary the placement counters are written to
+# return: Dictionary of location names to key item names
+# raise: logictypes.PlacementError if the key items could not be placed
 #
-def writeKeyItems(outFile, charLocations, lockedChars, earlyPendant, lostWorlds):
+def writeKeyItems(rom, rand, charLocations, lockedChars, earlyPendant, lostWorlds, spoilerLog,
+                  stats=None):
   # Get a game configuration for the provided flags
   gameConfig = logicfactory.getGameConfig(True, lostWorlds, earlyPendant, lockedChars, charLocations)
 
   # Determine placements for the key items
-  success, chosenLocations = determineKeyItemPlacement(gameConfig)
+  if stats is None:
+    stats = {}
+  success, chosenLocations = determineKeyItemPlacement(gameConfig, rand, stats)
   
   if not success:
-    print("Unable to place key items.")
-    return
+    raise logictypes.PlacementError(
+        "Unable to place key items (%d locations tried, %d restarts)" %
+        (stats["nodes"], stats["restarts"]))
   
   # Write key items to their locations in the ROM.
-  romFile = open(outFile, "r+b")
   for location in chosenLocations:
-    location.writeKeyItem(romFile)
+    location.writeKeyItem(rom)
   
   # Go through any baseline locations not assigned an item and place a 
   # piece of treasure. Treasure quality is based on the location's loot tier.
-  for locationGroup in locationGroups:
+  for locationGroup in gameConfig.getLocations():
     for location in locationGroup.getLocations():
       if type(location) == logictypes.BaselineLocation and (not location in chosenLocations):
         # This is a baseline location without a key item.  
         # Assign a piece of treasure.
-        treasureCode = getRandomTreasure(location)
-        location.writeTreasure(treasureCode, romFile)
-  
-  romFile.close()
+        treasureCode = getRandomTreasure(location, rand)
+        location.writeTreasure(treasureCode, rom)
   
-  writeSpoilerLog(chosenLocations, charLocations)
+  writeSpoilerLog(chosenLocations, charLocations, spoilerLog)
+  return {location.getName(): location.getKeyItem().name for location in chosenLocations}
   
 # End writeKeyItems function
 
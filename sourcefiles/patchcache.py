@@ -0,0 +1,293 @@
+import contextlib
+import contextvars
+import hashlib
+import os
+import struct as st
+import threading
+
+import diskcache
+
+#
+# This file holds the compiled patch cache.
+#
+# Every patch the randomizer applies (IPS files and the hex text patches)
+# is reduced to a list of (offset, payload) records.  Parsing is only done
+# once per patch: the records are compiled into a compact binary file that
+# is stored in a __patchcache__ directory next to the patch.  Later runs
+# load the compiled file instead of parsing the patch again.
+#
+# Compiled file layout (little endian):
+#   header - magic, source size, source mtime (ns), source SHA-256,
+#            record count, data blob size
+#   table  - one (offset, length) pair of 32 bit values per record
+#   blob   - the payloads of every record, back to back
+#
+# A compiled file is used when the size and mtime of the source patch
+# match the header.  If only the mtime changed (e.g. after a fresh
+# checkout) the source is hashed and the compiled file is reused when the
+# hash still matches.  Otherwise the patch is recompiled.
+#
+# Patches are only loaded the first time they are needed, and are kept in
+# memory for the rest of the process.
+#
+# The writers name their patches relative to the randomizer folder
+# (e.g. "patches/nomusic.ips").  Relative names are looked up in the
+# current directory, or in the data directory if one is set, so the
+# randomizer can be used from a process running somewhere else.  A data
+# directory is either passed to load_records, set for the code running
+# in a with use_data_directory() block, which seedapi does for every
+# seed, or set for the whole process with set_data_directory.  The with
+# block can also turn off writing compiled patches to disk.
+#
+
+CACHE_DIRECTORY = "__patchcache__"
+CACHE_MAGIC = b"JOTPCH01"
+HEADER_FORMAT = "<8sQq32sII"
+HEADER_SIZE = st.calcsize(HEADER_FORMAT)
+RECORD_FORMAT = "<II"
+RECORD_SIZE = st.calcsize(RECORD_FORMAT)
+
+# Folder relative patch names are resolved against, or None to use the
+# current directory.  See set_data_directory.
+dataDirectory = None
+
+# (data directory, write compiled patches) of the current seed, or None
+# to use dataDirectory and write them.  See use_data_directory.
+seedOptions = contextvars.ContextVar("seedOptions", default=None)
+
+# Loaded patches, keyed by the patch path.
+# Each entry is (source size, source mtime, records)
+loadedPatches = {}
+
+# Seeds can be generated on several threads, see seedapi
+cacheLock = threading.Lock()
+
+#
+# Set the folder holding patch.ips and the patches folder.
+#
+# param: directory - Folder to resolve relative patch names against, or
+#                    None to use the current directory
+#
+def set_data_directory(directory):
+  global dataDirectory
+  dataDirectory = directory
+# end set_data_directory
+
+#
+# Set the data directory for the code run in a with block.  Unlike
+# set_data_directory this only applies to the current thread (and the
+# stage threads started from it), so seeds with different data
+# directories can be generated at the same time.
+#
+# param: directory - Folder to resolve relative patch names against, or
+#                    None to use the current directory
+# param: writeCache - False to never write compiled patches to disk
+#
+@contextlib.contextmanager
+def use_data_directory(directory, writeCache=True):
+  token = seedOptions.set((directory, writeCache))
+  try:
+    yield
+  finally:
+    seedOptions.reset(token)
+# end use_data_directory
+
+#
+# Get the data directory and compiled patch writing of the caller.
+#
+# return: Tuple of (data directory, write compiled patches)
+#
+def get_options():
+  options = seedOptions.get()
+  if options is None:
+    return dataDirectory, True
+  return options
+# end get_options
+
+#
+# Get the path of a patch file.
+#
+# param: patch - Patch name, relative to the data directory, or a path
+# param: directory - Data directory, or None for the one of the caller
+# return: Path to open the patch with
+#
+def get_patch_path(patch, directory=None):
+  if directory is None:
+    directory = get_options()[0]
+  if directory is None or os.path.isabs(patch):
+    return patch
+  return os.path.join(directory, patch)
+# end get_patch_path
+
+#
+# Get the path of the compiled file for a patch.
+#
+# param: patch - Path of the source patch
+# return: Path of the compiled patch file
+#
+def get_cache_path(patch):
+  directory, name = os.path.split(patch)
+  return os.path.join(directory, CACHE_DIRECTORY, name + ".bin")
+# end get_cache_path
+
+#
+# Convert a list of records into the compiled binary form.
+#
+# param: records - List of (offset, payload) tuples
+# param: sourceSize - Size of the source patch in bytes
+# param: sourceTime - Modification time of the source patch in nanoseconds
+# param: sourceHash - SHA-256 digest of the source patch
+# return: bytes object holding the compiled patch
+#
+def compile_records(records, sourceSize, sourceTime, sourceHash):
+  table = bytearray()
+  blob = bytearray()
+  for offset, payload in records:
+    table += st.pack(RECORD_FORMAT, offset, len(payload))
+    blob += payload
+  header = st.pack(HEADER_FORMAT, CACHE_MAGIC, sourceSize, sourceTime,
+                   sourceHash, len(records), len(blob))
+  return header + bytes(table) + bytes(blob)
+# end compile_records
+
+#
+# Read the header of a compiled patch.
+#
+# param: compiled - bytes object holding a compiled patch
+# return: Tuple of (source size, source mtime, source hash, record count,
+#         blob size), or None if the data is not a valid compiled patch
+#
+def read_header(compiled):
+  if len(compiled) < HEADER_SIZE:
+    return None
+  magic, sourceSize, sourceTime, sourceHash, count, blobSize = \
+      st.unpack_from(HEADER_FORMAT, compiled)
+  if magic != CACHE_MAGIC:
+    return None
+  if len(compiled) != HEADER_SIZE + count * RECORD_SIZE + blobSize:
+    return None
+  return (sourceSize, sourceTime, sourceHash, count, blobSize)
+# end read_header
+
+#
+# Convert a compiled patch back into a list of records.
+# The payloads are memoryview slices of the compiled data.
+#
+# param: compiled - bytes object holding a compiled patch
+# param: count - Number of records in the compiled patch
+# return: List of (offset, payload) tuples
+#
+def load_compiled_records(compiled, count):
+  view = memoryview(compiled)
+  tableEnd = HEADER_SIZE + count * RECORD_SIZE
+  blob = view[tableEnd:]
+  records = []
+  position = 0
+  for offset, length in st.iter_unpack(RECORD_FORMAT, view[HEADER_SIZE:tableEnd]):
+    records.append((offset, blob[position:position + length]))
+    position += length
+  return records
+# end load_compiled_records
+
+#
+# Write a compiled patch to the cache directory.  The file is written
+# under a temporary name and moved into place so that other processes
+# never see a partial file.  Failing to write the cache is not an error,
+# the compiled records are still used for this run.
+#
+# param: cachePath - Path of the compiled patch file
+# param: compiled - bytes object holding the compiled patch
+#
+def store_compiled(cachePath, compiled):
+  diskcache.write_file(cachePath, compiled)
+# end store_compiled
+
+#
+# Read a compiled patch from the cache if it is still valid for the
+# source patch.
+#
+# param: patch - Path of the source patch
+# param: sourceSize - Size of the source patch in bytes
+# param: sourceTime - Modification time of the source patch in nanoseconds
+# param: writeCache - False to not store the refreshed mtime on disk
+# return: List of records, or None if there is no valid compiled patch
+#
+def read_cached_records(patch, sourceSize, sourceTime, writeCache=True):
+  cachePath = get_cache_path(patch)
+  try:
+    with open(cachePath, "rb") as cacheFile:
+      compiled = cacheFile.read()
+  except OSError:
+    return None
+  header = read_header(compiled)
+  if header is None:
+    return None
+  cachedSize, cachedTime, cachedHash, count, blobSize = header
+  if cachedSize != sourceSize:
+    return None
+  if cachedTime != sourceTime:
+    # The patch was touched.  Reuse the compiled file if the contents
+    # are unchanged and refresh the stored mtime.
+    with open(patch, "rb") as patchFile:
+      if hashlib.sha256(patchFile.read()).digest() != cachedHash:
+        return None
+    compiled = bytearray(compiled)
+    st.pack_into(HEADER_FORMAT, compiled, 0, CACHE_MAGIC, sourceSize,
+                 sourceTime, cachedHash, count, blobSize)
+    compiled = bytes(compiled)
+    if writeCache:
+      store_compiled(cachePath, compiled)
+  return load_compiled_records(compiled, count)
+# end read_cached_records
+
+#
+# Parse a patch and store the compiled result in the cache.
+#
+# param: patch - Path of the source patch
+# param: parser - Function converting the patch file contents to records
+# param: sourceTime - Modification time of the source patch in nanoseconds
+# param: writeCache - False to not write the compiled patch to disk
+# return: List of records loaded from the compiled patch
+# raise: ValueError naming the patch if the parser rejects it
+#
+def compile_patch(patch, parser, sourceTime, writeCache=True):
+  with open(patch, "rb") as patchFile:
+    source = patchFile.read()
+  try:
+    records = parser(source)
+  except ValueError as error:
+    raise ValueError("Invalid patch %s: %s" % (patch, error))
+  compiled = compile_records(records, len(source), sourceTime,
+                             hashlib.sha256(source).digest())
+  if writeCache:
+    store_compiled(get_cache_path(patch), compiled)
+  return load_compiled_records(compiled, len(records))
+# end compile_patch
+
+#
+# Get the records for a patch, loading or compiling it on first use.
+#
+# param: patch - Name of the source patch, see get_patch_path
+# param: parser - Function converting the patch file contents to records.
+#                 Only called when there is no valid compiled patch.
+# param: directory - Data directory, or None for the one of the caller
+# return: List of (offset, payload) tuples in patch order
+#
+def load_records(patch, parser, directory=None):
+  callerDirectory, writeCache = get_options()
+  if directory is None:
+    directory = callerDirectory
+  patch = get_patch_path(patch, directory)
+  info = os.stat(patch)
+  with cacheLock:
+    loaded = loadedPatches.get(patch)
+  if loaded is not None and loaded[0] == info.st_size and \
+     loaded[1] == info.st_mtime_ns:
+    return loaded[2]
+  records = read_cached_records(patch, info.st_size, info.st_mtime_ns, writeCache)
+  if records is None:
+    records = compile_patch(patch, parser, info.st_mtime_ns, writeCache)
+  with cacheLock:
+    loadedPatches[patch] = (info.st_size, info.st_mtime_ns, records)
+  return records
+# end load_records
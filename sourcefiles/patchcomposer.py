@@ -0,0 +1,187 @@
+import heapq
+import os
+import sys
+import threading
+
+import ipswriter
+import patchcache
+import patcher
+
+#
+# This file holds the static patch composer.
+#
+# A flag set applies several patches in a fixed order, and later patches
+# overwrite parts of earlier ones (e.g. hard.ips on top of patch.ips).
+# The composer flattens an ordered patch list into a single list of
+# non-overlapping runs, sorted by offset, where every byte comes from the
+# last patch that writes it.  Applying the merged runs gives the same ROM
+# as applying the patches one after another, but every byte is written
+# once and the runs can be applied in any order.
+#
+# Overlaps where a later patch writes different bytes than an earlier
+# patch are reported as conflicts.  Overlaps that write the same bytes
+# are not conflicts.
+#
+
+# Merged patch lists already built by this process, keyed by the
+# tuple of patch names.  Each entry is (records, merged runs, conflicts)
+composedPatches = {}
+
+# Seeds can be generated on several threads, see seedapi
+composeLock = threading.Lock()
+
+#
+# Load the records of a single patch through the patch cache.
+#
+# param: patch - File name of an IPS or hex text patch
+# return: List of (offset, payload) tuples in patch order
+#
+def load_patch(patch):
+  if patch.endswith(".ips"):
+    return patchcache.load_records(patch, ipswriter.read_records)
+  return patchcache.load_records(patch, patcher.parse_patch)
+# end load_patch
+
+#
+# Flatten ordered lists of records into non-overlapping runs.
+#
+# The records are swept from the lowest to the highest offset.  At every
+# boundary the active record that was written last wins, and adjacent
+# bytes taken from the same record are kept together in one run.
+#
+# param: patchRecords - List of (patch name, records) tuples in the order
+#                       the patches would be applied
+# return: Tuple of (runs, conflicts).  runs is a list of (offset, bytes)
+#         tuples sorted by offset.  conflicts is a list of
+#         (start, end, earlier patch, later patch) tuples.
+#
+def flatten(patchRecords):
+  records = []
+  boundaries = set()
+  sequence = 0
+  for patchIndex, (patch, patchList) in enumerate(patchRecords):
+    for offset, payload in patchList:
+      if len(payload) == 0:
+        continue
+      records.append((offset, offset + len(payload), sequence, patchIndex, payload))
+      boundaries.add(offset)
+      boundaries.add(offset + len(payload))
+      sequence += 1
+  records.sort()
+  boundaries = sorted(boundaries)
+
+  runs = []
+  conflicts = []
+  active = []
+  nextRecord = 0
+  runStart = None
+  runEnd = None
+  runParts = []
+  for index in range(len(boundaries) - 1):
+    start = boundaries[index]
+    end = boundaries[index + 1]
+    while nextRecord < len(records) and records[nextRecord][0] <= start:
+      record = records[nextRecord]
+      heapq.heappush(active, (-record[2], record))
+      nextRecord += 1
+    # Drop the records that end before this segment
+    live = [entry for entry in active if entry[1][1] > start]
+    if len(live) != len(active):
+      active = live
+      heapq.heapify(active)
+    if len(active) == 0:
+      continue
+
+    winner = active[0][1]
+    piece = bytes(winner[4][start - winner[0]:end - winner[0]])
+    # Check the records hidden by the winner for conflicting bytes
+    for priority, other in active:
+      if other is winner or other[3] == winner[3]:
+        continue
+      if bytes(other[4][start - other[0]:end - other[0]]) != piece:
+        conflicts.append((start, end, patchRecords[other[3]][0],
+                          patchRecords[winner[3]][0]))
+
+    if runEnd == start:
+      runParts.append(piece)
+    else:
+      if runStart is not None:
+        runs.append((runStart, b"".join(runParts)))
+      runStart = start
+      runParts = [piece]
+    runEnd = end
+  if runStart is not None:
+    runs.append((runStart, b"".join(runParts)))
+  return runs, merge_conflicts(conflicts)
+# end flatten
+
+#
+# Merge adjacent conflict ranges between the same pair of patches.
+#
+# param: conflicts - List of (start, end, earlier patch, later patch) tuples
+# return: List of merged conflict tuples sorted by offset
+#
+def merge_conflicts(conflicts):
+  merged = []
+  for conflict in sorted(conflicts):
+    if len(merged) > 0:
+      last = merged[-1]
+      if last[1] == conflict[0] and last[2:] == conflict[2:]:
+        merged[-1] = (last[0], conflict[1], last[2], last[3])
+        continue
+    merged.append(conflict)
+  return merged
+# end merge_conflicts
+
+#
+# Compose an ordered list of patches into one merged run list.
+# The result is kept for the rest of the process and rebuilt if any of
+# the patches changes on disk.
+#
+# param: patchList - List of patch file names in application order
+# return: Tuple of (runs, conflicts) as returned by flatten
+#
+def compose(patchList):
+  key = tuple(patchList)
+  patchRecords = [(patch, load_patch(patch)) for patch in patchList]
+  recordLists = [records for patch, records in patchRecords]
+  with composeLock:
+    composed = composedPatches.get(key)
+  if composed is not None and all(a is b for a, b in zip(composed[0], recordLists)):
+    return composed[1], composed[2]
+  runs, conflicts = flatten(patchRecords)
+  with composeLock:
+    composedPatches[key] = (recordLists, runs, conflicts)
+  return runs, conflicts
+# end compose
+
+#
+# Apply an ordered list of patches to a ROM image as one merged patch.
+#
+# param: patchList - List of patch file names in application order
+# param: rom - The RomImage to patch
+#
+def apply_patches(patchList, rom):
+  runs, conflicts = compose(patchList)
+  ipswriter.apply_records(runs, rom)
+# end apply_patches
+
+#
+# Print the conflicts found when composing a list of patches.
+#
+# param: patchList - List of patch file names in application order
+#
+def print_conflicts(patchList):
+  runs, conflicts = compose(patchList)
+  print("%d runs, %d bytes" % (len(runs), sum(len(run) for offset, run in runs)))
+  for start, end, earlier, later in conflicts:
+    print("0x%06X-0x%06X: %s overwritten by %s" % (start, end - 1, earlier, later))
+  if len(conflicts) == 0:
+    print("No conflicts.")
+# end print_conflicts
+
+if __name__ == "__main__":
+  if len(sys.argv) < 2:
+    print("Usage: patchcomposer.py PATCH [PATCH ...]")
+  else:
+    print_conflicts([os.path.normpath(patch) for patch in sys.argv[1:]])
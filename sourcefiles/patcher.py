@@ -1,25 +1,26 @@
-from shutil import copyfile
-import struct as st
-from os import stat
-def patch_file(patch,outfile):
-     p = open(patch,"r")
-     f = open(outfile,'r+b')
-     for line in p:
-        writelist = []
+import romimage
+import patchcache
+import ipswriter
+#Hex text patches are lines of the form ADDRESS:LENGTH:XX XX XX ...
+#The parsed records are cached by patchcache, so the text is only parsed once.
+#Raises ValueError for a line with fewer values than its length.
+def parse_patch(data):
+     records = []
+     for number, line in enumerate(data.decode("ascii").splitlines(), 1):
+        if line.strip() == "":
+            continue
         line = line.split(":")
         address = int(line[0],0x10)
         length = int(line[1],0x10)
-        bytes = line[2]
-        bytes = bytes.split(" ")
-        i = 0
-        while i < length:
-            bytes[i] = int(bytes[i],0x10)
-            f.seek(address)
-            f.write(st.pack("B",bytes[i]))
-            address += 1            
-            i += 1
-     f.close()
-     p.close()
+        values = line[2].split(" ")[:length]
+        if len(values) != length:
+            raise ValueError("line %d has %d values, expected %d"%(number,len(values),length))
+        records.append((address,bytes(int(value,0x10) for value in values)))
+     return records
+def patch_file(patch,rom):
+     ipswriter.apply_records(patchcache.load_records(patch,parse_patch),rom)
 if __name__ == "__main__":
     file = input("Enter patch name.")
-    patch_file(file,"Projectfile.smc")
+    rom = romimage.loadRom("Projectfile.smc")
+    patch_file(file,rom)
+    rom.writeToFile("Projectfile.smc")
@@ -1,24 +1,16 @@
-from shutil import copyfile
-import struct as st
-from os import stat
 from time import time
 import sys
-import pathlib
-import treasurewriter as treasures
-import specialwriter as hardcoded_items
-import shopwriter as shops
-import characterwriter as char_slots
-import logicwriter as keyitems
-import logicwriter_chronosanity as chronosanity_logic
+import os
 import random as rand
-import ipswriter as bigpatches
-import patcher as patches
-import enemywriter as enemystuff
-import bossrando as boss_shuffler
-import bossscaler as boss_scale
-import techwriter as tech_order
-import randomizergui as gui
-import tabchange as tabwriter
+import romimage
+import basecache
+import patchcomposer
+import generationcontext
+import generationstages
+import stagegraph
+import stageprofiler
+import iotrace
+from generationcontext import Settings, GenerationContext
 
 def read_names():
         p = open("names.txt","r")
@@ -27,56 +19,14 @@ def read_names():
         p.close()
         return names
 
-# Script variables
-flags = ""
-sourcefile = ""
-outputfolder = ""
-difficulty = ""
-glitch_fixes = ""
-fast_move = ""
-sense_dpad = ""
-lost_worlds = ""
-boss_scaler = ""
-zeal_end = ""
-quick_pendant = ""
-locked_chars = ""
-tech_list = ""
-seed = ""
-tech_list = ""
-unlocked_magic = ""
-quiet_mode = ""
-chronosanity = ""
-tab_treasures = ""
-boss_rando = ""
-shop_prices = ""
-   
 #
 # Handle the command line interface for the randomizer.
+#
+# return: A tuple containing the Settings, the input ROM name,
+#         the output folder, and the seed
 #   
 def command_line():
-     global flags
-     global sourcefile
-     global outputfolder
-     global difficulty
-     global glitch_fixes
-     global fast_move
-     global sense_dpad
-     global lost_worlds
-     global boss_scaler
-     global zeal_end
-     global quick_pendant
-     global locked_chars
-     global tech_list
-     global seed
-     global tech_list_balanced
-     global unlocked_magic
-     global quiet_mode
-     global chronosanity
-     global tab_treasures
-     global boss_rando
-     global shop_prices
-     
-     flags = ""
+     settings = Settings()
      sourcefile = input("Please enter ROM name or drag it onto the screen.")
      sourcefile = sourcefile.strip("\"")
      if sourcefile.find(".sfc") == -1:
@@ -88,93 +38,44 @@ def command_line():
      if seed is None or seed == "":
         names = read_names()
         seed = "".join(rand.choice(names) for i in range(2))
-     rand.seed(seed)
      difficulty = input(f"Choose your difficulty \nEasy(e)/Normal(n)/Hard(h)")
      if difficulty == "n":
-         difficulty = "normal"
+         settings.difficulty = "normal"
      elif difficulty == "e":
-         difficulty = "easy"
+         settings.difficulty = "easy"
      else:
-         difficulty = "hard"
-     flags = flags + difficulty[0]
-     glitch_fixes = input("Would you like to disable (most known) glitches(g)? Y/N ")
-     glitch_fixes = glitch_fixes.upper()
-     if glitch_fixes == "Y":
-        flags = flags + "g" 
-     fast_move = input("Would you like to move faster on the overworld/Epoch(s)? Y/N ")
-     fast_move = fast_move.upper()
-     if fast_move == "Y":
-        flags = flags + "s"
-     sense_dpad = input("Would you like faster dpad inputs in menus(d)? Y/N ")
-     sense_dpad = sense_dpad.upper()
-     if sense_dpad == "Y":
-        flags = flags + "d"
-     lost_worlds = input("Would you want to activate Lost Worlds(l)? Y/N ")
-     lost_worlds = lost_worlds.upper()
-     if lost_worlds == "Y":
-         flags = flags + "l"
-     boss_scaler = input("Do you want bosses to scale with progression(b)? Y/N ")
-     boss_scaler = boss_scaler.upper()
-     if boss_scaler == "Y":
-        flags = flags + "b"
-     boss_rando = input("Do you want randomized bosses(ro)? Y/N ")
-     boss_rando = boss_rando.upper()
-     if boss_rando == "Y":
-        flags = flags + "ro"     
-     zeal_end = input("Would you like Zeal 2 to be a final boss? Note that defeating Lavos still ends the game(z). Y/N ")
-     zeal_end = zeal_end.upper()
-     if zeal_end == "Y":
-        flags = flags + "z"
-     if lost_worlds == "Y":
-        pass
-     else:
-         quick_pendant = input("Do you want the pendant to be charged earlier(p)? Y/N ")
-         quick_pendant = quick_pendant.upper()
-         if quick_pendant == "Y":
-            flags = flags + "p"
-     locked_chars = input("Do you want characters to be further locked(c)? Y/N ")
-     locked_chars = locked_chars.upper()
-     if locked_chars == "Y":
-        flags = flags + "c"
+         settings.difficulty = "hard"
+     settings.glitch_fixes = input("Would you like to disable (most known) glitches(g)? Y/N ").upper()
+     settings.fast_move = input("Would you like to move faster on the overworld/Epoch(s)? Y/N ").upper()
+     settings.sense_dpad = input("Would you like faster dpad inputs in menus(d)? Y/N ").upper()
+     settings.lost_worlds = input("Would you want to activate Lost Worlds(l)? Y/N ").upper()
+     settings.boss_scaler = input("Do you want bosses to scale with progression(b)? Y/N ").upper()
+     settings.boss_rando = input("Do you want randomized bosses(ro)? Y/N ").upper()
+     settings.zeal_end = input("Would you like Zeal 2 to be a final boss? Note that defeating Lavos still ends the game(z). Y/N ").upper()
+     if settings.lost_worlds != "Y":
+         settings.quick_pendant = input("Do you want the pendant to be charged earlier(p)? Y/N ").upper()
+     settings.locked_chars = input("Do you want characters to be further locked(c)? Y/N ").upper()
      tech_list = input("Do you want to randomize techs(te)? Y/N ")
-     tech_list = tech_list.upper()
-     if tech_list == "Y":
-         flags = flags + "te"
-         tech_list = "Fully Random"
+     if tech_list.upper() == "Y":
+         settings.tech_list = "Fully Random"
          tech_list_balanced = input("Do you want to balance the randomized techs(tex)? Y/N ")
-         tech_list_balanced = tech_list_balanced.upper()
-         if tech_list_balanced == "Y":
-            flags = flags + "x"
-            tech_list = "Balanced Random"
-     unlocked_magic = input("Do you want the ability to learn all techs without visiting Spekkio(m)? Y/N")
-     unlocked_magic = unlocked_magic.upper()
-     if unlocked_magic == "Y":
-         flags = flags + "te"
-     quiet_mode = input("Do you want to enable quiet mode (No music)(q)? Y/N")
-     quiet_mode = quiet_mode.upper()
-     if quiet_mode == "Y":
-         flags = flags + "q"
-     chronosanity = input("Do you want to enable Chronosanity (key items can appear in chests)? (cr)? Y/N")
-     chronosanity = chronosanity.upper()
-     if chronosanity == "Y":
-         flags = flags + "cr"
-     tab_treasures = input("Do you want all treasures to be tabs(tb)? Y/N ")
-     tab_treasures = tab_treasures.upper()
-     if tab_treasures == "Y":
-        flags = flags + "tb"
+         if tech_list_balanced.upper() == "Y":
+            settings.tech_list = "Balanced Random"
+     settings.unlocked_magic = input("Do you want the ability to learn all techs without visiting Spekkio(m)? Y/N").upper()
+     settings.quiet_mode = input("Do you want to enable quiet mode (No music)(q)? Y/N").upper()
+     settings.chronosanity = input("Do you want to enable Chronosanity (key items can appear in chests)? (cr)? Y/N").upper()
+     settings.tab_treasures = input("Do you want all treasures to be tabs(tb)? Y/N ").upper()
      shop_prices = input("Do you want shop prices to be Normal(n), Free(f), Mostly Random(m), or Fully Random(r)?")
      shop_prices = shop_prices.upper()
      if shop_prices == "F":
-        shop_prices = "Free"
-        flags = flags + "spf"
+        settings.shop_prices = "Free"
      elif shop_prices == "M":
-        shop_prices = "Mostly Random"
-        flags = flags + "spm"
+        settings.shop_prices = "Mostly Random"
      elif shop_prices == "R":
-        shop_prices = "Fully_Random"
-        flags = flags + "spr"
+        settings.shop_prices = "Fully Random"
      else:
-        shop_prices = "Normal"
+        settings.shop_prices = "Normal"
+     return settings, sourcefile, outputfolder, seed
     
 
 #
@@ -187,72 +88,28 @@ def get_flag_value(flag_var):
     return "N"
   
 #
-# Handle seed generation from the GUI.
-# Convert all of the GUI datastore values internal values
-# for the randomizer and then generate the ROM.
-#  
-def handle_gui(datastore):
-  global flags
-  global sourcefile
-  global outputfolder
-  global difficulty
-  global glitch_fixes
-  global fast_move
-  global sense_dpad
-  global lost_worlds
-  global boss_scaler
-  global zeal_end
-  global quick_pendant
-  global locked_chars
-  global tech_list
-  global seed
-  global unlocked_magic
-  global quiet_mode
-  global chronosanity
-  global tab_treasures
-  global boss_rando
-  global shop_prices
+# Convert all of the GUI datastore values to internal values for the
+# randomizer.  If no seed was entered a random one is picked and shown
+# in the GUI.
+#
+# return: A tuple containing the Settings, the input ROM name,
+#         the output folder, and the seed
+#
+def get_gui_settings(datastore):
+  settings = Settings()
   
   # Get the user's chosen difficulty
-  difficulty = datastore.difficulty.get()
+  settings.difficulty = datastore.difficulty.get()
 
   # Get the user's chosen tech randomization
-  tech_list = datastore.techRando.get()
+  settings.tech_list = datastore.techRando.get()
   
   # Get the user's chosen shop price settings
-  shop_prices = datastore.shopPrices.get()
-  
-  # build the flag string from the gui datastore vars
-  flags = difficulty[0]
-  for flag, value in datastore.flags.items():
-    if value.get() == 1:
-      flags = flags + flag
-  if tech_list == "Fully Random":
-      flags = flags + "te"
-  elif tech_list == "Balanced Random":
-      flags = flags + "tex"
-      
-  if shop_prices == "Free":
-    flags = flags + "spf"
-  elif shop_prices == "Mostly Random":
-    flags = flags + "spm"
-  elif shop_prices == "Fully Random":
-    flags = flags + "spr"
+  settings.shop_prices = datastore.shopPrices.get()
   
   # Set the flag variables based on what the user chose
-  glitch_fixes = get_flag_value(datastore.flags['g'])
-  fast_move = get_flag_value(datastore.flags['s'])
-  sense_dpad = get_flag_value(datastore.flags['d'])
-  lost_worlds = get_flag_value(datastore.flags['l'])
-  boss_scaler = get_flag_value(datastore.flags['b'])
-  boss_rando = get_flag_value(datastore.flags['ro'])
-  zeal_end = get_flag_value(datastore.flags['z'])
-  quick_pendant = get_flag_value(datastore.flags['p'])
-  locked_chars = get_flag_value(datastore.flags['c'])
-  unlocked_magic = get_flag_value(datastore.flags['m'])
-  quiet_mode = get_flag_value(datastore.flags['q'])
-  chronosanity = get_flag_value(datastore.flags['cr'])
-  tab_treasures = get_flag_value(datastore.flags['tb'])
+  for flag, name in generationcontext.flagSettings.items():
+    setattr(settings, name, get_flag_value(datastore.flags[flag]))
   
   # source ROM
   sourcefile = datastore.inputFile.get()
@@ -265,147 +122,388 @@ def handle_gui(datastore):
   if seed is None or seed == "":
     names = read_names()
     seed = "".join(rand.choice(names) for i in range(2))
-  rand.seed(seed)
   datastore.seed.set(seed)
+  return settings, sourcefile, outputfolder, seed
+
+#
+# Handle seed generation from the GUI.
+# Convert all of the GUI datastore values internal values
+# for the randomizer and then generate the ROM.
+#  
+def handle_gui(datastore):
+  settings, sourcefile, outputfolder, seed = get_gui_settings(datastore)
   
   # GUI values have been converted, generate the ROM.
-  generate_rom()
+  generate_rom(settings, seed, sourcefile, outputfolder)
    
 #
-# Generate the randomized ROM.
-#    
-def generate_rom():
-     global flags
-     global sourcefile
-     global outputfolder
-     global difficulty
-     global glitch_fixes
-     global fast_move
-     global sense_dpad
-     global lost_worlds
-     global boss_rando
-     global boss_scaler
-     global zeal_end
-     global quick_pendant
-     global locked_chars
-     global tech_list
-     global seed
-     global unlocked_magic
-     global quiet_mode
-     global chronosanity
-     global tab_treasures
-     global shop_prices
-     
+# Get the string identifying the flags that change the static patches.
+# Seeds generated with the same static flags share a patched base image.
+#
+# param: settings - Settings for the seed
+#
+def get_static_flags(settings):
+     static_flags = ""
+     if settings.glitch_fixes == "Y":
+        static_flags = static_flags + "g"
+     if settings.fast_move == "Y":
+        static_flags = static_flags + "s"
+     if settings.sense_dpad == "Y":
+        static_flags = static_flags + "d"
+     if settings.zeal_end == "Y":
+        static_flags = static_flags + "z"
+     if settings.lost_worlds == "Y":
+        static_flags = static_flags + "l"
+     elif settings.quick_pendant == "Y":
+        static_flags = static_flags + "p"
+     if settings.unlocked_magic == "Y":
+        static_flags = static_flags + "m"
+     if settings.difficulty == "hard":
+        static_flags = static_flags + "h"
+     return static_flags
+
+#
+# Get the ordered list of seed independent patches for the given settings.
+#
+# param: settings - Settings for the seed
+#
+def get_static_patches(settings):
+     patch_list = ["patch.ips","patches/patch_codebase.txt"]
+     if settings.glitch_fixes == "Y":
+        patch_list.append("patches/save_anywhere_patch.txt")
+        patch_list.append("patches/unequip_patch.txt")
+        patch_list.append("patches/fadeout_patch.txt")
+        patch_list.append("patches/hp_overflow_patch.txt")
+     if settings.fast_move == "Y":
+        patch_list.append("patches/fast_overworld_walk_patch.txt")
+        patch_list.append("patches/faster_epoch_patch.txt")
+     if settings.sense_dpad == "Y":
+        patch_list.append("patches/faster_menu_dpad.txt")
+     if settings.zeal_end == "Y":
+        patch_list.append("patches/zeal_end_boss.txt")
+     if settings.lost_worlds == "Y":
+        patch_list.append("patches/lost.ips")
+     elif settings.quick_pendant == "Y":
+        patch_list.append("patches/fast_charge_pendant.txt")
+     if settings.unlocked_magic == "Y":
+        patch_list.append("patches/fastmagic.ips")
+     if settings.difficulty == "hard":
+        patch_list.append("patches/hard.ips")
+     return patch_list
+
+#
+# Get the patched base ROM for the given settings.
+# The static patches are seed independent, so the patched base image
+# is taken from the base ROM cache when possible.
+#
+# param: settings - Settings for the seed
+# param: sourcefile - Name of the input ROM
+# param: profiler - stageprofiler.Profiler to measure the steps with, or None
+# return: A RomImage holding the patched base ROM
+#
+def get_base_rom(settings, sourcefile, profiler=None):
+     with stageprofiler.measure(profiler, "load_rom"):
+        source_rom = romimage.loadRom(sourcefile)
+     return patch_base_rom(settings, source_rom, profiler)
+
+#
+# Apply the static patches for the given settings to an input ROM, or
+# take the patched image from the base ROM cache.
+#
+# param: settings - Settings for the seed
+# param: source_rom - RomImage holding the headerless input ROM.  It is
+#                     patched in place on a cache miss.
+# param: profiler - stageprofiler.Profiler to measure the steps with, or None
+# param: use_disk_cache - False to keep the base ROM cache in memory only
+# param: quiet - True to not print progress messages
+# return: A RomImage holding the patched base ROM
+#
+def patch_base_rom(settings, source_rom, profiler=None, use_disk_cache=True, quiet=False):
+     def apply_static_patches(rom):
+        if not quiet:
+           print("Applying patch. This might take a while.")
+        patch_list = get_static_patches(settings)
+        # The patches are loaded up front so the IPS and text patches
+        # can be measured on their own.
+        with stageprofiler.measure(profiler, "ips_patches"):
+           for patch in patch_list:
+              if patch.endswith(".ips"):
+                 patchcomposer.load_patch(patch)
+        with stageprofiler.measure(profiler, "text_patches"):
+           for patch in patch_list:
+              if not patch.endswith(".ips"):
+                 patchcomposer.load_patch(patch)
+        with stageprofiler.measure(profiler, "apply_patches"):
+           patchcomposer.apply_patches(patch_list,rom)
+     misses = basecache.cacheStats["misses"]
+     with stageprofiler.measure(profiler, "base_rom") as step:
+        rom = basecache.get_base_rom(source_rom,get_static_flags(settings),apply_static_patches,
+                                     use_disk_cache)
+        if step is not None:
+           step.cached = (basecache.cacheStats["misses"] == misses)
+     return rom
+
+#
+# Run every seed dependent stage of the randomizer on the context's ROM.
+# Independent stages are run at the same time when stage_workers is
+# more than one.  See generationstages.py for the stages.
+#
+# param: ctx - GenerationContext for the seed
+# param: stage_workers - Number of stages that can run at the same time
+# param: verify_stages - True to check that every stage only wrote the
+#                        ROM regions it declared
+# param: use_stage_cache - True to reuse the output of stages whose inputs
+#                          have not changed since an earlier seed
+# param: io_trace - iotrace.IoTrace to count the ROM writes of every
+#                   module in, or None.  The stage cache is not used while
+#                   tracing, so every writer runs.
+# return: Dictionary of the values provided by the stages (character and
+#         key item locations)
+#
+def randomize_rom(ctx, stage_workers=1, verify_stages=False, use_stage_cache=True, io_trace=None):
+     stages = generationstages.getStages(ctx.settings)
+     if io_trace is None:
+        return stagegraph.runStages(ctx, stages, stage_workers, verify_stages, use_stage_cache)
+     rom = ctx.rom
+     ctx.rom = iotrace.TracedRom(rom, io_trace)
+     try:
+        return stagegraph.runStages(ctx, stages, stage_workers, verify_stages, False)
+     finally:
+        ctx.rom = rom
+
+#
+# Get the name of the output ROM.
+#
+# param: settings - Settings for the seed
+# param: seed - The seed
+# param: sourcefile - Name of the input ROM
+# param: outputfolder - Folder for the output ROM, or None/"" to use
+#                       the folder of the input ROM
+# return: Path of the output ROM
+#
+def get_output_file(settings, seed, sourcefile, outputfolder):
      # isolate the ROM file name
-     inputPath = pathlib.Path(sourcefile)
-     outfile = inputPath.name
+     outfile = os.path.basename(sourcefile)
      
      # Create the output file name
      outfile = outfile.split(".")
      outfile = str(outfile[0])
-     if flags == "":
-       outfile = "%s.%s.sfc"%(outfile,seed)
-     else:
-       outfile = "%s.%s.%s.sfc"%(outfile,flags,seed)
+     outfile = "%s.%s.%s.sfc"%(outfile,settings.getFlagString(),seed)
        
      # Append the output file name to the selected directory
      # If there is no selected directory, use the input path
      if outputfolder == None or outputfolder == "":
-       outfile = str(inputPath.parent.joinpath(outfile))
+       outfile = os.path.join(os.path.dirname(sourcefile), outfile)
      else:
-       outfile = str(pathlib.Path(outputfolder).joinpath(outfile))
+       outfile = os.path.join(outputfolder, outfile)
+     return outfile
+
+#
+# Generate the randomized ROM.
+#
+# param: settings - Settings for the seed
+# param: seed - The seed
+# param: sourcefile - Name of the input ROM
+# param: outputfolder - Folder for the output ROM
+# param: spoiler_file - Name of the spoiler log file
+# param: verify_stages - True to check the ROM regions written by each stage
+# param: profiler - stageprofiler.Profiler to measure every step with, or
+#                   None.  The caller writes the report.
+# param: io_trace - iotrace.IoTrace to count the ROM writes of every module
+#                   in, or None.  The caller writes the report.
+#    
+def generate_rom(settings, seed, sourcefile, outputfolder, spoiler_file="spoiler_log.txt", verify_stages=False,
+                 profiler=None, io_trace=None):
+     outfile = get_output_file(settings, seed, sourcefile, outputfolder)
+     if profiler is not None:
+       profiler.start()
        
-     size = stat(sourcefile).st_size
-     if size % 0x400 == 0:
-        copyfile(sourcefile, outfile)
-     elif size % 0x200 == 0:
-        print("SNES header detected. Removing header from output file.")
-        f = open(sourcefile, 'r+b')
-        data = f.read()
-        f.close()
-        data = data[0x200:]
-        open(outfile, 'w+').close()
-        f = open(outfile, 'r+b')
-        f.write(data)
-        f.close()
-     print("Applying patch. This might take a while.")
-     bigpatches.write_patch("patch.ips",outfile)
-     patches.patch_file("patches/patch_codebase.txt",outfile)
-     if glitch_fixes == "Y":
-        patches.patch_file("patches/save_anywhere_patch.txt",outfile)
-        patches.patch_file("patches/unequip_patch.txt",outfile)
-        patches.patch_file("patches/fadeout_patch.txt",outfile)
-        patches.patch_file("patches/hp_overflow_patch.txt",outfile)
-     if fast_move == "Y":
-        patches.patch_file("patches/fast_overworld_walk_patch.txt",outfile)
-        patches.patch_file("patches/faster_epoch_patch.txt",outfile)
-     if sense_dpad == "Y":
-        patches.patch_file("patches/faster_menu_dpad.txt",outfile)
-     if zeal_end == "Y":
-        patches.patch_file("patches/zeal_end_boss.txt",outfile)
-     if lost_worlds == "Y":
-        bigpatches.write_patch("patches/lost.ips",outfile)
-     if lost_worlds == "Y":
-         pass
-     elif quick_pendant == "Y":
-             patches.patch_file("patches/fast_charge_pendant.txt",outfile)
-     if unlocked_magic == "Y":
-         bigpatches.write_patch("patches/fastmagic.ips",outfile)
-     if difficulty == "hard":
-         bigpatches.write_patch("patches/hard.ips",outfile)
-     tabwriter.rewrite_tabs(outfile)#Psuedoarc's code to rewrite Power and Magic tabs and make them more impactful
-     print("Randomizing treasures...")
-     treasures.randomize_treasures(outfile,difficulty,tab_treasures)
-     hardcoded_items.randomize_hardcoded_items(outfile,tab_treasures)
-     print("Randomizing enemy loot...")
-     enemystuff.randomize_enemy_stuff(outfile,difficulty)
-     print("Randomizing shops...")
-     shops.randomize_shops(outfile)
-     shops.modify_shop_prices(outfile, shop_prices)
-     print("Randomizing character locations...")
-     char_locs = char_slots.randomize_char_positions(outfile,locked_chars,lost_worlds)
-     print("Now placing key items...")
-     if chronosanity == "Y":
-       chronosanity_logic.writeKeyItems(
-           outfile, char_locs, (locked_chars == "Y"), (quick_pendant == "Y"), lost_worlds == "Y")
-     elif lost_worlds == "Y":
-       keyitemlist = keyitems.randomize_lost_worlds_keys(char_locs,outfile)
-     else:
-       keyitemlist = keyitems.randomize_keys(char_locs,outfile,locked_chars)
-     if boss_scaler == "Y" and chronosanity != "Y":
-         print("Rescaling bosses based on key items..")
-         boss_scale.scale_bosses(char_locs,keyitemlist,locked_chars,outfile)
-     #print("Boss rando: " + boss_rando)
-     if boss_rando == "Y":
-         boss_shuffler.randomize_bosses(outfile,difficulty)
-     if tech_list == "Fully Random":
-         tech_order.take_pointer(outfile)
-     elif tech_list == "Balanced Random":
-         tech_order.take_pointer_balanced(outfile)
-     if quiet_mode == "Y":
-         bigpatches.write_patch("patches/nomusic.ips",outfile)
-     # Tyrano Castle chest hack
-     f = open(outfile,"r+b")
-     f.seek(0x35F6D5)
-     f.write(st.pack("B",1))
-     f.close()
-     #Mystic Mtn event fix in Lost Worlds
-     if lost_worlds == "Y":         
-       f = open(outfile,"r+b")
-       bigpatches.write_patch("patches/mysticmtnfix.ips",outfile)
-       bigpatches.write_patch("patches/losteot.ips",outfile)
-     #Bangor Dome event fix if character locks are on
-       if locked_chars == "Y":
-         bigpatches.write_patch("patches/bangorfix.ips",outfile)
-       f.close()
+     # Every stage works on the in-memory image and the result is
+     # written out once at the end.
+     ctx = GenerationContext(settings, seed, get_base_rom(settings, sourcefile, profiler))
+     ctx.profiler = profiler
+     randomize_rom(ctx, verify_stages=verify_stages, io_trace=io_trace)
+     with stageprofiler.measure(profiler, "write_rom"):
+       ctx.rom.writeToFile(outfile)
+       if not ctx.spoiler.isEmpty():
+         ctx.spoiler.writeToFile(spoiler_file)
+     if profiler is not None:
+       profiler.stop()
      print("Randomization completed successfully.")
 
+#
+# Set up a batch worker process.  The patched base ROM is built up front,
+# so every seed the worker generates starts from the cached base image.
+#
+# param: settings - Settings for every seed in the batch
+# param: sourcefile - Name of the input ROM
+#
+def init_batch_worker(settings, sourcefile):
+  # Seed progress messages from many workers are not useful in a batch.
+  sys.stdout = open(os.devnull, "w")
+  get_base_rom(settings, sourcefile)
+
+#
+# Generate one seed of a batch in a worker process.
+# The spoiler log is written next to the ROM.
+#
+# param: settings - Settings for the seed
+# param: sourcefile - Name of the input ROM
+# param: out_dir - Folder to write the ROM and spoiler log to
+# param: verify_stages - True to check the ROM regions written by each stage
+# param: profile - None, "time" to write a profile report next to the ROM,
+#                  or "pstats" to also write a cProfile file per step
+# param: trace_io - True to write a report of the ROM writes of every
+#                   module next to the ROM
+# param: batch_seed - The seed to generate
+# return: Tuple of (seed, worker process id, generation time in seconds,
+#         profile report dictionary or None, I/O report dictionary or None)
+#
+def generate_batch_seed(settings, sourcefile, out_dir, verify_stages, profile, trace_io, batch_seed):
+  start = time()
+  outfile = get_output_file(settings, batch_seed, sourcefile, out_dir)
+  basename = outfile[:-len(".sfc")]
+  spoiler_file = basename + ".spoiler.txt"
+  profiler = None
+  if profile is not None:
+    profile_dir = None
+    if profile == "pstats":
+      profile_dir = basename + ".pstats"
+    profiler = stageprofiler.Profiler(profileDirectory=profile_dir)
+  io_trace = None
+  if trace_io:
+    io_trace = iotrace.IoTrace()
+  generate_rom(settings, batch_seed, sourcefile, out_dir, spoiler_file, verify_stages, profiler, io_trace)
+  info = {"seed": batch_seed, "flags": settings.getFlagString()}
+  report = None
+  if profiler is not None:
+    profiler.writeReport(basename + ".profile", info)
+    report = profiler.getReport(info)
+  io_report = None
+  if io_trace is not None:
+    io_trace.writeReport(basename + ".io", info)
+    io_report = io_trace.getReport(info)
+  return (batch_seed, os.getpid(), time() - start, report, io_report)
+
+#
+# Get the seeds for a batch.  Seeds are numbered from the given base seed,
+# or built from random names the same way as a single seed.
+#
+# param: count - Number of seeds to generate
+# param: base_seed - Base seed, or None to pick random seeds
+# return: List of unique seeds
+#
+def get_batch_seeds(count, base_seed):
+  if base_seed is not None:
+    if count == 1:
+      return [base_seed]
+    return ["%s%d"%(base_seed,i) for i in range(count)]
+  names = read_names()
+  seeds = []
+  used = set()
+  while len(seeds) < count:
+    new_seed = "".join(rand.choice(names) for i in range(2))
+    if len(used) < len(names) ** 2 and new_seed in used:
+      continue
+    used.add(new_seed)
+    seeds.append(new_seed)
+  return seeds
+
+#
+# Handle the batch command line interface.  Seeds are generated in
+# parallel by a pool of worker processes, e.g.
+#   randomizer.py --input ct.sfc --flags gsdzpte --count 500 --jobs 8 --out-dir seeds
+#
+# param: argv - Command line arguments, not including the program name
+#
+def batch_main(argv):
+  # Only the batch interface needs these, so they are not imported when
+  # the randomizer starts up.
+  import argparse
+  import concurrent.futures
+  import functools
+  import logictypes
+
+  parser = argparse.ArgumentParser(description="Generate a batch of randomized ROMs.")
+  parser.add_argument("--input", required=True, help="Input ROM")
+  parser.add_argument("--flags", required=True, help="Flag string, as shown in the output file name")
+  parser.add_argument("--count", type=int, default=1, help="Number of seeds to generate")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Number of worker processes")
+  parser.add_argument("--out-dir", default=".", help="Folder for the ROMs and spoiler logs")
+  parser.add_argument("--seed", default=None, help="Base seed. Seeds are numbered from it.")
+  parser.add_argument("--verify-stages", action="store_true",
+                      help="Check that every stage only writes the ROM regions it declares")
+  parser.add_argument("--profile", nargs="?", const="time", choices=["time", "pstats"],
+                      help="Write a timing and memory report for every step of every seed next to "
+                           "the ROM.  With 'pstats' a cProfile file is also written per step.")
+  parser.add_argument("--trace-io", action="store_true",
+                      help="Write a report of the ROM writes made by every module next to the ROM")
+  args = parser.parse_args(argv)
+
+  try:
+    settings = Settings.fromFlagString(args.flags)
+  except ValueError as error:
+    parser.error(str(error))
+  os.makedirs(args.out_dir, exist_ok=True)
+  seeds = get_batch_seeds(args.count, args.seed)
+
+  print("Generating %d seeds with flags %s using %d workers."%(len(seeds),settings.getFlagString(),args.jobs))
+  start = time()
+  worker_counts = {}
+  reports = []
+  io_reports = []
+  generate = functools.partial(generate_batch_seed, settings, args.input, args.out_dir, args.verify_stages,
+                               args.profile, args.trace_io)
+  failed = []
+  with concurrent.futures.ProcessPoolExecutor(
+      max_workers=args.jobs, initializer=init_batch_worker,
+      initargs=(settings, args.input)) as executor:
+    futures = [executor.submit(generate, batch_seed) for batch_seed in seeds]
+    for done, (batch_seed, future) in enumerate(zip(seeds, futures), 1):
+      try:
+        batch_seed, worker, seconds, report, io_report = future.result()
+      except logictypes.PlacementError as error:
+        # Nothing is written for a seed that failed, the batch goes on
+        failed.append(batch_seed)
+        print("[%d/%d] %s failed: %s"%(done,len(seeds),batch_seed,error))
+        continue
+      if report is not None:
+        reports.append(report)
+      if io_report is not None:
+        io_reports.append(io_report)
+      worker_counts[worker] = worker_counts.get(worker, 0) + 1
+      elapsed = time() - start
+      print("[%d/%d] %s (%.2fs, %.2f seeds/sec)"%(done,len(seeds),batch_seed,seconds,done / elapsed))
+
+  elapsed = time() - start
+  generated = len(seeds) - len(failed)
+  print("Generated %d seeds in %.2fs (%.2f seeds/sec)"%(generated,elapsed,generated / elapsed))
+  if len(failed) > 0:
+    print("%d seeds failed: %s"%(len(failed),", ".join(failed)))
+  for worker, count in sorted(worker_counts.items()):
+    print("  worker %d: %d seeds"%(worker,count))
+  if len(reports) > 0:
+    print(stageprofiler.formatSummary(reports), end="")
+  if len(io_reports) > 0:
+    print(iotrace.formatSummary(io_reports), end="")
+
      
 if __name__ == "__main__":
+  # Batch mode runs a process pool, which the frozen executable can only
+  # start with freeze support.
+  import multiprocessing
+  multiprocessing.freeze_support()
   if len(sys.argv) > 1 and sys.argv[1] == "-c":
-    command_line()
-    generate_rom()
+    settings, sourcefile, outputfolder, seed = command_line()
+    import logictypes
+    try:
+      generate_rom(settings, seed, sourcefile, outputfolder)
+    except logictypes.PlacementError as error:
+      print(str(error))
     input("Press Enter to exit.")
+  elif len(sys.argv) > 1:
+    batch_main(sys.argv[1:])
   else:
+    # The GUI pulls in tkinter, which the command line does not need
+    import randomizergui as gui
     gui.guiMain()
-  
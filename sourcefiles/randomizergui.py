@@ -2,8 +2,8 @@
 import os
 import pathlib
 import pickle
-import threading
 import tkinter as tk
+import traceback
 from tkinter import ttk
 from tkinter.filedialog import askopenfilename
 from tkinter.filedialog import askdirectory
@@ -11,6 +11,7 @@ from tkinter import messagebox
 
 
 # custom/local libraries
+import jobscheduler
 import randomizer
 
 #
@@ -164,33 +165,49 @@ class CreateToolTip(object):
 # end class CreateToolTip
 
 #
-# Generate thread target function, calls out to the randomizer to
-# generate a seed with the datastore values and stops the progress
-# bar when the seed is ready.
+# Generate job function, calls out to the randomizer to generate a seed
+# with the settings taken from the datastore when Generate was clicked.
+# The datastore is saved once the seed has been generated.
 #
-def randomize():
+def randomize(settings, sourcefile, outputfolder, seed):
   try:
-    randomizer.handle_gui(datastore)
+    randomizer.generate_rom(settings, seed, sourcefile, outputfolder)
     datastore.save()
-    progressBar.stop()
-    tk.messagebox.showinfo("Randomization Complete", "Randomization complete. Seed: " + datastore.seed.get())
+    tk.messagebox.showinfo("Randomization Complete", "Randomization complete. Seed: " + seed)
   except WindowsError as we:
     print(str(we))
     tk.messagebox.showinfo("Invalid File Name", f"Try placing the ROM in the same folder as the program. \n Also, try writing the extension(.sfc/smc).")
-    progressBar.stop()
+  except Exception as e:
+    traceback.print_exc()
+    tk.messagebox.showerror("Randomization Failed", "The seed could not be generated: " + str(e))
 
-genThread = None
+# Seeds are generated one at a time, off the GUI thread.  Clicking
+# Generate while a seed is being made queues another one, and clicking
+# again with the same settings and seed does not generate it twice.
+generateScheduler = jobscheduler.JobScheduler(workers=1, maxQueued=4)
+
+#
+# Job callback, stops the progress bar once every queued seed is done.
+#
+def generateFinished(job):
+  if generateScheduler.isIdle():
+    progressBar.stop()
     
 #
-# Button handler function for the generate button. It starts the
-# generate thread.
+# Button handler function for the generate button. It queues a seed
+# with the current datastore values.
 #
 def generateHandler():
-  global genThread
-  if genThread == None or not genThread.is_alive():
-    genThread = threading.Thread(target=randomize)
-    progressBar.start(50)
-    genThread.start()
+  settings, sourcefile, outputfolder, seed = randomizer.get_gui_settings(datastore)
+  key = (settings.getFlagString(), seed, sourcefile, outputfolder)
+  progressBar.start(50)
+  try:
+    generateScheduler.submit(key, randomize, (settings, sourcefile, outputfolder, seed),
+                             jobscheduler.INTERACTIVE, generateFinished)
+  except jobscheduler.SchedulerFull:
+    if generateScheduler.isIdle():
+      progressBar.stop()
+    tk.messagebox.showinfo("Generator Busy", "Several seeds are already being generated. Please wait for them to finish.")
   
 #
 # Function to display a file chooser for the input ROM.
@@ -0,0 +1,142 @@
+import struct as st
+
+#
+# This file holds the RomImage class.  The source ROM is loaded into
+# memory once and every stage of the randomizer reads and writes the
+# in-memory copy.  The finished image is written out to disk in one go
+# at the end of seed generation.
+#
+
+#
+# The RomImage class wraps a growable bytearray holding the ROM data.
+# It provides typed accessors for the byte and little endian halfword
+# values that the randomizer writes.
+#
+class RomImage:
+  def __init__(self, data):
+    self.data = bytearray(data)
+
+  #
+  # Get the current size of the ROM image in bytes.
+  #
+  # return: Size of the ROM image
+  #
+  def getSize(self):
+    return len(self.data)
+
+  #
+  # Grow the ROM image so that it is at least the given size.
+  # New bytes are zero filled, the same as writing past the end of a file.
+  #
+  # param: size - Minimum size of the ROM image in bytes
+  #
+  def ensureSize(self, size):
+    if size > len(self.data):
+      self.data.extend(bytes(size - len(self.data)))
+
+  #
+  # Read a single byte from the ROM image.
+  #
+  # param: address - Offset of the byte to read
+  # return: The byte value at the given address
+  #
+  def readU8(self, address):
+    return self.data[address]
+
+  #
+  # Read a little endian halfword from the ROM image.
+  #
+  # param: address - Offset of the first byte to read
+  # return: The halfword value at the given address
+  #
+  def readU16(self, address):
+    return self.data[address] | (self.data[address + 1] << 8)
+
+  #
+  # Read a block of bytes from the ROM image.
+  #
+  # param: address - Offset of the first byte to read
+  # param: length - Number of bytes to read
+  # return: A bytes object holding the requested data
+  #
+  def readBytes(self, address, length):
+    return bytes(self.data[address:address + length])
+
+  #
+  # Write a single byte to the ROM image.
+  #
+  # param: address - Offset of the byte to write
+  # param: value - Byte value to write (0-255)
+  #
+  def writeU8(self, address, value):
+    self.ensureSize(address + 1)
+    self.data[address] = value
+
+  #
+  # Write a little endian halfword to the ROM image.
+  #
+  # param: address - Offset of the first byte to write
+  # param: value - Halfword value to write (0-65535)
+  #
+  def writeU16(self, address, value):
+    self.ensureSize(address + 2)
+    self.data[address:address + 2] = st.pack("<H", value)
+
+  #
+  # Write a block of bytes to the ROM image.
+  #
+  # param: address - Offset of the first byte to write
+  # param: values - bytes, bytearray, memoryview, or list of byte values
+  #
+  def writeBytes(self, address, values):
+    end = address + len(values)
+    self.ensureSize(end)
+    self.data[address:end] = values
+
+  #
+  # Get a copy of the ROM image as an immutable bytes object.
+  #
+  # return: The ROM data
+  #
+  def toBytes(self):
+    return bytes(self.data)
+
+  #
+  # Write the ROM image out to a file with a single write.
+  #
+  # param: filename - Name of the file to write
+  #
+  def writeToFile(self, filename):
+    with open(filename, "wb") as outFile:
+      outFile.write(self.data)
+# end RomImage class
+
+#
+# Load ROM data into a RomImage.  If the ROM has a 0x200 byte SNES copier
+# header, the header is removed.
+#
+# param: data - bytes-like object holding the ROM as read from the file
+# param: quiet - True to not print a message when a header is removed
+# return: A RomImage holding the headerless ROM data
+#
+def fromBytes(data, quiet=False):
+  size = len(data)
+  if size % 0x400 != 0 and size % 0x200 == 0:
+    if not quiet:
+      print("SNES header detected. Removing header from output file.")
+    data = data[0x200:]
+  return RomImage(data)
+# end fromBytes
+
+#
+# Load a ROM file from disk into a RomImage.  If the ROM has a 0x200 byte
+# SNES copier header, the header is removed.
+#
+# param: filename - Name of the ROM file to load
+# return: A RomImage holding the headerless ROM data
+#
+def loadRom(filename):
+  with open(filename, "rb") as romFile:
+    data = romFile.read()
+  return fromBytes(data)
+# end loadRom
@@ -0,0 +1,135 @@
+import os
+import random
+
+import logictypes
+import patchcache
+import randomizer
+import romimage
+import stageprofiler
+from generationcontext import GenerationContext, Settings
+
+#
+# This file holds the library interface of the randomizer.
+#
+# generate() takes the settings and the input ROM as bytes and returns
+# the randomized ROM as bytes, along with the spoiler data and the time
+# spent in every step.  It runs the same steps as generate_rom, but:
+#   - Nothing is read from or written to the current directory.  The
+#     patches and names.txt are read from the data directory (the folder
+#     of this file unless another one is given), and the base ROM cache
+#     is only kept in memory.  The data directory is only used for the
+#     call, so calls with different data directories do not interfere.
+#   - No output ROM or spoiler log file is written, nothing waits for
+#     input and no progress messages are printed, unless quiet is False.
+#     Failures are raised as exceptions.
+#   - Patches compiled on first use are stored in the __patchcache__
+#     folders of the data directory, as the randomizer does, unless
+#     writePatchCache is False.  Then no file is written at all.
+#
+# The patches, base ROM cache and stage cache are kept in memory for
+# the rest of the process, so later seeds with the same static flags
+# only run the seed dependent stages.  The caches are locked, so several
+# threads can generate seeds at once, but generation is CPU bound; use
+# several processes to generate seeds in parallel.
+#
+#   result = seedapi.generate("ngsdzpte", romData, "MySeed")
+#   send(result.rom, result.spoiler)
+#
+
+# Folder holding patch.ips, the patches folder and names.txt
+DATA_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+#
+# The SeedResult class holds the output of generate().
+#
+#   rom     - bytes object holding the randomized, headerless ROM
+#   spoiler - Dictionary of spoiler data:
+#               flags       - Flag string of the seed
+#               seed        - The seed
+#               key_items   - Dictionary of location names to key item
+#                             names
+#               characters  - Dictionary of location names to character
+#                             names
+#               text        - The spoiler log text, as written to the
+#                             spoiler log file by generate_rom
+#   timings - Dictionary with the total time in seconds ("total") and
+#             the time of every step ("steps", a list of step
+#             dictionaries as in the stageprofiler report)
+#
+class SeedResult:
+  def __init__(self, rom, spoiler, timings):
+    self.rom = rom
+    self.spoiler = spoiler
+    self.timings = timings
+# end SeedResult class
+
+#
+# Pick a random seed the same way the GUI and command line do.
+#
+# param: dataDirectory - Folder holding names.txt
+# return: The seed
+#
+def getRandomSeed(dataDirectory=DATA_DIRECTORY):
+  with open(os.path.join(dataDirectory, "names.txt"), "r") as namesFile:
+    names = namesFile.readline().split(",")
+  return "".join(random.choice(names) for i in range(2))
+# end getRandomSeed
+
+#
+# Build the spoiler data of a seed from the values the stages provided.
+#
+# param: ctx - GenerationContext of the finished seed
+# param: values - Dictionary of values provided by the stages
+# return: Dictionary of spoiler data, see SeedResult
+#
+def getSpoiler(ctx, values):
+  characters = {location: logictypes.Characters(character[0]).name
+                for location, character in values["char_locs"].items()}
+  return {"flags": ctx.settings.getFlagString(), "seed": ctx.seed,
+          "key_items": values.get("key_locations"), "characters": characters,
+          "text": ctx.spoiler.getText()}
+# end getSpoiler
+
+#
+# Generate a seed in memory.
+#
+# param: settings - Settings for the seed, or a flag string as shown in
+#                   the output file name
+# param: romData - bytes-like object (bytes, bytearray or memoryview)
+#                  holding the input ROM, with or without a copier header
+# param: seed - The seed, or None to pick a random one
+# param: dataDirectory - Folder holding patch.ips, the patches folder and
+#                        names.txt
+# param: writePatchCache - False to not store compiled patches in the
+#                          data directory
+# param: quiet - False to print the progress messages of the randomizer
+# return: A SeedResult
+# raise: ValueError if the flag string is invalid
+# raise: logictypes.PlacementError if the key items could not be placed
+#
+def generate(settings, romData, seed=None, dataDirectory=DATA_DIRECTORY, writePatchCache=True,
+             quiet=True):
+  if isinstance(settings, str):
+    settings = Settings.fromFlagString(settings)
+  if seed is None or seed == "":
+    seed = getRandomSeed(dataDirectory)
+
+  # Only measure time, tracing memory slows every step down
+  profiler = stageprofiler.Profiler(traceMemory=False)
+  profiler.start()
+  with patchcache.use_data_directory(dataDirectory, writePatchCache):
+    with profiler.measure("load_rom"):
+      sourceRom = romimage.fromBytes(romData, quiet)
+    ctx = GenerationContext(settings, seed,
+                            randomizer.patch_base_rom(settings, sourceRom, profiler, False, quiet))
+    ctx.profiler = profiler
+    ctx.quiet = quiet
+    values = randomizer.randomize_rom(ctx)
+    with profiler.measure("to_bytes"):
+      rom = ctx.rom.toBytes()
+  profiler.stop()
+
+  report = profiler.getReport()
+  timings = {"total": report["total"], "steps": report["steps"]}
+  return SeedResult(rom, getSpoiler(ctx, values), timings)
+# end generate
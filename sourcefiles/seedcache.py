@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import struct as st
+import threading
+
+import basecache
+import diskcache
+
+#
+# This file holds the finished seed cache.
+#
+# Seed generation is deterministic: the same input ROM, flags and seed
+# always give the same ROM, patch and spoiler.  Finished seeds are kept
+# on disk so a seed that is requested again (e.g. every runner of a race
+# downloading the race seed) is read back instead of generated again.
+#
+# Entries are content addressed.  The key is the SHA-256 of everything
+# the output depends on:
+#   - The SHA-256 of the headerless input ROM
+#   - The flag string, in the form Settings.getFlagString gives
+#   - The seed
+#   - The output format ("rom" or "patch")
+#   - The patch files (basecache.get_patch_fingerprint)
+#   - The randomizer sources (size and mtime of every .py file), so a
+#     new version of the randomizer does not serve stale seeds
+#
+# Every entry is one file in the cache directory:
+#   magic, header size (32 bit little endian), JSON header, data
+# The JSON header holds the flags, seed, format, spoiler data and the
+# timings of the original generation; the data is the ROM or patch.
+#
+# The cache is LRU and bounded in size.  Like the base ROM cache, the
+# file modification time tracks use.  Files are written under a
+# temporary name and moved into place, so several processes can share
+# the directory (see diskcache).
+#
+
+CACHE_DIRECTORY = "__seedcache__"
+CACHE_EXTENSION = ".seed"
+CACHE_MAGIC = b"JOTSEED1"
+MAX_DISK_BYTES = 512 * 1024 * 1024
+
+# Folder the cache is kept in and its size limit, see set_cache_directory
+cacheDirectory = CACHE_DIRECTORY
+maxDiskBytes = MAX_DISK_BYTES
+
+# Cache statistics for this process
+cacheStats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+# Lookups and stores can come from several threads
+cacheLock = threading.Lock()
+
+# Fingerprint of the randomizer sources, built on first use
+codeFingerprint = None
+
+#
+# Set the folder the cache is kept in.
+#
+# param: directory - Folder for the cache files
+# param: maxBytes - Size limit of the cache in bytes
+#
+def set_cache_directory(directory, maxBytes=MAX_DISK_BYTES):
+  global cacheDirectory, maxDiskBytes
+  cacheDirectory = directory
+  maxDiskBytes = maxBytes
+# end set_cache_directory
+
+#
+# Build a fingerprint of the randomizer sources.
+#
+# return: Hex digest identifying the current sources
+#
+def get_code_fingerprint():
+  global codeFingerprint
+  if codeFingerprint is None:
+    sourceDirectory = os.path.dirname(os.path.abspath(__file__))
+    fingerprint = hashlib.sha256()
+    for name in sorted(os.listdir(sourceDirectory)):
+      if name.endswith(".py"):
+        info = os.stat(os.path.join(sourceDirectory, name))
+        fingerprint.update(("%s:%d:%d;" % (name, info.st_size, info.st_mtime_ns)).encode())
+    codeFingerprint = fingerprint.hexdigest()
+  return codeFingerprint
+# end get_code_fingerprint
+
+#
+# Build the cache key of a seed.
+#
+# param: romHash - SHA-256 hex digest of the headerless input ROM
+# param: flags - Flag string of the seed
+# param: seed - The seed
+# param: outputFormat - "rom" or "patch"
+# return: Hex string cache key
+#
+def get_seed_key(romHash, flags, seed, outputFormat):
+  key = hashlib.sha256()
+  key.update(("%s\0%s\0%s\0%s\0" % (romHash, flags, seed, outputFormat)).encode("utf-8"))
+  key.update(basecache.get_patch_fingerprint().encode())
+  key.update(get_code_fingerprint().encode())
+  return key.hexdigest()
+# end get_seed_key
+
+#
+# Get the path of the cache file for a key.
+#
+# param: key - Cache key
+# return: Path of the cached seed
+#
+def get_cache_path(key):
+  return os.path.join(cacheDirectory, key + CACHE_EXTENSION)
+# end get_cache_path
+
+#
+# Look up a seed.
+#
+# param: key - Cache key from get_seed_key
+# return: Tuple of (header dictionary, data bytes), or None on a miss
+#
+def lookup(key):
+  contents = diskcache.read_file(get_cache_path(key))
+  if contents is None:
+    contents = b""
+  entry = None
+  headerStart = len(CACHE_MAGIC) + 4
+  if len(contents) >= headerStart and contents.startswith(CACHE_MAGIC):
+    headerSize = st.unpack_from("<I", contents, len(CACHE_MAGIC))[0]
+    try:
+      header = json.loads(contents[headerStart:headerStart + headerSize])
+      entry = (header, contents[headerStart + headerSize:])
+    except ValueError:
+      entry = None
+  with cacheLock:
+    if entry is None:
+      cacheStats["misses"] += 1
+    else:
+      cacheStats["hits"] += 1
+  return entry
+# end lookup
+
+#
+# Store a seed and evict the least recently used entries until the cache
+# fits in its size limit.  Failing to write the cache is not an error.
+#
+# param: key - Cache key from get_seed_key
+# param: header - Dictionary describing the seed, must be JSON compatible
+# param: data - bytes object holding the ROM or patch
+#
+def store(key, header, data):
+  header = json.dumps(header).encode("utf-8")
+  if not diskcache.write_file(get_cache_path(key), CACHE_MAGIC + st.pack("<I", len(header)) + header,
+                              data):
+    return
+  evictions = diskcache.evict(cacheDirectory, CACHE_EXTENSION, maxDiskBytes)
+  with cacheLock:
+    cacheStats["stores"] += 1
+    cacheStats["evictions"] += evictions
+# end store
+
+#
+# Get the cache statistics.
+#
+# return: Dictionary of the counters and the hit rate
+#
+def get_stats():
+  with cacheLock:
+    stats = dict(cacheStats)
+  lookups = stats["hits"] + stats["misses"]
+  stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else 0.0
+  return stats
+# end get_stats
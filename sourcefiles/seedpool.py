@@ -0,0 +1,169 @@
+import collections
+import threading
+import time
+
+import jobscheduler
+
+#
+# This file holds the pre-generated seed pool.
+#
+# Most users of the GUI presets do not pick a seed; they want any fresh
+# seed with the preset flags, right away.  The pool keeps a number of
+# seeds with random seeds ready for every preset, and hands one out in
+# O(1) (a deque pop) when a request without a seed arrives.  A seed is
+# only handed out once.
+#
+# The pool refills itself in the background through the job scheduler:
+#   - Refill jobs are batch jobs, so they never delay interactive
+#     requests that are already queued.
+#   - A refill job is only submitted while nothing else is queued, i.e.
+#     while the workers would otherwise be idle.
+#   - Every preset has at most one refill job queued or running at a
+#     time, so the pool never fills the queue.
+#
+# Metrics for every preset:
+#   - depth:        seeds ready, and the target depth
+#   - taken/missed: requests served from the pool, and requests that
+#                   found it empty
+#   - refill rate:  seeds produced per second over the last few refills
+#   - age:          age in seconds of the oldest and newest ready seed
+#
+
+# Number of recent refills the refill rate is measured over
+RATE_WINDOW = 16
+
+#
+# The PresetPool class holds the ready seeds of one preset.
+#
+#   flags     - Flag string of the preset
+#   ready     - deque of (creation time, seed) tuples, oldest first
+#   refilling - True while a refill job is queued or running
+#   produced  - Times of the last refills
+#
+class PresetPool:
+  def __init__(self, flags):
+    self.flags = flags
+    self.ready = collections.deque()
+    self.refilling = False
+    self.produced = collections.deque(maxlen=RATE_WINDOW)
+    self.counters = {"taken": 0, "missed": 0, "refilled": 0, "failed": 0}
+# end PresetPool class
+
+#
+# The SeedPool class keeps seeds ready for a set of presets.
+#
+class SeedPool:
+  #
+  # param: scheduler - jobscheduler.JobScheduler to run the refills on
+  # param: produce - Function taking a flag string and returning a seed
+  #                  with a random seed, e.g. a (header, data) tuple
+  # param: presets - Dictionary of preset names to flag strings
+  # param: depth - Number of seeds to keep ready for every preset
+  # param: interval - Seconds between checks for idle time
+  #
+  def __init__(self, scheduler, produce, presets, depth, interval=0.25):
+    self.scheduler = scheduler
+    self.produce = produce
+    self.depth = depth
+    self.interval = interval
+    self.lock = threading.Lock()
+    self.pools = {name: PresetPool(flags) for name, flags in presets.items()}
+    self.poolsByFlags = {pool.flags: pool for pool in self.pools.values()}
+    self.stopping = threading.Event()
+    self.thread = None
+
+  #
+  # Start refilling in the background.
+  #
+  def start(self):
+    self.thread = threading.Thread(target=self.refillLoop, name="SeedPool", daemon=True)
+    self.thread.start()
+
+  #
+  # Stop refilling.  Seeds already ready stay in the pool.
+  #
+  def stop(self):
+    self.stopping.set()
+    if self.thread is not None:
+      self.thread.join()
+
+  #
+  # Take a ready seed.
+  #
+  # param: flags - Flag string of the request
+  # return: The seed as returned by produce, or None if the flags are not
+  #         a preset or no seed is ready
+  #
+  def take(self, flags):
+    pool = self.poolsByFlags.get(flags)
+    if pool is None:
+      return None
+    with self.lock:
+      if len(pool.ready) == 0:
+        pool.counters["missed"] += 1
+        return None
+      pool.counters["taken"] += 1
+      return pool.ready.popleft()[1]
+
+  #
+  # Get the pool metrics.
+  #
+  # return: Dictionary of preset names to metric dictionaries
+  #
+  def getStats(self):
+    now = time.monotonic()
+    stats = {}
+    with self.lock:
+      for name, pool in self.pools.items():
+        poolStats = {"flags": pool.flags, "depth": len(pool.ready), "target": self.depth}
+        poolStats.update(pool.counters)
+        rate = 0.0
+        if len(pool.produced) > 1 and pool.produced[-1] > pool.produced[0]:
+          rate = (len(pool.produced) - 1) / (pool.produced[-1] - pool.produced[0])
+        poolStats["refill_rate"] = rate
+        poolStats["oldest_age"] = now - pool.ready[0][0] if len(pool.ready) > 0 else None
+        poolStats["newest_age"] = now - pool.ready[-1][0] if len(pool.ready) > 0 else None
+        stats[name] = poolStats
+    return stats
+
+  #
+  # Submit refill jobs while the scheduler is idle, until stopped.
+  #
+  def refillLoop(self):
+    while not self.stopping.is_set():
+      for pool in self.pools.values():
+        if self.scheduler.getStats()["queued"] > 0:
+          # Other work is waiting, try again later
+          break
+        with self.lock:
+          if pool.refilling or len(pool.ready) >= self.depth:
+            continue
+          pool.refilling = True
+        try:
+          self.scheduler.submit(None, self.produce, (pool.flags,), jobscheduler.BATCH,
+                                self.makeRefillCallback(pool))
+        except (jobscheduler.SchedulerFull, RuntimeError):
+          with self.lock:
+            pool.refilling = False
+          break
+      self.stopping.wait(self.interval)
+
+  #
+  # Get the callback that adds a finished refill job to its pool.
+  #
+  # param: pool - The PresetPool being refilled
+  # return: Function taking the finished Job
+  #
+  def makeRefillCallback(self, pool):
+    def refillDone(job):
+      now = time.monotonic()
+      with self.lock:
+        pool.refilling = False
+        if job.state == "done":
+          pool.ready.append((now, job.result))
+          pool.produced.append(now)
+          pool.counters["refilled"] += 1
+        elif job.state == "failed":
+          pool.counters["failed"] += 1
+    return refillDone
+# end SeedPool class
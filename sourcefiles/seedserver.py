@@ -0,0 +1,401 @@
+import argparse
+import base64
+import concurrent.futures
+import hashlib
+import http.server
+import json
+import os
+import sys
+
+import ipswriter
+import jobscheduler
+import patchcache
+import romimage
+import seedapi
+import seedcache
+import seedpool
+from generationcontext import Settings, presetFlags
+
+#
+# This file holds the local seed generation service.
+#
+# The server answers POST /seed with a JSON body:
+#   {"flags": "ngsdzpte", "seed": "MySeed", "format": "rom"}
+# "preset" can be given instead of "flags" to use one of the GUI presets
+# (Race, New Player, Lost Worlds, Hard).  The seed is optional, a random
+# one is picked without it.  The format is "rom" for the whole ROM or
+# "patch" for an IPS patch against the input ROM.  The response is JSON:
+#   {"flags": ..., "seed": ..., "format": ..., "data": <base64 ROM or patch>,
+#    "spoiler": {...}, "timings": {...}, "cached": false}
+# with the spoiler and timings as returned by seedapi.generate.
+#
+# Every seed generated is kept in the seed cache (see seedcache.py), so
+# a seed that is requested again is read back instead of generated.
+# "cached" is true for those, and the timings are those of the original
+# generation.
+#
+# With --pool-depth the server keeps seeds with random seeds ready for
+# every preset (see seedpool.py).  A request with preset flags and no
+# seed is answered from the pool without waiting for a worker.  /status
+# reports the depth, refill rate and age of the pool.
+#
+# GET /status returns the scheduler state: queued and running requests
+# and request counters.
+#
+# Seeds are generated by a pool of worker processes started with the
+# server.  Every worker loads the input ROM once and generates one seed
+# for each preset before the server accepts requests, so the patches
+# are parsed, the writers are imported and the pre-patched base images
+# of the presets are in its memory.  A request with preset flags then
+# only runs the seed dependent stages.
+#
+# At most --workers seeds are generated at once, and at most --queue
+# more requests wait for a worker.  Requests beyond that are rejected
+# with 503 and a Retry-After header, so clients back off instead of
+# piling up behind a busy server.  Requests for the same flags, seed and
+# format that arrive while that seed is being generated share the
+# result.  A request can set "priority" to "batch" to let interactive
+# requests ("priority": "interactive", the default) go first.
+#
+# The server is meant for localhost.  With --synthetic-rom it uses the
+# same pseudo random ROM as the benchmarks, so it can be tried out
+# without a copy of the game:
+#   python seedserver.py --synthetic-rom --port 8086
+#   curl -d '{"preset": "Race", "seed": "test"}' localhost:8086/seed
+#
+
+DEFAULT_PORT = 8086
+MAX_BODY_SIZE = 64 * 1024
+WARM_UP_SEED = "warmup"
+
+# Input ROM of a worker process
+workerRom = None
+
+#
+# Set up a worker process: keep the input ROM and generate a seed with
+# every preset to fill the caches.
+#
+# param: romData - bytes object holding the input ROM
+#
+def initWorker(romData):
+  global workerRom
+  # Progress messages of the writers are not useful in a worker
+  sys.stdout = open(os.devnull, "w")
+  workerRom = romData
+  for flags in presetFlags.values():
+    seedapi.generate(flags, workerRom, WARM_UP_SEED)
+# end initWorker
+
+#
+# Generate a seed in a worker process.
+#
+# param: flags - Flag string of the seed
+# param: seed - The seed, or None to pick a random one
+# param: outputFormat - "rom" to return the ROM, "patch" to return an IPS
+#                       patch against the input ROM
+# return: Tuple of (header dictionary, data bytes).  The header holds
+#         everything in the response but the data.
+#
+def generateSeed(flags, seed, outputFormat):
+  result = seedapi.generate(flags, workerRom, seed)
+  if outputFormat == "patch":
+    data = ipswriter.build_patch(romimage.fromBytes(workerRom).data, result.rom)
+  else:
+    data = result.rom
+  header = {"flags": result.spoiler["flags"], "seed": result.spoiler["seed"],
+            "format": outputFormat, "spoiler": result.spoiler, "timings": result.timings}
+  return header, data
+# end generateSeed
+
+#
+# Build the response for a seed.
+#
+# param: header - Header dictionary from generateSeed
+# param: data - bytes object holding the ROM or patch
+# param: cached - True if the seed was taken from the seed cache
+# return: Dictionary holding the response
+#
+def getResponse(header, data, cached):
+  response = dict(header)
+  response["data"] = base64.b64encode(data).decode("ascii")
+  response["cached"] = cached
+  return response
+# end getResponse
+
+#
+# The RequestError class is raised for requests the server cannot take.
+#
+#   status - HTTP status to answer with
+#
+class RequestError(Exception):
+  def __init__(self, status, message):
+    Exception.__init__(self, message)
+    self.status = status
+# end RequestError class
+
+#
+# The SeedService class owns the worker pool and admits requests to it
+# through a job scheduler (see jobscheduler.py).
+#
+class SeedService:
+  #
+  # param: romData - bytes object holding the input ROM
+  # param: workers - Number of worker processes
+  # param: queueSize - Number of requests that can wait for a worker
+  # param: timeout - Seconds a request may take, including the wait
+  # param: poolDepth - Number of seeds to keep ready for every preset,
+  #                    0 for no seed pool
+  # param: poolFormat - Output format of the pooled seeds
+  #
+  def __init__(self, romData, workers, queueSize, timeout, poolDepth=0, poolFormat="rom"):
+    self.workers = workers
+    self.timeout = timeout
+    self.poolFormat = poolFormat
+    patchcache.set_data_directory(seedapi.DATA_DIRECTORY)
+    self.romHash = hashlib.sha256(romimage.fromBytes(romData).data).hexdigest()
+    self.executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=initWorker, initargs=(romData,))
+    # One scheduler thread per worker process, each waiting for its seed
+    self.scheduler = jobscheduler.JobScheduler(workers, queueSize)
+    self.pool = None
+    if poolDepth > 0:
+      presets = {name: Settings.fromFlagString(flags).getFlagString()
+                 for name, flags in presetFlags.items()}
+      self.pool = seedpool.SeedPool(self.scheduler, self.runPoolSeed, presets, poolDepth)
+
+  #
+  # Start every worker and wait until it is warm.  The executor starts
+  # workers on demand, so one no-op job per worker is run first.
+  #
+  def warmUp(self):
+    futures = [self.executor.submit(os.getpid) for i in range(self.workers)]
+    concurrent.futures.wait(futures)
+    if self.pool is not None:
+      self.pool.start()
+
+  #
+  # Generate a seed in a worker process and add it to the seed cache.
+  # Run by the scheduler.
+  #
+  # return: Tuple of (header dictionary, data bytes)
+  #
+  def runSeed(self, flags, seed, outputFormat):
+    header, data = self.executor.submit(generateSeed, flags, seed, outputFormat).result()
+    # Random seeds are cached too, the seed is in the response
+    key = seedcache.get_seed_key(self.romHash, header["flags"], header["seed"], outputFormat)
+    seedcache.store(key, header, data)
+    return header, data
+
+  #
+  # Generate a seed with a random seed for the seed pool.
+  #
+  # param: flags - Flag string of the preset
+  # return: Tuple of (header dictionary, data bytes)
+  #
+  def runPoolSeed(self, flags):
+    return self.runSeed(flags, None, self.poolFormat)
+
+  #
+  # Generate a seed for a request.  Identical requests that arrive while
+  # the seed is queued or being generated share one generation.
+  #
+  # param: request - Dictionary holding the request body
+  # return: Dictionary holding the response
+  # raise: RequestError if the request is invalid or the server is busy
+  #
+  def generate(self, request):
+    flags = request.get("flags")
+    if "preset" in request:
+      if request["preset"] not in presetFlags:
+        raise RequestError(400, "Unknown preset: %s" % request["preset"])
+      flags = presetFlags[request["preset"]]
+    if not isinstance(flags, str):
+      raise RequestError(400, "Missing flags or preset")
+    outputFormat = request.get("format", "rom")
+    if outputFormat not in ["rom", "patch"]:
+      raise RequestError(400, "Unknown format: %s" % outputFormat)
+    seed = request.get("seed")
+    if seed is not None and not isinstance(seed, str):
+      raise RequestError(400, "The seed must be a string")
+    priority = request.get("priority", "interactive")
+    if priority not in ["interactive", "batch"]:
+      raise RequestError(400, "Unknown priority: %s" % priority)
+    try:
+      flags = Settings.fromFlagString(flags).getFlagString()
+    except ValueError as error:
+      raise RequestError(400, str(error))
+
+    # Requests without a seed get a random one, so they are never shared
+    key = None
+    if seed is not None and seed != "":
+      key = (flags, seed, outputFormat)
+      cached = seedcache.lookup(seedcache.get_seed_key(self.romHash, flags, seed, outputFormat))
+      if cached is not None:
+        return getResponse(cached[0], cached[1], True)
+    elif self.pool is not None and outputFormat == self.poolFormat:
+      pooled = self.pool.take(flags)
+      if pooled is not None:
+        return getResponse(pooled[0], pooled[1], False)
+    try:
+      job = self.scheduler.submit(
+          key, self.runSeed, (flags, seed, outputFormat),
+          jobscheduler.INTERACTIVE if priority == "interactive" else jobscheduler.BATCH)
+    except jobscheduler.SchedulerFull:
+      raise RequestError(503, "Too many requests, try again later")
+    try:
+      header, data = job.wait(self.timeout)
+      return getResponse(header, data, False)
+    except TimeoutError:
+      self.scheduler.cancel(job)
+      raise RequestError(504, "Seed generation timed out")
+    except jobscheduler.JobCancelled:
+      raise RequestError(503, "The server is shutting down")
+    except Exception as error:
+      raise RequestError(500, "Seed generation failed: %s" % error)
+
+  #
+  # Get the state of the service.
+  #
+  # return: Dictionary of the queue state and counters, the counters of
+  #         the seed cache and the metrics of the seed pool
+  #
+  def getStatus(self):
+    status = self.scheduler.getStats()
+    status["seed_cache"] = seedcache.get_stats()
+    if self.pool is not None:
+      status["seed_pool"] = self.pool.getStats()
+    return status
+
+  #
+  # Stop the scheduler and the worker processes.
+  #
+  def shutdown(self):
+    if self.pool is not None:
+      self.pool.stop()
+    self.scheduler.shutdown(wait=True)
+    if sys.version_info >= (3, 9):
+      self.executor.shutdown(wait=True, cancel_futures=True)
+    else:
+      # Nothing is queued once the scheduler has stopped, so there are no
+      # pending futures to cancel.
+      self.executor.shutdown(wait=True)
+# end SeedService class
+
+#
+# The SeedRequestHandler class answers the HTTP requests.  The server
+# runs every request on its own thread, which waits for a worker.
+#
+class SeedRequestHandler(http.server.BaseHTTPRequestHandler):
+  # Set by main
+  service = None
+  quiet = False
+
+  def do_GET(self):
+    if self.path == "/status":
+      self.sendJson(200, self.service.getStatus())
+    else:
+      self.sendJson(404, {"error": "Not found"})
+
+  def do_POST(self):
+    if self.path != "/seed":
+      self.sendJson(404, {"error": "Not found"})
+      return
+    try:
+      length = int(self.headers.get("Content-Length", 0))
+      if length <= 0 or length > MAX_BODY_SIZE:
+        raise RequestError(400, "Missing or oversized request body")
+      try:
+        request = json.loads(self.rfile.read(length))
+      except ValueError:
+        raise RequestError(400, "The request body is not valid JSON")
+      if not isinstance(request, dict):
+        raise RequestError(400, "The request body must be a JSON object")
+      self.sendJson(200, self.service.generate(request))
+    except RequestError as error:
+      headers = {}
+      if error.status == 503:
+        headers["Retry-After"] = "1"
+      self.sendJson(error.status, {"error": str(error)}, headers)
+
+  #
+  # Send a JSON response.
+  #
+  # param: status - HTTP status
+  # param: body - Object to send as JSON
+  # param: headers - Dictionary of extra headers
+  #
+  def sendJson(self, status, body, headers=None):
+    data = json.dumps(body).encode("utf-8")
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(data)))
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(data)
+
+  def log_message(self, format, *args):
+    if not self.quiet:
+      http.server.BaseHTTPRequestHandler.log_message(self, format, *args)
+# end SeedRequestHandler class
+
+#
+# Run the server from the command line.
+#
+# param: argv - Command line arguments, not including the program name
+# return: Exit status
+#
+def main(argv):
+  parser = argparse.ArgumentParser(description="Serve seeds over HTTP on localhost.")
+  romGroup = parser.add_mutually_exclusive_group(required=True)
+  romGroup.add_argument("--input", help="Input ROM")
+  romGroup.add_argument("--synthetic-rom", action="store_true",
+                        help="Use a pseudo random 4 MB ROM instead of the game, for testing")
+  parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+  parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                      help="Number of worker processes, i.e. seeds generated at once")
+  parser.add_argument("--queue", type=int, default=16,
+                      help="Number of requests that can wait for a worker before new "
+                           "requests are rejected")
+  parser.add_argument("--timeout", type=float, default=60.0,
+                      help="Seconds a request may take, including the wait for a worker")
+  parser.add_argument("--cache-dir", default=seedcache.CACHE_DIRECTORY,
+                      help="Folder for the cache of generated seeds")
+  parser.add_argument("--cache-size", type=int, default=seedcache.MAX_DISK_BYTES // (1024 * 1024),
+                      help="Size limit of the seed cache in MiB")
+  parser.add_argument("--pool-depth", type=int, default=0,
+                      help="Number of seeds with random seeds to keep ready for every preset")
+  parser.add_argument("--pool-format", choices=["rom", "patch"], default="rom",
+                      help="Output format of the seeds kept ready")
+  parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+  args = parser.parse_args(argv)
+
+  if args.synthetic_rom:
+    import goldencorpus
+    romData = goldencorpus.makeRomData()
+  else:
+    with open(args.input, "rb") as romFile:
+      romData = romFile.read()
+
+  seedcache.set_cache_directory(args.cache_dir, args.cache_size * 1024 * 1024)
+  service = SeedService(romData, args.workers, args.queue, args.timeout, args.pool_depth,
+                        args.pool_format)
+  print("Warming up %d workers..." % args.workers)
+  service.warmUp()
+  SeedRequestHandler.service = service
+  SeedRequestHandler.quiet = args.quiet
+  server = http.server.ThreadingHTTPServer((args.host, args.port), SeedRequestHandler)
+  print("Serving seeds on http://%s:%d/seed" % (args.host, args.port))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    service.shutdown()
+  return 0
+# end main
+
+if __name__ == "__main__":
+  sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,4 @@
 import math
-import struct as st
-import random as rand
 shop_starts = list(range(0xC2C6F,0xC2C9D,2))
 regular_shops = [0xC2C6F,0xC2C73,0xC2C77,0xC2C79,0xC2C85] + list(range(0xC2C89,0xC2C91,2))
 good_shops = [0xC2C71,0xC2C75,0xC2C7D,0xC2C81,0xC2C83,0xC2C87,0xC2C93,0xC2C97,0xC2C99]
@@ -22,7 +20,7 @@ hlvlconsumables = [0xC3,0xC4]
 alvlitems = [0xBB,0x0E,0x53,0x54,0x55,0x28,0x39,0x91,0x86,0x8F,0x6C,0x7A,0x6D,0x6B]
 alvlconsumables = [0xC3,0xC5]
 
-def pick_items(shop,rand_num):
+def pick_items(rand,shop,rand_num):
     if shop in regular_shops:
         if rand_num > 4:
             item = rand.choice(llvlconsumables+plvlconsumables)
@@ -39,7 +37,7 @@ def pick_items(shop,rand_num):
         else:
             item = rand.choice(glvlitems + hlvlitems + alvlitems)
     return item
-def write_slots(file_pointer,shop_start,items,shop_address):
+def write_slots(rom,rand,shop_start,items,shop_address):
     buffer = []
     item_count = items
     while items > 0:
@@ -47,7 +45,7 @@ def write_slots(file_pointer,shop_start,items,shop_address):
             item = 0x00
        else:
             rand_num = rand.randrange(0,10,1)	
-            item = pick_items(shop_start,rand_num)
+            item = pick_items(rand,shop_start,rand_num)
        #Guarantee for Lapises from Fritz's and Fiona's shop
        if shop_start == 0xC2C71 or shop_start == 0xC2C99:
           if items == item_count:
@@ -59,46 +57,40 @@ def write_slots(file_pointer,shop_start,items,shop_address):
        if item in buffer:
             continue
        buffer.append(item)
-       file_pointer.seek(shop_address)
-       file_pointer.write(st.pack("B",item))
+       rom.writeU8(shop_address,item)
        shop_address += 1
        items -= 1
     return shop_address
-def warranty_shop(file_pointer):
+def warranty_shop(rom,rand):
     shop_address = 0x1AFC29
     guaranteed_items = [0x0,0xC8,0xC7,rand.choice([0x6,0x7,0x8]),rand.choice([0x15,0x16,0x17]),rand.choice([0x24,0x25,
     0x26]),rand.choice([0x31,0x32,0x33]),rand.choice([0x3E,0x3F,0x40,0x43])]
     shop_size = len(guaranteed_items) - 1
     while shop_size > -1:
-            shop_address = write_guarantee(file_pointer,shop_address,guaranteed_items[shop_size])
+            shop_address = write_guarantee(rom,shop_address,guaranteed_items[shop_size])
             shop_size -= 1
-def write_guarantee(file_pointer,shop_address,item):
-    file_pointer.seek(shop_address)
-    file_pointer.write(st.pack("B",item))
+def write_guarantee(rom,shop_address,item):
+    rom.writeU8(shop_address,item)
     shop_address += 1
     return shop_address
-def randomize_shops(outfile):
+def randomize_shops(rom,rand):
    shop_pointer = 0xFC31
    shop_address = 0x1AFC31
-   f = open(outfile,"r+b")
-   warranty_shop(f)
+   warranty_shop(rom,rand)
    for start in shop_starts:
      if start in forbid_shops:
-        f.seek(start)
-        f.write(st.pack("H",shop_pointer + 1))
+        rom.writeU16(start,shop_pointer + 1)
         continue
      shop_items = rand.randrange(4,10)
-     f.seek(start)
-     f.write(st.pack("H",shop_pointer))
+     rom.writeU16(start,shop_pointer)
      shop_pointer += shop_items
-     shop_address = write_slots(f,start,shop_items,shop_address)
-   f.close()
+     shop_address = write_slots(rom,rand,start,shop_items,shop_address)
 
 #
 # Get a random price from 1-65000.  This function tends to 
 # bias lower numbers to avoid everything being prohibitively expensive.
 #
-def getRandomPrice():
+def getRandomPrice(rand):
   r1 = rand.uniform(0, 1)
   r2 = rand.uniform(0, 1)
   return math.floor(abs(r1 - r2) * 65000 + 1)
@@ -106,11 +98,9 @@ def getRandomPrice():
 #
 # Modify shop prices based on the selected flags.
 #
-def modify_shop_prices(outfile, flag):
+def modify_shop_prices(rom, rand, flag):
   if flag == "Normal":
     return
-    
-  f = open(outfile, "r+b")
 
   # Items
   # The first 147 (0x93) items are 6 bytes each.
@@ -118,21 +108,19 @@ def modify_shop_prices(outfile, flag):
   # The price bytes are the same for all types of items.
   item_base_address = 0x0C06A4
   for index in range(0, 0x94):
-    f.seek(item_base_address + (index * 6) + 1)
     price = 0
     if flag != "Free":
-      price = getRandomPrice()
-    f.write(st.pack("H", price))
+      price = getRandomPrice(rand)
+    rom.writeU16(item_base_address + (index * 6) + 1, price)
     
   # Accessories
   # The next 39 (0x27) items are 4 bytes each.
   accessory_base_address = 0x0C0A1C
   for index in range(0, 0x28):
-    f.seek(accessory_base_address + (index * 4) + 1)
     price = 0
     if flag != "Free":
-      price = getRandomPrice()
-    f.write(st.pack("H", price))
+      price = getRandomPrice(rand)
+    rom.writeU16(accessory_base_address + (index * 4) + 1, price)
     
   # Key Items and Consumables
   # The final 53 (0x35) item definitions are 3 bytes each.
@@ -141,18 +129,15 @@ def modify_shop_prices(outfile, flag):
   # revives, and shelters.
   exclusion_list = [2, 4, 10, 11, 12]
   for index in range(0, 0x36):
-    f.seek(consumables_base_address + (index * 3) + 1)
-    price = 0
+    address = consumables_base_address + (index * 3) + 1
     if flag == "Mostly Random":
       if not index in exclusion_list:
-        f.write(st.pack("H", getRandomPrice()))
+        rom.writeU16(address, getRandomPrice(rand))
     elif flag == "Fully Random":
-      f.write(st.pack("H", getRandomPrice()))
+      rom.writeU16(address, getRandomPrice(rand))
     else:
       # Free shops
-      f.write(st.pack("H", 0))
-  
-  f.close()
+      rom.writeU16(address, 0)
    
 if __name__ == "__main__":
    randomize_shops("Project.sfc")
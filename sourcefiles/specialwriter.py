@@ -1,5 +1,3 @@
-import random as rand
-import struct as st
 
 sealed_pointers = [0xC3328,0xC332C,0x1BA717,0x1BA72B,0x1BAB33,0x1BAB35,0x1BAB62,0x1BAB64,0x1BACD6,0x1BACD8,
 0x1BACF7,0x1BACF9,0x393D0,0x393DE,0x393F8,0x393FF,0x1B03A4,0x1B03B1,0x1B03CD,0x1B03D0,0x1B03EF,0x1B03F2,0x1B0401,
@@ -41,11 +39,9 @@ claw_rock = [0x35F57C,0x35F57C]
 omen_rock = [0x35F73C,0x35F73C]
 jerky_trades = [0xBB,0x0E,0x53,0x54,0x55,0x28,0x39,0x91,0x86,0x8F,0x6C,0x7A,0x6D,0x6B]
 jerky_pointers = [0x1BD9B3,0x1BD9B5]
-def randomize_hardcoded_items(outfile,tab_treasures):
-   f = open(outfile,"r+b")
+def randomize_hardcoded_items(rom,rand,tab_treasures):
    i = 0
    while i < len(sealed_pointers) - 1:
-       f.seek(sealed_pointers[i])
        if tab_treasures == "Y":
             rand_num = rand.randrange(0,8,1) # choose number from 0 to 8 inclusive.
             if rand_num == 0: # 11% chance of a speed tab
@@ -56,9 +52,8 @@ def randomize_hardcoded_items(outfile,tab_treasures):
                 treasure = 0xCD;
        else:
             treasure = rand.choice(sealed_treasures)
-       f.write(st.pack("B",treasure))
-       f.seek(sealed_pointers[i+1])
-       f.write(st.pack("B",treasure))
+       rom.writeU8(sealed_pointers[i],treasure)
+       rom.writeU8(sealed_pointers[i+1],treasure)
        i += 2
    oneoffs = [taban_gift_weapon,taban_gift_helm,ranged_trades,acces_trades,tab_trades,wep_trades,
    armor_trades,helm_trades,jerky_pointers]
@@ -67,22 +62,17 @@ def randomize_hardcoded_items(outfile,tab_treasures):
    rock_posts = [denadoro_rock,kajar_rock,laruba_rock,claw_rock,omen_rock]
    i = 0
    while i < len(oneoffs):
-       f.seek(oneoffs[i][0])
        item = rand.choice(oneoffitems[i])
-       f.write(st.pack("B",item))
-       f.seek(oneoffs[i][1])
-       f.write(st.pack("B",item))
+       rom.writeU8(oneoffs[i][0],item)
+       rom.writeU8(oneoffs[i][1],item)
        i += 1
    i = 0
    rocks_local = rocks.copy()
    while i < 5:
-     f.seek(rock_posts[i][0])
      rock = rand.choice(rocks_local)
      rocks_local.remove(rock)
-     f.write(st.pack("B",rock))
-     f.seek(rock_posts[i][1])
-     f.write(st.pack("B",rock))
+     rom.writeU8(rock_posts[i][0],rock)
+     rom.writeU8(rock_posts[i][1],rock)
      i += 1
-   f.close()
 if __name__ == "__main__":
    randomize_hardcoded_items("Project.sfc")
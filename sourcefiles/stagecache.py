@@ -0,0 +1,96 @@
+import collections
+import hashlib
+import threading
+
+#
+# This file holds the stage artifact cache.
+#
+# The output of a stage (the bytes it wrote, the values it provided and
+# its spoiler log text) only depends on:
+#   - The seed
+#   - The settings the stage uses
+#   - The values it needs from earlier stages
+#   - The contents of the ROM regions it reads
+#   - The patch files, for the stages that apply patches
+# The cache key is built from exactly those inputs.  When a seed is
+# regenerated with one flag changed, only the stages whose inputs
+# changed are run again; the output of every other stage is copied from
+# the cache.  Stages that do not read the ROM do not depend on the base
+# image, so their output is reused even when the static patches change.
+#
+# The cache is kept in memory for the rest of the process and is LRU
+# bounded.
+#
+
+MAX_ENTRIES = 256
+
+# Cached stage results, least recently used first
+stageCache = collections.OrderedDict()
+
+# Cache statistics for this process
+cacheStats = {"hits": 0, "misses": 0}
+
+# Stages can run on several threads at once
+cacheLock = threading.Lock()
+
+#
+# Build the cache key for a stage.
+#
+# param: ctx - GenerationContext for the seed
+# param: stage - The Stage about to run
+# param: inputs - Dictionary of the values the stage needs
+# param: patchFingerprint - Fingerprint of the patch files, from
+#                           basecache.get_patch_fingerprint
+# return: Hex string cache key
+#
+def get_stage_key(ctx, stage, inputs, patchFingerprint):
+  key = hashlib.sha256()
+  key.update(("%s\0%s\0%s\0" % (stage.name, ctx.seed, patchFingerprint)).encode("utf-8"))
+  for name in stage.settings:
+    key.update(("%s=%s;" % (name, getattr(ctx.settings, name))).encode("utf-8"))
+  for need in stage.needs:
+    key.update(("%s=%r;" % (need, inputs[need])).encode("utf-8"))
+  for start, end in stage.reads:
+    key.update(ctx.rom.readBytes(start, end - start))
+  return key.hexdigest()
+# end get_stage_key
+
+#
+# Look up a stage result.
+#
+# param: key - Cache key from get_stage_key
+# return: The cached StageResult, or None on a miss
+#
+def lookup(key):
+  with cacheLock:
+    result = stageCache.get(key)
+    if result is None:
+      cacheStats["misses"] += 1
+      return None
+    cacheStats["hits"] += 1
+    stageCache.move_to_end(key)
+    return result
+# end lookup
+
+#
+# Add a stage result to the cache, evicting the least recently used
+# result if the cache is full.
+#
+# param: key - Cache key from get_stage_key
+# param: result - The StageResult to cache
+#
+def store(key, result):
+  with cacheLock:
+    stageCache[key] = result
+    stageCache.move_to_end(key)
+    while len(stageCache) > MAX_ENTRIES:
+      stageCache.popitem(last=False)
+# end store
+
+#
+# Remove every cached stage result.
+#
+def clear():
+  with cacheLock:
+    stageCache.clear()
+# end clear
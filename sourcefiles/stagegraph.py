@@ -0,0 +1,450 @@
+import basecache
+import stagecache
+import stageprofiler
+
+#
+# This file holds the stage graph and the stage scheduler.
+#
+# Seed generation is split into stages (treasures, shops, techs, ...).
+# Every stage declares:
+#   - The ROM regions it reads and writes
+#   - The named values it needs from other stages and the values it
+#     provides to them (e.g. the character locations)
+#
+# The stages are listed in the order they would run one after another.
+# A stage depends on an earlier stage if the earlier stage provides a
+# value it needs, or if their regions conflict: one of them writes a
+# region that the other reads or writes.  Stages with no path between
+# them in the graph touch disjoint parts of the ROM, so the scheduler is
+# free to run them at the same time.  Since every stage draws from its
+# own random number stream, the result does not depend on the order the
+# stages finish in.
+#
+# Every stage works through a StageRom that records the ranges it reads
+# and writes.  With verification turned on the recorded accesses are
+# checked against the declared regions after the stages have run.
+#
+# The result of every stage can be kept in the stage cache (see
+# stagecache.py), so regenerating a seed only runs the stages whose
+# inputs changed.
+#
+# Regions are lists of (start, end) tuples of ROM offsets, end exclusive.
+#
+
+#
+# Sort a list of regions and merge the ones that overlap or touch.
+#
+# param: regions - List of (start, end) tuples
+# return: Sorted list of disjoint (start, end) tuples
+#
+def normalizeRegions(regions):
+  merged = []
+  for start, end in sorted(regions):
+    if start >= end:
+      continue
+    if len(merged) > 0 and start <= merged[-1][1]:
+      if end > merged[-1][1]:
+        merged[-1] = (merged[-1][0], end)
+    else:
+      merged.append((start, end))
+  return merged
+# end normalizeRegions
+
+#
+# Find the ranges covered by both of two normalized region lists.
+#
+# param: first - Normalized list of regions
+# param: second - Normalized list of regions
+# return: List of (start, end) tuples covered by both lists
+#
+def intersectRegions(first, second):
+  overlaps = []
+  i = 0
+  j = 0
+  while i < len(first) and j < len(second):
+    start = max(first[i][0], second[j][0])
+    end = min(first[i][1], second[j][1])
+    if start < end:
+      overlaps.append((start, end))
+    if first[i][1] < second[j][1]:
+      i += 1
+    else:
+      j += 1
+  return overlaps
+# end intersectRegions
+
+#
+# Find the ranges of a region list that are not covered by another.
+#
+# param: regions - Normalized list of regions
+# param: allowed - Normalized list of regions
+# return: List of (start, end) tuples in regions but not in allowed
+#
+def subtractRegions(regions, allowed):
+  outside = []
+  j = 0
+  for start, end in regions:
+    while j < len(allowed) and allowed[j][1] <= start:
+      j += 1
+    k = j
+    while start < end:
+      if k >= len(allowed) or allowed[k][0] >= end:
+        outside.append((start, end))
+        break
+      if allowed[k][0] > start:
+        outside.append((start, allowed[k][0]))
+      start = max(start, allowed[k][1])
+      k += 1
+  return outside
+# end subtractRegions
+
+#
+# Format a region list for error messages.
+#
+# param: regions - List of (start, end) tuples
+# return: String listing the regions
+#
+def formatRegions(regions):
+  return ", ".join("0x%06X-0x%06X" % (start, end - 1) for start, end in regions)
+# end formatRegions
+
+#
+# The Stage class describes one stage of seed generation.
+#
+#   name     - Name of the stage
+#   run      - Function taking (ctx, rom, inputs) that runs the stage.
+#              rom is the image the stage must read and write, inputs is
+#              a dictionary holding the values named in needs.  It returns
+#              a dictionary holding the values named in provides, or None
+#              if the stage provides nothing.
+#   reads    - ROM regions the stage reads
+#   writes   - ROM regions the stage writes
+#   needs    - Names of the values the stage needs from other stages
+#   provides - Names of the values the stage provides to other stages
+#   settings - Names of the Settings attributes the stage uses
+#
+# Stages must not change the values they are given in inputs, since the
+# same values may be handed to later runs from the stage cache.
+#
+class Stage:
+  def __init__(self, name, run, reads=None, writes=None, needs=None, provides=None,
+               settings=None):
+    self.name = name
+    self.run = run
+    self.reads = normalizeRegions(reads or [])
+    self.writes = normalizeRegions(writes or [])
+    self.needs = list(needs or [])
+    self.provides = list(provides or [])
+    self.settings = list(settings or [])
+
+  #
+  # Check whether this stage and another stage touch the same ROM data
+  # in a way that makes their order matter.
+  #
+  # param: other - The other Stage
+  # return: True if one of the stages writes a region the other reads
+  #         or writes
+  #
+  def conflictsWith(self, other):
+    if len(intersectRegions(self.writes, other.writes)) > 0:
+      return True
+    if len(intersectRegions(self.writes, other.reads)) > 0:
+      return True
+    return len(intersectRegions(self.reads, other.writes)) > 0
+# end Stage class
+
+#
+# The StageRom class is the view of the ROM image a stage works on.
+# It passes every access through to the shared RomImage and records the
+# ranges the stage reads and writes.
+#
+class StageRom:
+  def __init__(self, rom):
+    self.rom = rom
+    self.reads = []
+    self.writes = []
+
+  def getSize(self):
+    return self.rom.getSize()
+
+  def ensureSize(self, size):
+    self.rom.ensureSize(size)
+
+  def readU8(self, address):
+    self.reads.append((address, address + 1))
+    return self.rom.readU8(address)
+
+  def readU16(self, address):
+    self.reads.append((address, address + 2))
+    return self.rom.readU16(address)
+
+  def readBytes(self, address, length):
+    self.reads.append((address, address + length))
+    return self.rom.readBytes(address, length)
+
+  def writeU8(self, address, value):
+    self.writes.append((address, address + 1))
+    self.rom.writeU8(address, value)
+
+  def writeU16(self, address, value):
+    self.writes.append((address, address + 2))
+    self.rom.writeU16(address, value)
+
+  def writeBytes(self, address, values):
+    self.writes.append((address, address + len(values)))
+    self.rom.writeBytes(address, values)
+
+  #
+  # Get the regions read through this view.
+  #
+  # return: Normalized list of read regions
+  #
+  def getReadRegions(self):
+    return normalizeRegions(self.reads)
+
+  #
+  # Get the regions written through this view.
+  #
+  # return: Normalized list of written regions
+  #
+  def getWrittenRegions(self):
+    return normalizeRegions(self.writes)
+# end StageRom class
+
+#
+# The StageResult class holds the output of one run of a stage.
+#
+#   writes   - List of (offset, bytes) tuples holding the data the stage
+#              wrote, sorted by offset
+#   provided - Dictionary of the values the stage provided
+#   spoiler  - Text the stage added to the spoiler log
+#
+class StageResult:
+  def __init__(self, writes, provided, spoiler):
+    self.writes = writes
+    self.provided = provided
+    self.spoiler = spoiler
+# end StageResult class
+
+#
+# The StageGraph class holds the dependencies between a list of stages.
+#
+class StageGraph:
+  #
+  # Build the graph for a list of stages.
+  #
+  # param: stages - List of Stage objects in sequential order
+  # raise: ValueError if two stages have the same name or provide the
+  #        same value, or if a stage needs a value no earlier stage provides
+  #
+  def __init__(self, stages):
+    self.stages = list(stages)
+    self.dependencies = {}
+    self.dependents = {}
+    self.ancestors = {}
+    providers = {}
+    for index, stage in enumerate(self.stages):
+      if stage.name in self.dependencies:
+        raise ValueError("Duplicate stage: " + stage.name)
+      dependencies = set()
+      for need in stage.needs:
+        if need not in providers:
+          raise ValueError("Stage %s needs %s, which no earlier stage provides" % (stage.name, need))
+        dependencies.add(providers[need])
+      for earlier in self.stages[:index]:
+        if stage.conflictsWith(earlier):
+          dependencies.add(earlier.name)
+      for value in stage.provides:
+        if value in providers:
+          raise ValueError("Value %s is provided by %s and %s" % (value, providers[value], stage.name))
+        providers[value] = stage.name
+
+      self.dependencies[stage.name] = dependencies
+      self.dependents[stage.name] = set()
+      ancestors = set(dependencies)
+      for dependency in dependencies:
+        self.dependents[dependency].add(stage.name)
+        ancestors |= self.ancestors[dependency]
+      self.ancestors[stage.name] = ancestors
+
+  #
+  # Check whether the graph orders two stages.
+  #
+  # param: first - Name of a stage
+  # param: second - Name of another stage
+  # return: True if one of the stages has to run before the other
+  #
+  def isOrdered(self, first, second):
+    return first in self.ancestors[second] or second in self.ancestors[first]
+
+  #
+  # Get the stages that do not depend on any other stage.
+  #
+  # return: List of Stage objects in sequential order
+  #
+  def getRoots(self):
+    return [stage for stage in self.stages if len(self.dependencies[stage.name]) == 0]
+
+  #
+  # Check the accesses recorded while running the stages.
+  #
+  # Every stage must stay inside its declared regions, and stages that
+  # are not ordered by the graph must not write the same bytes.
+  #
+  # param: read - Dictionary of stage name to normalized list of read regions
+  # param: written - Dictionary of stage name to normalized list of
+  #                  written regions
+  # return: List of error strings, empty if the accesses are valid
+  #
+  def checkAccesses(self, read, written):
+    errors = []
+    for stage in self.stages:
+      outside = subtractRegions(read.get(stage.name, []), stage.reads)
+      if len(outside) > 0:
+        errors.append("Stage %s read outside its declared regions: %s" %
+                      (stage.name, formatRegions(outside)))
+      outside = subtractRegions(written.get(stage.name, []), stage.writes)
+      if len(outside) > 0:
+        errors.append("Stage %s wrote outside its declared regions: %s" %
+                      (stage.name, formatRegions(outside)))
+    for index, stage in enumerate(self.stages):
+      for other in self.stages[index + 1:]:
+        if self.isOrdered(stage.name, other.name):
+          continue
+        overlaps = intersectRegions(written.get(stage.name, []), written.get(other.name, []))
+        if len(overlaps) > 0:
+          errors.append("Stages %s and %s both wrote %s" %
+                        (stage.name, other.name, formatRegions(overlaps)))
+    return errors
+# end StageGraph class
+
+#
+# Run a single stage against its own view of the ROM image.
+#
+# When the stage cache is used and holds a result for the stage's
+# inputs, the cached writes are copied to the ROM instead of running
+# the stage.  When the context has a profiler, the stage is measured
+# and the counters the stage reports in its context's stats are added to
+# the measurement.
+#
+# param: ctx - GenerationContext for the seed
+# param: stage - The Stage to run
+# param: values - Dictionary of the values provided so far
+# param: patchFingerprint - Fingerprint of the patch files, or None to
+#                           run without the stage cache
+# return: Tuple of (StageRom, StageResult)
+# raise: ValueError if the stage does not provide its declared values
+#
+def runStage(ctx, stage, values, patchFingerprint=None):
+  with stageprofiler.measure(ctx.profiler, stage.name) as step:
+    stageRom = StageRom(ctx.rom)
+    inputs = {need: values[need] for need in stage.needs}
+    key = None
+    if patchFingerprint is not None:
+      key = stagecache.get_stage_key(ctx, stage, inputs, patchFingerprint)
+      result = stagecache.lookup(key)
+      if result is not None:
+        for offset, data in result.writes:
+          stageRom.writeBytes(offset, data)
+        if step is not None:
+          step.cached = True
+        return stageRom, result
+
+    stageContext = ctx.forStage(stageRom)
+    provided = stage.run(stageContext, stageRom, inputs)
+    if step is not None:
+      step.counters.update(stageContext.stats)
+    if provided is None:
+      provided = {}
+    for value in stage.provides:
+      if value not in provided:
+        raise ValueError("Stage %s did not provide %s" % (stage.name, value))
+    # Stages that are not ordered never write the same bytes, so the
+    # written regions still hold this stage's data.
+    writes = [(start, ctx.rom.readBytes(start, end - start))
+              for start, end in stageRom.getWrittenRegions()]
+    result = StageResult(writes, provided, stageContext.spoiler.getText())
+    if key is not None:
+      stagecache.store(key, result)
+    return stageRom, result
+# end runStage
+
+#
+# Run a list of stages on a context's ROM image.
+#
+# With one worker the stages are run one after another in list order.
+# With more workers every stage is started as soon as the stages it
+# depends on have finished, on a pool of threads sharing the ROM image.
+# Stages are always run one after another while the context has a
+# profiler, so every measurement covers a single stage.
+# Either way the spoiler log text of the stages is added to the
+# context's spoiler log in list order.
+#
+# param: ctx - GenerationContext for the seed
+# param: stages - List of Stage objects in sequential order
+# param: workers - Number of stages that can run at the same time
+# param: verify - True to check the recorded accesses of every stage
+# param: useCache - True to reuse stage results from the stage cache
+# param: writtenRegions - Optional dictionary that the normalized list of
+#                         regions each stage wrote is added to, by stage name
+# return: Dictionary holding the values provided by the stages
+# raise: RuntimeError if verification finds an invalid access
+#
+def runStages(ctx, stages, workers=1, verify=False, useCache=False, writtenRegions=None):
+  graph = StageGraph(stages)
+  patchFingerprint = None
+  if useCache:
+    patchFingerprint = basecache.get_patch_fingerprint()
+  values = {}
+  read = {}
+  written = {}
+  spoilers = {}
+
+  def finishStage(stage, stageRom, result):
+    values.update(result.provided)
+    read[stage.name] = stageRom.getReadRegions()
+    written[stage.name] = stageRom.getWrittenRegions()
+    spoilers[stage.name] = result.spoiler
+
+  if workers <= 1 or ctx.profiler is not None:
+    for stage in graph.stages:
+      stageRom, result = runStage(ctx, stage, values, patchFingerprint)
+      finishStage(stage, stageRom, result)
+  else:
+    # Imported here so that sequential runs do not pay for the thread pool
+    import concurrent.futures
+    import contextvars
+    waiting = {stage.name: set(graph.dependencies[stage.name]) for stage in graph.stages}
+    stagesByName = {stage.name: stage for stage in graph.stages}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+      running = {}
+      ready = graph.getRoots()
+      while len(ready) > 0 or len(running) > 0:
+        for stage in ready:
+          # Stages see the caller's patch data directory, see patchcache
+          future = executor.submit(contextvars.copy_context().run, runStage, ctx, stage,
+                                   dict(values), patchFingerprint)
+          running[future] = stage
+        ready = []
+        done, pending = concurrent.futures.wait(
+            running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+          stage = running.pop(future)
+          stageRom, result = future.result()
+          finishStage(stage, stageRom, result)
+          for name in sorted(graph.dependents[stage.name]):
+            waiting[name].discard(stage.name)
+            if len(waiting[name]) == 0:
+              ready.append(stagesByName[name])
+
+  for stage in graph.stages:
+    if spoilers[stage.name] != "":
+      ctx.spoiler.write(spoilers[stage.name])
+  if writtenRegions is not None:
+    writtenRegions.update(written)
+  if verify:
+    errors = graph.checkAccesses(read, written)
+    if len(errors) > 0:
+      raise RuntimeError("\n".join(errors))
+  return values
+# end runStages
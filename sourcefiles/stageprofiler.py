@@ -0,0 +1,281 @@
+import contextlib
+import os
+import time
+
+#
+# This file holds the stage profiler.
+#
+# A Profiler measures the steps of seed generation: loading the input
+# ROM, the IPS and text base patches, and every generation stage.  For
+# each step it records:
+#   - Wall time
+#   - CPU time of the process
+#   - Peak memory allocated during the step (tracemalloc).  Python 3.7
+#     and 3.8 can not reset the traced peak, so there it is the memory
+#     the step still holds when it ends.
+#   - Counters reported by the step, e.g. the number of placement
+#     attempts and backtracks of the key item logic
+# Optionally a cProfile of every step is written to its own .pstats file,
+# which can be read with the pstats module or tools like snakeviz.
+#
+# The report is available as text, for reading, and as JSON, for
+# tracking regressions across releases.
+#
+# Steps are measured one at a time, or nested inside each other, on one
+# thread.  The stage scheduler runs the stages sequentially while a
+# profiler is attached.
+#
+# Every seed goes through measure(), so this module is imported on every
+# run.  cProfile, tracemalloc and json are only imported once a Profiler
+# needs them, to keep them off the start up path.
+#
+
+REPORT_VERSION = 1
+
+#
+# The StepProfile class holds the measurements of one step.
+#
+#   name        - Name of the step
+#   depth       - Number of steps this step is nested in
+#   wall        - Wall time in seconds
+#   cpu         - CPU time in seconds
+#   peakMemory  - Peak memory allocated during the step in bytes, or None
+#                 if memory was not traced
+#   counters    - Dictionary of counters reported by the step
+#   cached      - True if the step's output was taken from a cache
+#   profileFile - Path of the step's .pstats file, or None
+#
+class StepProfile:
+  def __init__(self, name):
+    self.name = name
+    self.depth = 0
+    self.wall = 0.0
+    self.cpu = 0.0
+    self.peakMemory = None
+    self.counters = {}
+    self.cached = False
+    self.profileFile = None
+
+  #
+  # Get the measurements as a dictionary for the JSON report.
+  #
+  # return: Dictionary of the measurements
+  #
+  def toDict(self):
+    return {"name": self.name, "depth": self.depth, "wall": self.wall, "cpu": self.cpu,
+            "peak_memory": self.peakMemory, "counters": dict(self.counters),
+            "cached": self.cached, "profile_file": self.profileFile}
+# end StepProfile class
+
+#
+# The Profiler class measures the steps of one seed.
+#
+class Profiler:
+  #
+  # param: traceMemory - True to record the peak memory of every step
+  # param: profileDirectory - Folder to write a .pstats file per step to,
+  #                           or None to skip cProfile
+  #
+  def __init__(self, traceMemory=True, profileDirectory=None):
+    self.traceMemory = traceMemory
+    self.profileDirectory = profileDirectory
+    self.steps = []
+    # [StepProfile, start memory, peak memory] of the steps being measured
+    self.running = []
+    self.startWall = None
+    self.startCpu = None
+    self.total = 0.0
+    self.totalCpu = 0.0
+    self.startedTracing = False
+
+  #
+  # Start measuring the whole seed.
+  #
+  def start(self):
+    import tracemalloc
+    if self.traceMemory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self.startedTracing = True
+    self.startWall = time.perf_counter()
+    self.startCpu = time.process_time()
+
+  #
+  # Stop measuring the whole seed.
+  #
+  def stop(self):
+    import tracemalloc
+    self.total = time.perf_counter() - self.startWall
+    self.totalCpu = time.process_time() - self.startCpu
+    if self.startedTracing:
+      tracemalloc.stop()
+      self.startedTracing = False
+
+  #
+  # Measure one step.  Used as a context manager around the step:
+  #   with profiler.measure("treasures") as step:
+  #     ...
+  #     step.counters["attempts"] = attempts
+  #
+  # Steps can be nested, e.g. the base patches are measured inside the
+  # step that builds the base ROM.  Only the outermost step is profiled
+  # with cProfile, since only one profiler can be active at a time.
+  #
+  # param: name - Name of the step
+  # return: Context manager giving the StepProfile of the step
+  #
+  @contextlib.contextmanager
+  def measure(self, name):
+    import cProfile
+    import tracemalloc
+    step = StepProfile(name)
+    step.depth = len(self.running)
+    self.steps.append(step)
+    index = len(self.steps)
+    tracing = self.traceMemory and tracemalloc.is_tracing()
+    startMemory = 0
+    resetPeak = hasattr(tracemalloc, "reset_peak")
+    if tracing:
+      currentMemory, peakMemory = tracemalloc.get_traced_memory()
+      if resetPeak:
+        if len(self.running) > 0:
+          # Keep the enclosing step's peak before the peak is reset
+          parent = self.running[-1]
+          parent[2] = max(parent[2], peakMemory - parent[1])
+        tracemalloc.reset_peak()
+      startMemory = currentMemory
+    running = [step, startMemory, 0]
+    self.running.append(running)
+    profile = None
+    if self.profileDirectory is not None and step.depth == 0:
+      profile = cProfile.Profile()
+    startWall = time.perf_counter()
+    startCpu = time.process_time()
+    if profile is not None:
+      profile.enable()
+    try:
+      yield step
+    finally:
+      if profile is not None:
+        profile.disable()
+      step.wall = time.perf_counter() - startWall
+      step.cpu = time.process_time() - startCpu
+      self.running.pop()
+      if tracing:
+        currentMemory, peakMemory = tracemalloc.get_traced_memory()
+        if not resetPeak:
+          # The peak may be from before the step started
+          peakMemory = currentMemory
+        step.peakMemory = max(0, running[2], peakMemory - startMemory)
+        if len(self.running) > 0:
+          parent = self.running[-1]
+          parent[2] = max(parent[2], step.peakMemory + startMemory - parent[1])
+      if profile is not None:
+        os.makedirs(self.profileDirectory, exist_ok=True)
+        step.profileFile = os.path.join(self.profileDirectory, "%02d_%s.pstats" %
+                                        (index, name))
+        profile.dump_stats(step.profileFile)
+
+  #
+  # Get the report as a dictionary.
+  #
+  # param: info - Dictionary of extra information about the seed
+  #               (flags, seed, ...) to include in the report
+  # return: Dictionary holding the report
+  #
+  def getReport(self, info=None):
+    return {"version": REPORT_VERSION, "info": dict(info or {}),
+            "total": self.total, "total_cpu": self.totalCpu,
+            "steps": [step.toDict() for step in self.steps]}
+
+  #
+  # Get the report as text.
+  #
+  # param: info - Dictionary of extra information about the seed
+  # return: String holding the report table
+  #
+  def formatReport(self, info=None):
+    lines = []
+    for key, value in sorted((info or {}).items()):
+      lines.append("%s: %s" % (key, value))
+    lines.append("%-18s %10s %10s %6s %10s  %s" %
+                 ("step", "wall ms", "cpu ms", "%", "peak KiB", "counters"))
+    for step in self.steps:
+      share = 0.0
+      if self.total > 0:
+        share = 100.0 * step.wall / self.total
+      memory = "-"
+      if step.peakMemory is not None:
+        memory = "%.1f" % (step.peakMemory / 1024.0)
+      counters = ", ".join("%s=%s" % item for item in sorted(step.counters.items()))
+      if step.cached:
+        counters = ("cached " + counters).strip()
+      name = "  " * step.depth + step.name
+      lines.append("%-18s %10.2f %10.2f %6.1f %10s  %s" %
+                   (name, step.wall * 1000, step.cpu * 1000, share, memory, counters))
+    lines.append("%-18s %10.2f %10.2f" % ("total", self.total * 1000, self.totalCpu * 1000))
+    return "\n".join(lines) + "\n"
+
+  #
+  # Write the report files.
+  #
+  # param: basename - Path of the report without extension.  The text
+  #                   report is written to basename.txt and the JSON
+  #                   report to basename.json.
+  # param: info - Dictionary of extra information about the seed
+  #
+  def writeReport(self, basename, info=None):
+    import json
+    with open(basename + ".txt", "w") as reportFile:
+      reportFile.write(self.formatReport(info))
+    with open(basename + ".json", "w") as reportFile:
+      json.dump(self.getReport(info), reportFile, indent=2)
+# end Profiler class
+
+#
+# Measure a step if there is a profiler.
+#
+# param: profiler - Profiler measuring the seed, or None
+# param: name - Name of the step
+# return: Context manager giving the StepProfile of the step, or None if
+#         there is no profiler
+#
+def measure(profiler, name):
+  if profiler is None:
+    return contextlib.nullcontext()
+  return profiler.measure(name)
+# end measure
+
+#
+# Summarize the reports of several seeds, e.g. a batch.
+#
+# param: reports - List of report dictionaries from Profiler.getReport
+# return: String holding the mean and maximum time of every step
+#
+def formatSummary(reports):
+  order = []
+  stepTimes = {}
+  stepCounters = {}
+  for report in reports:
+    for step in report["steps"]:
+      key = (step["depth"], step["name"])
+      if key not in stepTimes:
+        order.append(key)
+        stepTimes[key] = []
+        stepCounters[key] = {}
+      stepTimes[key].append(step["wall"])
+      for counter, value in step["counters"].items():
+        stepCounters[key][counter] = stepCounters[key].get(counter, 0) + value
+  totals = [report["total"] for report in reports]
+  lines = ["Profile of %d seeds:" % len(reports),
+           "%-18s %6s %10s %10s  %s" % ("step", "runs", "mean ms", "max ms", "mean counters")]
+  for depth, name in order:
+    times = stepTimes[(depth, name)]
+    counters = ", ".join("%s=%.1f" % (counter, value / len(times))
+                         for counter, value in sorted(stepCounters[(depth, name)].items()))
+    lines.append("%-18s %6d %10.2f %10.2f  %s" %
+                 ("  " * depth + name, len(times), 1000 * sum(times) / len(times),
+                  1000 * max(times), counters))
+  lines.append("%-18s %6d %10.2f %10.2f" %
+               ("total", len(totals), 1000 * sum(totals) / len(totals), 1000 * max(totals)))
+  return "\n".join(lines) + "\n"
+# end formatSummary
@@ -1,5 +1,3 @@
-import random as rand
-import struct as st
 
 cyclone = {"attack_byte": 0x04, "effect": 0, "tech_id": 1, "efpointer": [3,0,0,0x3A,0x3B,1,0x3E,0x80,0x80,0x0A,4,0], 
 "anim": [1,0xDA,0xEF,0x20,1,1,0xFF], "text": [0xA2,0xD2,0xBC,0xC5,0xC8,0xC7,0xBE,0xEF,0xEF,0xEF,0xEF], 
@@ -169,14 +167,12 @@ antilife = {"attack_byte": 2, "effect": 0x23, "tech_id": 0x37, "efpointer": [3,0
 darkmatter = {"attack_byte": 0x42, "effect": 7, "tech_id": 0x38, "efpointer": [3,0,0,0,0,3,0x3C,0x70,0,0x2A,0,0],
 "anim": [0x38,0xF1,4,0xA,0x34,0x34,0x1E], "text": [0x2F,0xA3,0xBA,0xCB,0xC4,0xAC,0xBA,0xCD,0xCD,0xBE,0xCB],
 "descpointer": [2,0x3F], "mp_cost": 20, "targeting": [8,0]}
-new_ids = {"cyclone": "", "slash": "", "lightning": "", "spincut": "", "lightning2": "", "life": "", "confuse": "",
-"luminaire": "", "aura": "", "provoke": "", "ice": "", "cure": "", "haste": "", "ice2": "", "cure2": "", "life2": "",
-"flametoss": "", "hypnowave": "", "fire": "", "napalm": "", "protect": "", "fire2": "", "megabomb": "", "flare": "",
-"rocketpunch": "", "curebeam" : "", "laserspin" : "", "robotackle": "", "healbeam": "", "uzzipunch": "", 
-"areabomb": "", "shock": "", "slurp": "", "slurpcut": "", "water": "", "heal": "", "leapslash": "", "water2": "",
-"cure2_2": "", "frogsquash": "", "kiss": "", "rollokick": "", "catattack": "", "rockthrow": "", "charm": "", 
-"tailspin": "", "dinotail": "", "triplekick": "", "lightning2_2": "", "ice2_2": "", "fire2_2": "", "darkbomb": "",
-"magicwall": "", "darkmist": "", "antilife": "", "darkmatter": ""}
+new_id_names = ["cyclone", "slash", "lightning", "spincut", "lightning2", "life", "confuse", "luminaire", "aura", 
+"provoke", "ice", "cure", "haste", "ice2", "cure2", "life2", "flametoss", "hypnowave", "fire", "napalm", 
+"protect", "fire2", "megabomb", "flare", "rocketpunch", "curebeam", "laserspin", "robotackle", "healbeam", 
+"uzzipunch", "areabomb", "shock", "slurp", "slurpcut", "water", "heal", "leapslash", "water2", "cure2_2", 
+"frogsquash", "kiss", "rollokick", "catattack", "rockthrow", "charm", "tailspin", "dinotail", "triplekick", 
+"lightning2_2", "ice2_2", "fire2_2", "darkbomb", "magicwall", "darkmist", "antilife", "darkmatter"]
 global control_pointer
 control_pointer = 0xC1BF6
 global effect_pointer
@@ -198,46 +194,34 @@ targeting_offsets = targeting_pointer + ("tech_id"-1) * 2
 text_offset = text_pointer + ("tech_id"-1) * 11
 describe_offset = describe_pointer + ("tech_id"-1) * 2"""
 
-def randomize_tech_order(character):
+def randomize_tech_order(rom,rand,character,new_ids):
     i = 0
-    new_id_names = ["cyclone", "slash", "lightning", "spincut", "lightning2", "life", "confuse", "luminaire", "aura", 
-    "provoke", "ice", "cure", "haste", "ice2", "cure2", "life2", "flametoss", "hypnowave", "fire", "napalm", 
-    "protect", "fire2", "megabomb", "flare", "rocketpunch", "curebeam", "laserspin", "robotackle", "healbeam", 
-    "uzzipunch", "areabomb", "shock", "slurp", "slurpcut", "water", "heal", "leapslash", "water2", "cure2_2", 
-    "frogsquash", "kiss", "rollokick", "catattack", "rockthrow", "charm", "tailspin", "dinotail", "triplekick", 
-    "lightning2_2", "ice2_2", "fire2_2", "darkbomb", "magicwall", "darkmist", "antilife", "darkmatter"]
     avail_techs = character.copy()
     while i < len(character):
           picked_tech = rand.choice(avail_techs)
           control_offset = control_pointer + ((character[i]["tech_id"]-1) * 11)
           control_offset1 = control_offset + 3
-          write_bytes(picked_tech["attack_byte"],control_offset1)
+          write_bytes(rom,picked_tech["attack_byte"],control_offset1)
           control_offset2 = control_offset + 8
-          write_bytes(picked_tech["effect"],control_offset2)
+          write_bytes(rom,picked_tech["effect"],control_offset2)
           effect_offset = effect_pointer + ((character[i]["tech_id"]-1) * 12)
-          write_bytes(picked_tech["efpointer"],effect_offset)
+          write_bytes(rom,picked_tech["efpointer"],effect_offset)
           animation_offset = animation_pointer + ((character[i]["tech_id"]-1) * 7)
-          write_bytes(picked_tech["anim"],animation_offset)
+          write_bytes(rom,picked_tech["anim"],animation_offset)
           text_offset = text_pointer + ((character[i]["tech_id"]-1) * 11)
-          write_bytes(picked_tech["text"],text_offset)
+          write_bytes(rom,picked_tech["text"],text_offset)
           describe_offset = describe_pointer + ((character[i]["tech_id"]-1) * 2)
-          write_bytes(picked_tech["descpointer"],describe_offset)
+          write_bytes(rom,picked_tech["descpointer"],describe_offset)
           mp_offset = mp_pointer + ((character[i]["tech_id"]-1) * 1)
-          write_bytes(picked_tech["mp_cost"],mp_offset)
+          write_bytes(rom,picked_tech["mp_cost"],mp_offset)
           targeting_offset = targeting_pointer + ((character[i]["tech_id"]-1) * 2)
-          write_bytes(picked_tech["targeting"],targeting_offset)
+          write_bytes(rom,picked_tech["targeting"],targeting_offset)
           new_ids[new_id_names[picked_tech["tech_id"]-1]] = character[i]["tech_id"]
           avail_techs.remove(picked_tech)
           i += 1
 
-def randomize_tech_order_balanced(character,balanced_char):
+def randomize_tech_order_balanced(rom,rand,character,balanced_char,new_ids):
     i = 0
-    new_id_names = ["cyclone", "slash", "lightning", "spincut", "lightning2", "life", "confuse", "luminaire", "aura", 
-    "provoke", "ice", "cure", "haste", "ice2", "cure2", "life2", "flametoss", "hypnowave", "fire", "napalm", 
-    "protect", "fire2", "megabomb", "flare", "rocketpunch", "curebeam", "laserspin", "robotackle", "healbeam", 
-    "uzzipunch", "areabomb", "shock", "slurp", "slurpcut", "water", "heal", "leapslash", "water2", "cure2_2", 
-    "frogsquash", "kiss", "rollokick", "catattack", "rockthrow", "charm", "tailspin", "dinotail", "triplekick", 
-    "lightning2_2", "ice2_2", "fire2_2", "darkbomb", "magicwall", "darkmist", "antilife", "darkmatter"]
     avail_techs = balanced_char.copy()
     while i < len(character):
           if len(avail_techs) == 1:
@@ -246,754 +230,494 @@ def randomize_tech_order_balanced(character,balanced_char):
             picked_tech = avail_techs[rand.randrange(0,len(avail_techs)-1)]
           control_offset = control_pointer + ((character[i]["tech_id"]-1) * 11)
           control_offset1 = control_offset + 3
-          write_bytes(picked_tech["attack_byte"],control_offset1)
+          write_bytes(rom,picked_tech["attack_byte"],control_offset1)
           control_offset2 = control_offset + 8
-          write_bytes(picked_tech["effect"],control_offset2)
+          write_bytes(rom,picked_tech["effect"],control_offset2)
           effect_offset = effect_pointer + ((character[i]["tech_id"]-1) * 12)
-          write_bytes(picked_tech["efpointer"],effect_offset)
+          write_bytes(rom,picked_tech["efpointer"],effect_offset)
           animation_offset = animation_pointer + ((character[i]["tech_id"]-1) * 7)
-          write_bytes(picked_tech["anim"],animation_offset)
+          write_bytes(rom,picked_tech["anim"],animation_offset)
           text_offset = text_pointer + ((character[i]["tech_id"]-1) * 11)
-          write_bytes(picked_tech["text"],text_offset)
+          write_bytes(rom,picked_tech["text"],text_offset)
           describe_offset = describe_pointer + ((character[i]["tech_id"]-1) * 2)
-          write_bytes(picked_tech["descpointer"],describe_offset)
+          write_bytes(rom,picked_tech["descpointer"],describe_offset)
           mp_offset = mp_pointer + ((character[i]["tech_id"]-1) * 1)
-          write_bytes(picked_tech["mp_cost"],mp_offset)
+          write_bytes(rom,picked_tech["mp_cost"],mp_offset)
           targeting_offset = targeting_pointer + ((character[i]["tech_id"]-1) * 2)
-          write_bytes(picked_tech["targeting"],targeting_offset)
+          write_bytes(rom,picked_tech["targeting"],targeting_offset)
           new_ids[new_id_names[picked_tech["tech_id"]-1]] = character[i]["tech_id"]
           while picked_tech in avail_techs: avail_techs.remove(picked_tech)
           i += 1
 
 
-def rewrite_menu_techs():
+def rewrite_menu_techs(rom,new_ids):
     menu_start = 0x3FF831
     menu_techs = ["aura","cure","cure2","curebeam","healbeam","slurp","heal","cure2_2","kiss"]
     menu_i = 0
     tech_i = 0
     while tech_i < len(menu_techs):
-        file_pointer.seek(menu_start + menu_i)
-        file_pointer.write(st.pack("B",new_ids[menu_techs[tech_i]]))
+        rom.writeU8(menu_start + menu_i,new_ids[menu_techs[tech_i]])
         menu_i += 3
         tech_i += 1
 
-def rewrite_combo_techs():
+def rewrite_combo_techs(rom,new_ids):
     combo_tech_address = 0xC1E63
     combo_tech_requirements = 0xC27FA
-    file_pointer.seek(combo_tech_address)
     #List of dual techs below
     #Techs which are ORed with 0x80 are not directly used in the tech, and only exist to consume MP.
     #Aura Whirl
-    file_pointer.write(st.pack("B",new_ids["aura"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",0x80 | new_ids["cyclone"]))
+    rom.writeU8(combo_tech_address,new_ids["aura"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["cyclone"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["aura"] - 8))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["aura"] - 8)
     combo_tech_requirements += 3
     #Ice Sword
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice"]))
+    rom.writeU8(combo_tech_address,new_ids["spincut"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["ice"] - 8))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["ice"] - 8)
     combo_tech_requirements += 3
     #Ice Sword 2
-    file_pointer.seek(combo_tech_address+1) 
     #Regardless of tech list order, Ice and Fire Sword 2 use a special version of Confuse that doesn't multihit, so rewriting it isn't necessary
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
+    rom.writeU8(combo_tech_address+1,new_ids["ice2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["confuse"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
+    rom.writeU8(combo_tech_requirements,new_ids["confuse"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["ice2"] - 8)
     combo_tech_requirements += 3
 	#Fire Whirl
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["flametoss"]))
+    rom.writeU8(combo_tech_address,new_ids["cyclone"])
+    rom.writeU8(combo_tech_address+1,new_ids["flametoss"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["flametoss"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["flametoss"] - 16)
     combo_tech_requirements += 3
     #Fire Sword
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire"]))
+    rom.writeU8(combo_tech_address,new_ids["spincut"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire"] - 16)
     combo_tech_requirements += 3
     #Fire Sword 2
-    file_pointer.seek(combo_tech_address+1)#See Ice Sword 2
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])#See Ice Sword 2
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["confuse"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["confuse"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire2"] - 16)
     combo_tech_requirements += 3
     #Rocket Roll
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
+    rom.writeU8(combo_tech_address,new_ids["cyclone"])
+    rom.writeU8(combo_tech_address+1,new_ids["laserspin"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["laserspin"] - 24)
     combo_tech_requirements += 3
     #Max Cyclone
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
+    rom.writeU8(combo_tech_address,new_ids["laserspin"])
+    rom.writeU8(combo_tech_address+1,new_ids["spincut"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["laserspin"] - 24)
     combo_tech_requirements += 3
     #Super Volt
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["luminaire"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["shock"]))
+    rom.writeU8(combo_tech_address,new_ids["luminaire"])
+    rom.writeU8(combo_tech_address+1,new_ids["shock"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["luminaire"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["shock"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["luminaire"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["shock"] - 24)
     combo_tech_requirements += 3
     #X Strike
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
+    rom.writeU8(combo_tech_address,new_ids["cyclone"])
     #Frog uses a different tech to get around Slurp Cut failing on certain enemies, so the next line is skipped
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["slurpcut"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["slurpcut"] - 32)
     combo_tech_requirements += 3
     #Sword Stream
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["water"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
+    rom.writeU8(combo_tech_address,new_ids["water"])
+    rom.writeU8(combo_tech_address+1,new_ids["spincut"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["water"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["water"] - 32)
     combo_tech_requirements += 3
     #Spire
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
+    rom.writeU8(combo_tech_address,new_ids["leapslash"])
+    rom.writeU8(combo_tech_address+1,new_ids["lightning2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["leapslash"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning2"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["leapslash"] - 32)
     combo_tech_requirements += 3
     #Drill Kick
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rollokick"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
+    rom.writeU8(combo_tech_address,new_ids["rollokick"])
+    rom.writeU8(combo_tech_address+1,new_ids["cyclone"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rollokick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["rollokick"] - 40)
     combo_tech_requirements += 3
     #Volt Bite
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["catattack"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["lightning"]))
+    rom.writeU8(combo_tech_address,new_ids["catattack"])
+    rom.writeU8(combo_tech_address+1,new_ids["lightning"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["catattack"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["catattack"] - 40)
     combo_tech_requirements += 3
     #Falcon Hit
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["rockthrow"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["rockthrow"])
+    rom.writeU8(combo_tech_address+1,new_ids["spincut"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["rockthrow"] - 40)
     combo_tech_requirements += 3
     #Antipode
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["ice"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire"]))
+    rom.writeU8(combo_tech_address,new_ids["ice"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["ice"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire"] - 16)
     combo_tech_requirements += 3
     #Antipode 2
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address,new_ids["ice2"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire2"] - 16)
     combo_tech_requirements += 3
     #Antipode 3
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["flare"]))
+    rom.writeU8(combo_tech_address,new_ids["ice2"])
+    rom.writeU8(combo_tech_address+1,new_ids["flare"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["flare"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["flare"] - 16)
     combo_tech_requirements += 3
     #Aura Beam
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["aura"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",0x80 | new_ids["curebeam"]))
+    rom.writeU8(combo_tech_address,new_ids["aura"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["curebeam"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["aura"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["curebeam"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["aura"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["curebeam"] - 24)
     combo_tech_requirements += 3 
     #Ice Tackle
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["robotackle"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice"]))
+    rom.writeU8(combo_tech_address,new_ids["robotackle"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["robotackle"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["ice"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["robotackle"] - 24)
     combo_tech_requirements += 3
     #Cure Touch
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cure"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",0x80 | new_ids["healbeam"]))
+    rom.writeU8(combo_tech_address,new_ids["cure"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["healbeam"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cure"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["healbeam"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["cure"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["healbeam"] - 24)
     combo_tech_requirements += 3
     #Ice Water
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["water"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice"]))
+    rom.writeU8(combo_tech_address,new_ids["water"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["water"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["ice"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["water"] - 32)
     combo_tech_requirements += 3
     #Glacier
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["water2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
+    rom.writeU8(combo_tech_address,new_ids["water2"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["water2"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["water2"] - 32)
     combo_tech_requirements += 3
     #Double Cure
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cure2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["cure2_2"]))
+    rom.writeU8(combo_tech_address,new_ids["cure2"])
+    rom.writeU8(combo_tech_address+1,new_ids["cure2_2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cure2"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["cure2_2"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["cure2"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["cure2_2"] - 32)
     combo_tech_requirements += 3
     #Twin Charm
-    file_pointer.seek(combo_tech_address+1)#Twin Charm uses a different spell with a higher chance of stealing
-    file_pointer.write(st.pack("B",0x80 | new_ids["provoke"]))
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["provoke"])#Twin Charm uses a different spell with a higher chance of stealing
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["provoke"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["charm"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["provoke"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["charm"] - 40)
     combo_tech_requirements += 3
     #Ice Toss
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice"]))
+    rom.writeU8(combo_tech_address,new_ids["rockthrow"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["ice"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rockthrow"] - 40)
     combo_tech_requirements += 3
     #Cube Toss
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
+    rom.writeU8(combo_tech_address,new_ids["rockthrow"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rockthrow"] - 40)
     combo_tech_requirements += 3
     #Fire Punch
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rocketpunch"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire"]))
+    rom.writeU8(combo_tech_address,new_ids["rocketpunch"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rocketpunch"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["fire"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rocketpunch"] - 24)
     combo_tech_requirements += 3
     #Fire Tackle
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["robotackle"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address,new_ids["robotackle"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["robotackle"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["robotackle"] - 24)
     combo_tech_requirements += 3
     #Doublev Bomb
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["areabomb"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["megabomb"]))
+    rom.writeU8(combo_tech_address,new_ids["areabomb"])
+    rom.writeU8(combo_tech_address+1,new_ids["megabomb"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["megabomb"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["areabomb"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["megabomb"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["areabomb"] - 24)
     combo_tech_requirements += 3
     #Flame Kick
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rollokick"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire"]))
+    rom.writeU8(combo_tech_address,new_ids["rollokick"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rollokick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["fire"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rollokick"] - 40)
     combo_tech_requirements += 3
     #Fire Whirl
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["tailspin"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address,new_ids["tailspin"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["tailspin"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["tailspin"] - 40)
     combo_tech_requirements += 3
     #Blaze Kick
     #Like Crono, Ayla uses a different version of Triple Kick that doesn't multihit, so the previous line is skipped.
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["triplekick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["triplekick"] - 40)
     combo_tech_requirements += 3
     #Blade Toss
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["laserspin"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["laserspin"])
     #See X Strike
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["slurpcut"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["laserspin"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["slurpcut"] - 32)
     combo_tech_requirements += 3
     #Bubble Snap
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["robotackle"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["water"]))
+    rom.writeU8(combo_tech_address,new_ids["robotackle"])
+    rom.writeU8(combo_tech_address+1,new_ids["water"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["robotackle"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["water"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["robotackle"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["water"] - 32)
     combo_tech_requirements += 3
     #Cure Wave
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cure2_2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B", 0x80 | new_ids["healbeam"]))
+    rom.writeU8(combo_tech_address,new_ids["cure2_2"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["healbeam"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["healbeam"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["cure2_2"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["healbeam"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["cure2_2"] - 32)
     combo_tech_requirements += 3
     #Boogie
-    file_pointer.seek(combo_tech_address+1)#Boogie uses a unique spell that sets Stop
-    file_pointer.write(st.pack("B",0x80 | new_ids["laserspin"]))
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["laserspin"])#Boogie uses a unique spell that sets Stop
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["charm"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["laserspin"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["charm"] - 40)
     combo_tech_requirements += 3
     #Spin Kick
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rollokick"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
+    rom.writeU8(combo_tech_address,new_ids["rollokick"])
+    rom.writeU8(combo_tech_address+1,new_ids["laserspin"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rollokick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["laserspin"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rollokick"] - 40)
     combo_tech_requirements += 3
     #Beast Toss
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["uzzipunch"]))
+    rom.writeU8(combo_tech_address,new_ids["rockthrow"])
+    rom.writeU8(combo_tech_address+1,new_ids["uzzipunch"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["uzzipunch"] - 24))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rockthrow"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["uzzipunch"] - 24)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rockthrow"] - 40)
     combo_tech_requirements += 3
     #Slurp Kiss
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["slurp"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["kiss"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["slurp"])
+    rom.writeU8(combo_tech_address+1,new_ids["kiss"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["slurp"] - 32))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["kiss"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["slurp"] - 32)
+    rom.writeU8(combo_tech_requirements+1,new_ids["kiss"] - 40)
     combo_tech_requirements += 3
     #Bubble Hit
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["rollokick"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["water"]))
+    rom.writeU8(combo_tech_address,new_ids["rollokick"])
+    rom.writeU8(combo_tech_address+1,new_ids["water"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["water"] - 32))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["rollokick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["water"] - 32)
+    rom.writeU8(combo_tech_requirements+1,new_ids["rollokick"] - 40)
     combo_tech_requirements += 3
     #Drop Kick
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
+    rom.writeU8(combo_tech_address,new_ids["leapslash"])
     #See Blaze Kick
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["leapslash"] - 32))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["triplekick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["leapslash"] - 32)
+    rom.writeU8(combo_tech_requirements+1,new_ids["triplekick"] - 40)
     combo_tech_requirements += 3
     #Red Pin
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire"]))
+    rom.writeU8(combo_tech_address,new_ids["leapslash"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["fire"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["leapslash"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["fire"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["leapslash"] - 32)
     combo_tech_requirements += 3
     #Line Bomb
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["leapslash"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["megabomb"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["leapslash"])
+    rom.writeU8(combo_tech_address+1,new_ids["megabomb"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["megabomb"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["leapslash"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["megabomb"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["leapslash"] - 32)
     combo_tech_requirements += 3
     #Frog Flare
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["frogsquash"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["flare"]))
+    rom.writeU8(combo_tech_address,new_ids["frogsquash"])
+    rom.writeU8(combo_tech_address+1,new_ids["flare"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["flare"] - 16))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["frogsquash"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["flare"] - 16)
+    rom.writeU8(combo_tech_requirements+1,new_ids["frogsquash"] - 32)
     combo_tech_requirements += 3
     #Delta Force
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address,new_ids["lightning2"])
+    rom.writeU8(combo_tech_address+1,new_ids["ice2"])
+    rom.writeU8(combo_tech_address+2,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning2"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+2,new_ids["fire2"] - 16)
     combo_tech_requirements += 3
     #Lifeline
-    file_pointer.seek(combo_tech_address+1)#Lifeline uses a unique spell to set GreenDream effect
-    file_pointer.write(st.pack("B",0x80 | new_ids["life"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",0x80 | new_ids["laserspin"]))
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["life"])#Lifeline uses a unique spell to set GreenDream effect
+    rom.writeU8(combo_tech_address+2,0x80 | new_ids["laserspin"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["life2"] - 8))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["life2"] - 8)
+    rom.writeU8(combo_tech_requirements+2,new_ids["laserspin"] - 24)
     combo_tech_requirements += 3
     #Arc Impulse
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
+    rom.writeU8(combo_tech_address,new_ids["spincut"])
+    rom.writeU8(combo_tech_address+1,new_ids["leapslash"])
+    rom.writeU8(combo_tech_address+2,new_ids["ice2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["leapslash"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+2,new_ids["leapslash"] - 32)
     combo_tech_requirements += 3
     #Final Kick
     #See Blaze Kick
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
+    rom.writeU8(combo_tech_address+1,new_ids["lightning2"])
+    rom.writeU8(combo_tech_address+2,new_ids["ice2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["ice2"] - 8))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["triplekick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning2"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["ice2"] - 8)
+    rom.writeU8(combo_tech_requirements+2,new_ids["triplekick"] - 40)
     combo_tech_requirements += 3
     #Fire Zone
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["robotackle"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["robotackle"])
+    rom.writeU8(combo_tech_address+1,new_ids["spincut"])
+    rom.writeU8(combo_tech_address+2,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["spincut"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
+    rom.writeU8(combo_tech_requirements,new_ids["spincut"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+2,new_ids["laserspin"] - 24)
     combo_tech_requirements += 3
     #Delta Storm
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["water2"]))
+    rom.writeU8(combo_tech_address,new_ids["lightning2"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
+    rom.writeU8(combo_tech_address+2,new_ids["water2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["water2"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning2"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+2,new_ids["water2"] - 32)
     combo_tech_requirements += 3
     #Gatling Kick
     #See Blaze Kick
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
+    rom.writeU8(combo_tech_address+1,new_ids["lightning2"])
+    rom.writeU8(combo_tech_address+2,new_ids["fire2"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["lightning2"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"] - 16))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["triplekick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["lightning2"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["fire2"] - 16)
+    rom.writeU8(combo_tech_requirements+2,new_ids["triplekick"] - 40)
     combo_tech_requirements += 3
     #Triple Raid
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["robotackle"]))
+    rom.writeU8(combo_tech_address,new_ids["cyclone"])
+    rom.writeU8(combo_tech_address+1,new_ids["robotackle"])
     #See X Strike
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["robotackle"] - 24))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["slurpcut"] - 32))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["robotackle"] - 24)
+    rom.writeU8(combo_tech_requirements+2,new_ids["slurpcut"] - 32)
     combo_tech_requirements += 3
     #Twister
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["tailspin"]))
+    rom.writeU8(combo_tech_address,new_ids["cyclone"])
+    rom.writeU8(combo_tech_address+1,new_ids["laserspin"])
+    rom.writeU8(combo_tech_address+2,new_ids["tailspin"])
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"] - 24))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["tailspin"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["laserspin"] - 24)
+    rom.writeU8(combo_tech_requirements+2,new_ids["tailspin"] - 40)
     combo_tech_requirements += 3
     #3D Attack
     #See Blaze Kick
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
+    rom.writeU8(combo_tech_address+1,new_ids["cyclone"])
 	#See X Strike
     combo_tech_address += 11
-    file_pointer.seek(combo_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["cyclone"]))
-    file_pointer.seek(combo_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["slurpcut"] - 32))
-    file_pointer.seek(combo_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["triplekick"] - 40))
+    rom.writeU8(combo_tech_requirements,new_ids["cyclone"])
+    rom.writeU8(combo_tech_requirements+1,new_ids["slurpcut"] - 32)
+    rom.writeU8(combo_tech_requirements+2,new_ids["triplekick"] - 40)
     #Dark Eternal
     rock_tech_requirements = 0xC2953
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["darkmatter"]))
+    rom.writeU8(combo_tech_address,new_ids["ice2"])
+    rom.writeU8(combo_tech_address+1,new_ids["fire2"])
+    rom.writeU8(combo_tech_address+2,new_ids["darkmatter"])
     combo_tech_address += 11
-    file_pointer.seek(rock_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["ice2"]))
-    file_pointer.seek(rock_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["fire2"]))
-    file_pointer.seek(rock_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["darkmatter"]))
+    rom.writeU8(rock_tech_requirements,new_ids["ice2"])
+    rom.writeU8(rock_tech_requirements+1,new_ids["fire2"])
+    rom.writeU8(rock_tech_requirements+2,new_ids["darkmatter"])
     rock_tech_requirements += 3
     #Omega Flare
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["flare"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",new_ids["darkbomb"]))
+    rom.writeU8(combo_tech_address,new_ids["flare"])
+    rom.writeU8(combo_tech_address+1,new_ids["laserspin"])
+    rom.writeU8(combo_tech_address+2,new_ids["darkbomb"])
     combo_tech_address += 11
-    file_pointer.seek(rock_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["flare"]))
-    file_pointer.seek(rock_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["laserspin"]))
-    file_pointer.seek(rock_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["darkbomb"]))
+    rom.writeU8(rock_tech_requirements,new_ids["flare"])
+    rom.writeU8(rock_tech_requirements+1,new_ids["laserspin"])
+    rom.writeU8(rock_tech_requirements+2,new_ids["darkbomb"])
     rock_tech_requirements += 3
     #Spin Strike
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",0x80 | new_ids["robotackle"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",0x80 | new_ids["dinotail"]))
+    rom.writeU8(combo_tech_address,new_ids["leapslash"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["robotackle"])
+    rom.writeU8(combo_tech_address+2,0x80 | new_ids["dinotail"])
     combo_tech_address += 11
-    file_pointer.seek(rock_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["robotackle"]))
-    file_pointer.seek(rock_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["leapslash"]))
-    file_pointer.seek(rock_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["tailspin"]))
+    rom.writeU8(rock_tech_requirements,new_ids["robotackle"])
+    rom.writeU8(rock_tech_requirements+1,new_ids["leapslash"])
+    rom.writeU8(rock_tech_requirements+2,new_ids["tailspin"])
     rock_tech_requirements += 3
     #Poyozo Dance
-    file_pointer.seek(combo_tech_address)
-    file_pointer.write(st.pack("B",0x80 | new_ids["provoke"]))
-    file_pointer.seek(combo_tech_address+1)
-    file_pointer.write(st.pack("B",0x80 | new_ids["hypnowave"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B", new_ids["tailspin"]))
+    rom.writeU8(combo_tech_address,0x80 | new_ids["provoke"])
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["hypnowave"])
+    rom.writeU8(combo_tech_address+2,new_ids["tailspin"])
     combo_tech_address += 11
-    file_pointer.seek(rock_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["provoke"]))
-    file_pointer.seek(rock_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["hypnowave"]))
-    file_pointer.seek(rock_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["tailspin"]))
+    rom.writeU8(rock_tech_requirements,new_ids["provoke"])
+    rom.writeU8(rock_tech_requirements+1,new_ids["hypnowave"])
+    rom.writeU8(rock_tech_requirements+2,new_ids["tailspin"])
     rock_tech_requirements += 3
     #Grand Dream
-    file_pointer.seek(combo_tech_address+1)#Grand Dream uses a unique spell that's stronger than Frog Squash
-    file_pointer.write(st.pack("B",0x80 | new_ids["life2"]))
-    file_pointer.seek(combo_tech_address+2)
-    file_pointer.write(st.pack("B",0x80 | new_ids["healbeam"]))
-    file_pointer.seek(rock_tech_requirements)
-    file_pointer.write(st.pack("B",new_ids["life2"]))
-    file_pointer.seek(rock_tech_requirements+1)
-    file_pointer.write(st.pack("B",new_ids["healbeam"]))
-    file_pointer.seek(rock_tech_requirements+2)
-    file_pointer.write(st.pack("B",new_ids["frogsquash"]))
-def write_bytes(array,pointer):
+    rom.writeU8(combo_tech_address+1,0x80 | new_ids["life2"])#Grand Dream uses a unique spell that's stronger than Frog Squash
+    rom.writeU8(combo_tech_address+2,0x80 | new_ids["healbeam"])
+    rom.writeU8(rock_tech_requirements,new_ids["life2"])
+    rom.writeU8(rock_tech_requirements+1,new_ids["healbeam"])
+    rom.writeU8(rock_tech_requirements+2,new_ids["frogsquash"])
+def write_bytes(rom,array,pointer):
     if isinstance(array,int):
-       file_pointer.seek(pointer)
-       file_pointer.write(st.pack("B",array))
+       rom.writeU8(pointer,array)
     elif isinstance(array,list):
         for byte in array:
-           file_pointer.seek(pointer)
-           file_pointer.write(st.pack("B",byte))
+           rom.writeU8(pointer,byte)
            pointer += 1
 
-def take_pointer(pointer):
-    global file_pointer
-    file_pointer = pointer
-    file_pointer = open(file_pointer,"r+b")
+def take_pointer(rom,rand):
+    new_ids = dict.fromkeys(new_id_names,"")
     crono = [cyclone,slash,lightning,spincut,lightning2,life,confuse,luminaire]
     marle = [aura,provoke,ice,cure,haste,ice2,cure2,life2]
     lucca = [flametoss,hypnowave,fire,napalm,protect,fire2,megabomb,flare]
@@ -1003,15 +727,12 @@ def take_pointer(pointer):
     magus = [lightning2_2,ice2_2,fire2_2,darkbomb,magicwall,darkmist,antilife,darkmatter]
     chars = [crono, marle, lucca, robo, frog, ayla, magus]
     for character in chars:
-        randomize_tech_order(character)
-    rewrite_menu_techs()
-    rewrite_combo_techs()
-    file_pointer.close()
+        randomize_tech_order(rom,rand,character,new_ids)
+    rewrite_menu_techs(rom,new_ids)
+    rewrite_combo_techs(rom,new_ids)
 
-def take_pointer_balanced(pointer):
-    global file_pointer
-    file_pointer = pointer
-    file_pointer = open(file_pointer,"r+b")
+def take_pointer_balanced(rom,rand):
+    new_ids = dict.fromkeys(new_id_names,"")
     crono = [cyclone,slash,lightning,spincut,lightning2,life,confuse,luminaire]
     marle = [aura,provoke,ice,cure,haste,ice2,cure2,life2]
     lucca = [flametoss,hypnowave,fire,napalm,protect,fire2,megabomb,flare]
@@ -1078,7 +799,6 @@ def take_pointer_balanced(pointer):
     chars = [crono, marle, lucca, robo, frog, ayla, magus]
     balanced_chars = [b_crono, b_marle, b_lucca, b_robo, b_frog, b_ayla, b_magus]
     for character in chars:
-        randomize_tech_order_balanced(character, balanced_chars[chars.index(character)])
-    rewrite_menu_techs()
-    rewrite_combo_techs()
-    file_pointer.close()
\ No newline at end of file
+        randomize_tech_order_balanced(rom,rand,character, balanced_chars[chars.index(character)],new_ids)
+    rewrite_menu_techs(rom,new_ids)
+    rewrite_combo_techs(rom,new_ids)
\ No newline at end of file
@@ -1,5 +1,3 @@
-import struct as st
-import random as rand
 lowlvlchests = list(range(0x35F40C,0x35F41C,4)) + list(range(0x35F470,0x35F484,4)) + list(range(0x35F4A4,0x35F4B0,4)) \
 + list(range(0x35F7CC,0x35F7DC,4)) + [0x35F42C,0x35F440,0x35F4FC,0x35F500,0x35F7B0]
 lmidlvlchests = [0x35F464,0x35F4C4,0x35F4A0] + list(range(0x35F430,0x35F440,4))  + list(range(0x35F488,0x35F49C,4)) \
@@ -31,7 +29,7 @@ hlvlconsumables = [0xC3,0xC4,0xCD,0xCE,0xCF]
 alvlitems = [0xBB,0x0E,0x53,0x54,0x55,0x28,0x39,0x91,0x86,0x8F,0x6C,0x7A,0x6D,0x6B]
 alvlconsumables = [0xC3,0xC5]
 
-def choose_item(pointer,difficulty,tab_treasures):
+def choose_item(rand,pointer,difficulty,tab_treasures):
     rand_num = rand.randrange(0,11,1)
     if tab_treasures == "Y":
         rand_num = rand.randrange(0,20,1) # choose number from 0 to 20 inclusive.
@@ -156,14 +154,10 @@ def choose_item(pointer,difficulty,tab_treasures):
                 else:
                     writeitem = rand.choice(glvlitems + hlvlitems)
     return writeitem
-def randomize_treasures(outfile,difficulty,tab_treasures):
-   f = open(outfile,"r+b")
+def randomize_treasures(rom,rand,difficulty,tab_treasures):
    for p in allpointers:
-      f.seek(p-3)
-      f.write(st.pack("B",0x00))
-      writeitem = choose_item(p,difficulty,tab_treasures)
-      f.seek(p)
-      f.write(st.pack("B",writeitem))
-   f.close()
+      rom.writeU8(p-3,0x00)
+      writeitem = choose_item(rand,p,difficulty,tab_treasures)
+      rom.writeU8(p,writeitem)
 if __name__ == "__main__":
    randomize_treasures("Techwriter.sfc")